@@ -1,24 +1,146 @@
-from flask import Flask, request, jsonify, Response, render_template
+from flask import Flask, request, jsonify, Response, render_template, send_file, url_for, stream_with_context
 from face_utils import (
-    process_registration_image, process_attendance_image,
-    compare_faces, draw_face_box, FaceRecognitionError
+    process_registration_image, decode_image, draw_face_box, FaceRecognitionError
 )
-import numpy as np
+from live_pipeline import FrameRecognizer, LiveAttendancePipeline
+from multiprocess_pipeline import MultiprocessAttendancePipeline
+from camera_hub import CameraHub
+from quality_controller import QualityController, default_levels
+from metrics import metrics
+from face_quality import QualityGate
+from motion_gate import MotionGate
+from bulk_enrollment import parse_manifest, read_zip_batch, enroll_batch
+from video_attendance import process_video, mark_video_attendance
 from datetime import datetime
 import base64
 from io import BytesIO
 from PIL import Image
-import cv2
-from data_manager import DataManager
+from data_manager import DataManager, is_valid_volunteer_id
 import os
+import atexit
+import json
+import zipfile
+import tempfile
 
 app = Flask(__name__)
-data_manager = DataManager()
+
+# Volunteers, encodings and attendance are stored under this directory
+DATA_DIR = os.environ.get('DATA_DIR', 'data')
+# Gallery matching backend: "exact" brute force, or "ivf" approximate search for
+# very large galleries (IVF_NPROBE trades latency for recall)
+FACE_INDEX = os.environ.get('FACE_INDEX', 'exact')
+IVF_NPROBE = int(os.environ.get('IVF_NPROBE', '8'))
+# Attendance marks are answered from memory and written behind within this many seconds
+# (0 writes and fsyncs every mark before answering)
+ATTENDANCE_FLUSH_INTERVAL = float(os.environ.get('ATTENDANCE_FLUSH_INTERVAL', '0.5'))
+# In-memory gallery representation (float64, float32 or int8); int8 can re-rank
+# its best GALLERY_RERANK candidates with exact float distances
+GALLERY_DTYPE = os.environ.get('GALLERY_DTYPE', 'float64')
+GALLERY_RERANK = int(os.environ.get('GALLERY_RERANK', '0'))
+# Encodings kept per volunteer, and volunteers compared template by template
+# after the centroid pre-filter
+MAX_FACE_TEMPLATES = int(os.environ.get('MAX_FACE_TEMPLATES', '10'))
+TEMPLATE_SHORTLIST = int(os.environ.get('TEMPLATE_SHORTLIST', '8'))
+# A new registration whose face matches an existing volunteer with at least
+# DUPLICATE_THRESHOLD confidence is rejected ("reject"), registered but flagged
+# for review ("flag"), or not checked at all ("off")
+DUPLICATE_POLICY = os.environ.get('DUPLICATE_POLICY', 'reject')
+DUPLICATE_THRESHOLD = float(os.environ.get('DUPLICATE_THRESHOLD', '90'))
+# Recognition workers are spawned and re-import this script as __mp_main__;
+# only the server itself opens the data directory
+if __name__ != '__mp_main__':
+    data_manager = DataManager(
+        data_dir=DATA_DIR,
+        index_backend=FACE_INDEX,
+        index_options={'nprobe': IVF_NPROBE} if FACE_INDEX == 'ivf' else None,
+        attendance_flush_interval=ATTENDANCE_FLUSH_INTERVAL or None,
+        gallery_dtype=GALLERY_DTYPE,
+        gallery_rerank=GALLERY_RERANK,
+        max_templates=MAX_FACE_TEMPLATES,
+        template_shortlist=TEMPLATE_SHORTLIST
+    )
+    atexit.register(data_manager.close)
 
 # Create required directories
 os.makedirs('static', exist_ok=True)
 os.makedirs('templates', exist_ok=True)
 
+# Live stream settings: run full detection every N frames and track faces in between
+DETECT_EVERY_N_FRAMES = int(os.environ.get('DETECT_EVERY_N_FRAMES', '5'))
+FACE_TRACKER = os.environ.get('FACE_TRACKER', 'iou')  # iou, mil, kcf, csrt or mosse
+MATCH_THRESHOLD = 90
+STREAM_FPS = float(os.environ.get('STREAM_FPS', '15'))
+CAPTURE_WIDTH = int(os.environ.get('CAPTURE_WIDTH', '640'))
+CAPTURE_HEIGHT = int(os.environ.get('CAPTURE_HEIGHT', '480'))
+# Recognition frame rate the adaptive quality controller aims for (0 disables it)
+TARGET_FPS = float(os.environ.get('TARGET_FPS', '10'))
+# Faces that are too small, blurred or turned away are not encoded
+FACE_QUALITY_GATE = os.environ.get('FACE_QUALITY_GATE', '1') != '0'
+MIN_FACE_SIZE = int(os.environ.get('MIN_FACE_SIZE', '40'))
+MIN_FACE_SHARPNESS = float(os.environ.get('MIN_FACE_SHARPNESS', '20'))
+MAX_FACE_YAW = float(os.environ.get('MAX_FACE_YAW', '0.35'))
+# Skip detection while the camera sees no motion and tracks no face
+# (fraction of changed pixels on a downsampled frame; 0 disables the gate)
+MOTION_THRESHOLD = float(os.environ.get('MOTION_THRESHOLD', '0.01'))
+# Recognize live frames in this many worker processes fed through shared memory
+# (0 keeps recognition on a single in-process thread)
+RECOGNITION_WORKERS = int(os.environ.get('RECOGNITION_WORKERS', '0'))
+# Named frame sources viewers can pick with ?camera=<name>, besides webcam
+# indexes: "lobby=rtsp://10.0.0.5/stream,replay=sessions/event1" (video files,
+# stream URLs, image directories or recorded sessions)
+FRAME_SOURCES = dict(entry.split('=', 1) for entry in os.environ.get('FRAME_SOURCES', '').split(',') if '=' in entry)
+# Record every live session (camera frames with timing) under this directory
+RECORD_SESSIONS_DIR = os.environ.get('RECORD_SESSIONS_DIR') or None
+# Worker processes for bulk enrollment (default: one per CPU)
+BULK_ENROLL_WORKERS = int(os.environ.get('BULK_ENROLL_WORKERS', '0')) or None
+# Idle Server-Sent Events connections get a comment line this often
+SSE_HEARTBEAT_SECONDS = float(os.environ.get('SSE_HEARTBEAT_SECONDS', '15'))
+# Recorded videos: frames analysed per second of footage and worker processes
+VIDEO_SAMPLE_FPS = float(os.environ.get('VIDEO_SAMPLE_FPS', '1'))
+VIDEO_WORKERS = int(os.environ.get('VIDEO_WORKERS', '0')) or None
+
+def multiprocess_warnings():
+    """Configured features the multiprocess pipeline does not apply"""
+    warnings = []
+    if FACE_INDEX == 'ivf':
+        warnings.append("FACE_INDEX=ivf is ignored; recognition workers match against the exact gallery")
+    if TARGET_FPS > 0:
+        warnings.append("TARGET_FPS is ignored; the quality controller only runs without RECOGNITION_WORKERS")
+    if MOTION_THRESHOLD > 0:
+        warnings.append("MOTION_THRESHOLD is ignored; the motion gate only runs without RECOGNITION_WORKERS")
+    legacy = data_manager.legacy_encoding_count()
+    if legacy:
+        warnings.append(f"{legacy} volunteers only have JSON encodings and cannot be matched by "
+                        f"recognition workers; run migrate_encodings.py")
+    return warnings
+
+def create_live_pipeline(camera, event_id):
+    """Build the capture + recognition pipeline for one camera/event"""
+    source = FRAME_SOURCES.get(camera, camera)
+    record_dir = None
+    if RECORD_SESSIONS_DIR:
+        record_dir = os.path.join(RECORD_SESSIONS_DIR,
+                                  f"{camera}-{event_id}-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}")
+    quality_gate = None
+    if FACE_QUALITY_GATE:
+        quality_gate = QualityGate(MIN_FACE_SIZE, MIN_FACE_SHARPNESS, MAX_FACE_YAW)
+    if RECOGNITION_WORKERS > 0:
+        for warning in multiprocess_warnings():
+            print(f"Warning: {warning}")
+        return MultiprocessAttendancePipeline(data_manager, event_id, source, CAPTURE_WIDTH, CAPTURE_HEIGHT,
+                                              RECOGNITION_WORKERS, match_threshold=MATCH_THRESHOLD,
+                                              quality_gate=quality_gate, record_dir=record_dir)
+    motion_gate = MotionGate(MOTION_THRESHOLD) if MOTION_THRESHOLD > 0 else None
+    recognizer = FrameRecognizer(data_manager, event_id, DETECT_EVERY_N_FRAMES,
+                                 FACE_TRACKER, MATCH_THRESHOLD, quality_gate, motion_gate)
+    controller = None
+    if TARGET_FPS > 0:
+        controller = QualityController(TARGET_FPS, default_levels(DETECT_EVERY_N_FRAMES))
+    return LiveAttendancePipeline(recognizer, source, CAPTURE_WIDTH, CAPTURE_HEIGHT, controller, record_dir)
+
+# One shared capture + recognition loop per camera/event, fanned out to all viewers
+camera_hub = CameraHub(create_live_pipeline)
+
 @app.route('/')
 def index():
     """Redirect to dashboard"""
@@ -29,109 +151,49 @@ def live_attendance_page():
     """Render the live attendance page"""
     return render_template('live_attendance.html')
 
-def generate_frames(event_id):
-    """Generate frames from webcam with face recognition"""
-    # Initialize webcam
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened():
-        print("Error: Could not open webcam")
-        return
-        
-    # Set webcam resolution
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-    
-    while True:
-        success, frame = cap.read()
-        if not success:
-            print("Error: Could not read frame")
-            break
-        
-        try:
-            # Get all registered volunteers with their profile photos
-            volunteers = data_manager.get_all_volunteers()
-            if not volunteers:
-                # If no volunteers, just show the frame with a message
-                cv2.putText(frame, "No registered volunteers", (10, 30), 
-                          cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-            else:
-                # Convert frame to RGB (face_recognition uses RGB)
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                
-                # Detect faces in the frame
-                face_encodings, face_locations = process_attendance_image(rgb_frame)
-                
-                # Check each detected face
-                for face_encoding, face_location in zip(face_encodings, face_locations):
-                    best_match = None
-                    highest_confidence = 0
-                    
-                    # Compare with registered faces
-                    for volunteer_id, volunteer in volunteers:
-                        confidence = compare_faces(volunteer["face_encoding"], face_encoding)
-                        if confidence > highest_confidence and confidence >= 90:
-                            highest_confidence = confidence
-                            best_match = (volunteer_id, volunteer)
-                    
-                    if best_match:
-                        volunteer_id, volunteer = best_match
-                        # Mark attendance
-                        if data_manager.mark_attendance(event_id, volunteer_id, highest_confidence):
-                            # Draw green box for successful attendance
-                            color = (0, 255, 0)  # Green
-                            label = f"{volunteer['name']} ({highest_confidence:.1f}%) - Marked!"
-                        else:
-                            # Draw orange box for already marked attendance
-                            color = (0, 165, 255)  # Orange in BGR
-                            label = f"{volunteer['name']} - Already Marked"
-                    else:
-                        # Draw red box for unknown face
-                        color = (0, 0, 255)  # Red
-                        label = "Unknown"
-                    
-                    # Draw box and label on frame
-                    top, right, bottom, left = face_location
-                    cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
-                    cv2.rectangle(frame, (left, bottom - 35), (right, bottom), color, cv2.FILLED)
-                    cv2.putText(frame, label, (left + 6, bottom - 6), 
-                              cv2.FONT_HERSHEY_DUPLEX, 0.6, (255, 255, 255), 1)
-        
-        except Exception as e:
-            print(f"Error processing frame: {str(e)}")
-            # Add error message to frame
-            cv2.putText(frame, f"Error: {str(e)}", (10, 30), 
-                      cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-        
-        try:
-            # Convert frame to JPEG
-            ret, buffer = cv2.imencode('.jpg', frame)
-            if not ret:
-                print("Error: Could not encode frame")
-                continue
-                
-            frame_bytes = buffer.tobytes()
-            
-            # Yield frame for streaming
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-        
-        except Exception as e:
-            print(f"Error streaming frame: {str(e)}")
-            continue
-    
-    # Release webcam
-    cap.release()
+def generate_frames(event_id, camera=0):
+    """Generate frames from a camera or configured frame source with face recognition"""
+    return camera_hub.stream(camera, event_id, STREAM_FPS)
 
 @app.route('/live_attendance')
 def live_attendance():
     """Stream webcam feed with face recognition"""
     event_id = request.args.get('event_id', '1')
-    return Response(generate_frames(event_id),
+    camera = request.args.get('camera', '0')
+    # Only webcam indexes and configured names; never arbitrary paths or URLs
+    if camera.isdigit():
+        camera = int(camera)
+    elif camera not in FRAME_SOURCES:
+        return jsonify({'error': 'Unknown camera'}), 404
+    return Response(generate_frames(event_id, camera),
                    mimetype='multipart/x-mixed-replace; boundary=frame')
 
+@app.route('/live_stats')
+def live_stats():
+    """Queue depth, drop counts and throughput of running live pipelines"""
+    return jsonify(camera_hub.stats())
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Per-stage latency quantiles and recognition counters for Prometheus"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+INVALID_ID_ERROR = 'Volunteer ID must be 1-64 letters, digits, "_" or "-"'
+
+def encode_template_images(image_files):
+    """One registration encoding per uploaded photo, plus the photos themselves"""
+    encodings, images = [], []
+    for image_file in image_files:
+        image_data = image_file.read()
+        with metrics.timer("register", "detect_encode"):
+            face_encoding, _ = process_registration_image(image_data, data_manager.encoding_settings)
+        encodings.append(face_encoding)
+        images.append(image_data)
+    return encodings, images
+
 @app.route('/register_face', methods=['POST'])
 def register_face():
-    """Register a new volunteer with their profile photo"""
+    """Register a new volunteer with their profile photo and optional extra template photos"""
     try:
         if 'image' not in request.files:
             return jsonify({'error': 'No image file provided'}), 400
@@ -146,26 +208,92 @@ def register_face():
         
         if not all([volunteer_id, name, email]):
             return jsonify({'error': 'Missing required fields'}), 400
+        if not is_valid_volunteer_id(volunteer_id):
+            return jsonify({'error': INVALID_ID_ERROR}), 400
+        
+        # Decode once at detection resolution and reuse it for the response image
+        with metrics.timer("register", "decode"):
+            decoded = decode_image(image_data)
         
         # Process the image for face recognition
-        face_encoding, face_location = process_registration_image(image_data)
+        with metrics.timer("register", "detect_encode"):
+            face_encoding, face_location = process_registration_image(decoded, data_manager.encoding_settings)
+        extra_encodings, extra_images = encode_template_images(request.files.getlist('templates'))
+        if 1 + len(extra_encodings) > MAX_FACE_TEMPLATES:
+            return jsonify({'error': f'At most {MAX_FACE_TEMPLATES} photos per volunteer'}), 400
+        
+        # Is this face already registered under another id?
+        duplicates = []
+        if DUPLICATE_POLICY != 'off':
+            with metrics.timer("register", "dedupe"):
+                duplicates = data_manager.find_duplicates([face_encoding, *extra_encodings], DUPLICATE_THRESHOLD)
+            duplicates = [(duplicate_id, confidence) for duplicate_id, confidence in duplicates
+                          if duplicate_id != volunteer_id]
+        duplicate_list = [{'volunteer_id': duplicate_id, 'confidence_score': round(confidence, 2)}
+                          for duplicate_id, confidence in duplicates]
+        if duplicates:
+            metrics.inc("duplicate_faces_total")
+            if DUPLICATE_POLICY == 'reject' and request.form.get('allow_duplicate') not in ('1', 'true'):
+                return jsonify({'error': 'Face already registered', 'duplicates': duplicate_list}), 409
         
         # Store in local storage
-        if not data_manager.register_volunteer(volunteer_id, name, email, face_encoding, image_data):
+        with metrics.timer("register", "store"):
+            registered = data_manager.register_volunteer(volunteer_id, name, email, face_encoding, image_data,
+                                                         extra_encodings, extra_images)
+        if not registered:
             return jsonify({'error': 'Volunteer ID already exists'}), 400
+        if duplicates:
+            data_manager.flag_possible_duplicates(volunteer_id, duplicates)
+            for duplicate_id, confidence in duplicates:
+                data_manager.flag_possible_duplicates(duplicate_id, [(volunteer_id, confidence)])
         
         # Create response image with face box
-        image_array = np.array(Image.open(BytesIO(image_data)))
-        response_image = draw_face_box(image_array, face_location, name)
+        image_array = decoded.array.copy()
+        response_image = draw_face_box(image_array, decoded.to_working_resolution(face_location), name)
         
         # Convert response image to base64
         buffered = BytesIO()
         Image.fromarray(response_image).save(buffered, format="JPEG")
         img_str = base64.b64encode(buffered.getvalue()).decode()
         
-        return jsonify({
+        response = {
             'message': 'Registration successful',
             'image': img_str
+        }
+        if duplicate_list:
+            response['possible_duplicates'] = duplicate_list
+        return jsonify(response)
+    
+    except FaceRecognitionError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/add_templates', methods=['POST'])
+def add_templates():
+    """Enroll more photos of an already registered volunteer"""
+    try:
+        volunteer_id = request.form.get('volunteer_id')
+        image_files = request.files.getlist('image')
+        if not volunteer_id:
+            return jsonify({'error': 'Missing required fields'}), 400
+        if not is_valid_volunteer_id(volunteer_id):
+            return jsonify({'error': INVALID_ID_ERROR}), 400
+        if not image_files:
+            return jsonify({'error': 'No image file provided'}), 400
+        if data_manager.lookup(volunteer_id) is None:
+            return jsonify({'error': 'Volunteer not found'}), 404
+        
+        encodings, images = encode_template_images(image_files)
+        with metrics.timer("register", "store"):
+            added = data_manager.add_volunteer_templates(volunteer_id, encodings, images)
+        if not added:
+            return jsonify({'error': f'At most {MAX_FACE_TEMPLATES} photos per volunteer'}), 400
+        
+        return jsonify({
+            'message': 'Templates added',
+            'template_count': data_manager.template_count(volunteer_id)
         })
     
     except FaceRecognitionError as e:
@@ -174,12 +302,159 @@ def register_face():
         print(f"Error: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/register_bulk', methods=['POST'])
+def register_bulk():
+    """Register many volunteers from a ZIP archive or multipart images plus a CSV manifest"""
+    try:
+        images = {}
+        manifest_data = None
+        
+        if 'archive' in request.files:
+            manifest_data, images = read_zip_batch(request.files['archive'].read())
+        for image_file in request.files.getlist('images'):
+            images[os.path.basename(image_file.filename)] = image_file.read()
+        if 'manifest' in request.files:
+            manifest_data = request.files['manifest'].read()
+        
+        if manifest_data is None:
+            return jsonify({'error': 'No manifest provided'}), 400
+        if not images:
+            return jsonify({'error': 'No images provided'}), 400
+        
+        rows = parse_manifest(manifest_data)
+        duplicate_threshold = DUPLICATE_THRESHOLD if DUPLICATE_POLICY != 'off' else None
+        report = enroll_batch(data_manager, rows, images, BULK_ENROLL_WORKERS,
+                              duplicate_threshold, reject_duplicates=DUPLICATE_POLICY == 'reject')
+        return jsonify(report)
+    
+    except (ValueError, zipfile.BadZipFile) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/process_video', methods=['POST'])
+def process_video_attendance():
+    """Mark attendance for an event from an uploaded recording (e.g. MP4)"""
+    temp_path = None
+    try:
+        if 'video' not in request.files:
+            return jsonify({'error': 'No video provided'}), 400
+        
+        event_id = request.form.get('event_id')
+        if not event_id:
+            return jsonify({'error': 'No event ID provided'}), 400
+        
+        sample_fps = float(request.form.get('sample_fps', VIDEO_SAMPLE_FPS))
+        if sample_fps <= 0:
+            return jsonify({'error': 'sample_fps must be positive'}), 400
+        recorded_at = request.form.get('recorded_at')
+        recorded_at = datetime.fromisoformat(recorded_at) if recorded_at else None
+        
+        # OpenCV reads videos from a path, so spool the upload to disk
+        video_file = request.files['video']
+        suffix = os.path.splitext(video_file.filename or '')[1] or '.mp4'
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+            temp_path = f.name
+            video_file.save(f)
+        
+        result = process_video(temp_path, data_manager.get_gallery(), sample_fps,
+                               VIDEO_WORKERS, MATCH_THRESHOLD)
+        result['marked'] = mark_video_attendance(data_manager, event_id, result, recorded_at)
+        return jsonify(result)
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except FaceRecognitionError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def thumbnail_url(volunteer_id):
+    """URL of a volunteer's thumbnail, used for photo links in attendance logs"""
+    return url_for('volunteer_thumbnail', volunteer_id=volunteer_id)
+
 @app.route('/attendance_logs')
 def get_attendance_logs():
-    """Get attendance logs for an event"""
+    """Get attendance logs for an event.
+    
+    Pass ``since=<seq>`` to receive only records created or improved after
+    that cursor; unchanged polls are answered with 304 via the ETag.
+    """
+    event_id = request.args.get('event_id', '1')
+    since = request.args.get('since', type=int)
+    
+    # Read the event version once, before the logs: the ETag and the cursor both
+    # come from it, so a mark landing mid-request is sent again, never skipped
+    version = data_manager.attendance.event_version(event_id)
+    etag = data_manager.attendance_etag(event_id, since, version)
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers={'ETag': f'"{etag}"'})
+    
+    logs = data_manager.get_attendance_logs(
+        event_id, since,
+        photo_url=thumbnail_url
+    )
+    response = jsonify(logs)
+    response.set_etag(etag)
+    response.headers['X-Attendance-Cursor'] = str(version)
+    return response
+
+def sse_message(data, event=None, event_id=None):
+    """Format one Server-Sent Events message"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+@app.route('/attendance_stream')
+def attendance_stream():
+    """Push attendance records to the client as they are marked (Server-Sent Events)"""
     event_id = request.args.get('event_id', '1')
-    logs = data_manager.get_attendance_logs(event_id)
-    return jsonify(logs)
+    # Browsers send the last seen id when they reconnect; replay what was missed
+    last_seen = request.headers.get('Last-Event-ID', request.args.get('since'))
+    last_seen = int(last_seen) if last_seen and last_seen.isdigit() else None
+    
+    def events():
+        subscription = data_manager.attendance_events.subscribe(event_id)
+        try:
+            yield "retry: 3000\n\n"
+            if last_seen is not None:
+                for log in data_manager.get_attendance_logs(event_id, last_seen, photo_url=thumbnail_url):
+                    yield sse_message(log, "attendance", log["seq"])
+            while True:
+                record = subscription.get(timeout=SSE_HEARTBEAT_SECONDS)
+                if subscription.overflowed:
+                    # Client fell too far behind; tell it to reload the full log
+                    subscription.overflowed = False
+                    yield sse_message({"cursor": data_manager.attendance.event_version(event_id)}, "resync")
+                    continue
+                if record is None:
+                    # Heartbeat keeps proxies from timing out and detects dead clients
+                    yield ": heartbeat\n\n"
+                    continue
+                log = data_manager.get_attendance_log_entry(record, photo_url=thumbnail_url)
+                yield sse_message(log, "attendance", log["seq"])
+        finally:
+            data_manager.attendance_events.unsubscribe(subscription)
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/thumbnails/<volunteer_id>.jpg')
+def volunteer_thumbnail(volunteer_id):
+    """Serve a registered volunteer's small profile thumbnail"""
+    thumbnail_path = data_manager.get_thumbnail_path(volunteer_id)
+    if thumbnail_path is None:
+        return jsonify({'error': 'Thumbnail not found'}), 404
+    return send_file(os.path.abspath(thumbnail_path), mimetype='image/jpeg', max_age=3600)
 
 if __name__ == '__main__':
     app.run(debug=True) 
\ No newline at end of file
@@ -0,0 +1,73 @@
+import queue
+import threading
+from typing import Dict, Optional, Set
+
+class Subscription:
+    """One client's bounded queue of attendance updates for an event.
+
+    If the client falls ``max_queue`` updates behind, queued updates are
+    discarded and ``overflowed`` is set so the client can be told to resync
+    instead of silently missing records or stalling the publisher.
+    """
+
+    def __init__(self, event_id: str, max_queue: int):
+        self.event_id = event_id
+        self.queue: "queue.Queue[Dict]" = queue.Queue(maxsize=max_queue)
+        self.overflowed = False
+        self.dropped = 0
+
+    def put(self, record: Dict):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Slow client: drop its backlog rather than block mark_attendance
+            self.overflowed = True
+            while True:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    break
+            self.dropped += 1
+
+    def get(self, timeout: float) -> Optional[Dict]:
+        """Next update, or None if nothing arrived within ``timeout`` seconds"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+class AttendanceBroker:
+    """In-process pub/sub fanning attendance changes out to live subscribers"""
+
+    def __init__(self, max_queue: int = 100):
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+
+    def subscribe(self, event_id: str) -> Subscription:
+        subscription = Subscription(event_id, self.max_queue)
+        with self._lock:
+            self._subscriptions.setdefault(event_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.event_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.event_id]
+
+    def publish(self, event_id: str, record: Dict):
+        """Deliver a record to every subscriber of the event without blocking"""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(event_id, ()))
+        for subscription in subscriptions:
+            subscription.put(record)
+
+    def subscriber_count(self, event_id: Optional[str] = None) -> int:
+        with self._lock:
+            if event_id is not None:
+                return len(self._subscriptions.get(event_id, ()))
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
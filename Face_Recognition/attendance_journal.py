@@ -0,0 +1,230 @@
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+class AttendanceJournal:
+    """Append-only attendance log with an in-memory per-event index.
+
+    ``snapshot_file`` keeps the original ``{"events": {event_id: [records]}}``
+    layout of ``attendance.json``; every mark after the last snapshot is one
+    JSON line appended to ``journal_file``. On startup the snapshot is loaded
+    and the journal replayed on top of it, so each mark costs one small append
+    regardless of how many events have been recorded.
+
+    By default ``mark`` appends and fsyncs its record before it returns, so
+    every accepted mark is durable. Once the journal holds ``compact_every``
+    records it is folded back into the snapshot.
+
+    With ``write_behind=True`` a mark only updates the in-memory index and
+    queues the record; a background writer appends and fsyncs queued records
+    at least every ``flush_interval`` seconds (sooner once ``fsync_every``
+    records are waiting), so callers never wait on disk I/O and a mark is
+    durable within ``flush_interval`` seconds.
+    """
+
+    def __init__(self, snapshot_file: str, journal_file: str, fsync_every: int = 32,
+                 compact_every: int = 1000, write_behind: bool = False, flush_interval: float = 0.5):
+        self.snapshot_file = snapshot_file
+        self.journal_file = journal_file
+        self.fsync_every = fsync_every
+        self.compact_every = compact_every
+        self.flush_interval = flush_interval
+
+        # _lock guards the in-memory index and queue, _io_lock the journal file
+        self._lock = threading.RLock()
+        self._io_lock = threading.RLock()
+        self._events: Dict[str, Dict[str, Dict]] = {}
+        # Every accepted change gets the next sequence number; clients use it as a cursor
+        self._seq = 0
+        self._event_seq: Dict[str, int] = {}
+        self._journal_records = 0
+        self._unsynced = 0
+        self._pending: List[Dict] = []
+        self._wakeup = threading.Condition(self._lock)
+        self._closing = False
+
+        self._load()
+        self._journal = open(self.journal_file, 'a')
+
+        self._writer = None
+        if write_behind:
+            self._writer = threading.Thread(target=self._writer_loop, name="attendance-writer", daemon=True)
+            self._writer.start()
+
+    def _apply(self, record: Dict) -> bool:
+        """Apply one record to the in-memory index, keeping the best confidence"""
+        event = self._events.setdefault(record["event_id"], {})
+        existing = event.get(record["volunteer_id"])
+        if existing is not None and record["confidence_score"] <= existing["confidence_score"]:
+            return False
+        seq = record.get("seq") or self._seq + 1
+        self._seq = max(self._seq, seq)
+        self._event_seq[record["event_id"]] = max(self._event_seq.get(record["event_id"], 0), seq)
+        event[record["volunteer_id"]] = {
+            "volunteer_id": record["volunteer_id"],
+            "timestamp": record["timestamp"],
+            "confidence_score": record["confidence_score"],
+            "seq": seq
+        }
+        return True
+
+    def _load(self):
+        """Load the snapshot and replay the journal on top of it"""
+        if os.path.exists(self.snapshot_file):
+            with open(self.snapshot_file, 'r') as f:
+                data = json.load(f)
+            for event_id, records in data.get("events", {}).items():
+                self._events.setdefault(event_id, {})
+                for record in records:
+                    self._apply(dict(record, event_id=event_id))
+
+        if os.path.exists(self.journal_file):
+            valid_bytes = 0
+            with open(self.journal_file, 'rb') as f:
+                for line in f:
+                    # A torn final line from a crash is discarded
+                    if not line.endswith(b'\n'):
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    self._apply(record)
+                    self._journal_records += 1
+                    valid_bytes += len(line)
+            if valid_bytes != os.path.getsize(self.journal_file):
+                with open(self.journal_file, 'ab') as f:
+                    f.truncate(valid_bytes)
+
+    def mark(self, event_id: str, volunteer_id: str, confidence_score: float,
+             timestamp: Optional[str] = None) -> bool:
+        """Record attendance; returns True for a first mark or an improved confidence"""
+        with self._lock:
+            existing = self._events.get(event_id, {}).get(volunteer_id)
+            if existing is not None and confidence_score <= existing["confidence_score"]:
+                return False
+
+            record = {
+                "event_id": event_id,
+                "volunteer_id": volunteer_id,
+                "timestamp": timestamp or datetime.utcnow().isoformat(),
+                "confidence_score": confidence_score,
+                "seq": self._seq + 1
+            }
+            self._apply(record)
+            if self._writer is not None:
+                self._pending.append(record)
+                if len(self._pending) >= self.fsync_every:
+                    self._wakeup.notify()
+                return True
+        self._append([record])
+        return True
+
+    def _append(self, records: List[Dict]):
+        """Write records to the journal and make them durable, compacting if it is due"""
+        with self._io_lock:
+            self._journal.write(''.join(json.dumps(record) + '\n' for record in records))
+            self._journal.flush()
+            self._journal_records += len(records)
+            self._unsynced += len(records)
+
+            if self._journal_records >= self.compact_every:
+                self.compact()
+            else:
+                self.sync()
+
+    def _writer_loop(self):
+        while True:
+            with self._lock:
+                if not self._closing and len(self._pending) < self.fsync_every:
+                    self._wakeup.wait(self.flush_interval)
+                closing = self._closing
+            self.flush()
+            if closing:
+                break
+
+    def flush(self):
+        """Write and fsync every queued record"""
+        with self._lock:
+            records, self._pending = self._pending, []
+        if records:
+            self._append(records)
+        self.sync()
+
+    @property
+    def pending(self) -> int:
+        """Number of records queued for the background writer"""
+        with self._lock:
+            return len(self._pending)
+
+    def is_marked(self, event_id: str, volunteer_id: str) -> bool:
+        """Whether a volunteer already has attendance for an event"""
+        with self._lock:
+            return volunteer_id in self._events.get(event_id, {})
+
+    def get_record(self, event_id: str, volunteer_id: str) -> Optional[Dict]:
+        """Current best attendance record for a volunteer at an event"""
+        with self._lock:
+            record = self._events.get(event_id, {}).get(volunteer_id)
+            return dict(record) if record else None
+
+    def get_event(self, event_id: str, since: Optional[int] = None) -> List[Dict]:
+        """Attendance records for an event in first-marked order.
+        
+        With ``since``, only records created or improved after that sequence
+        number are returned, oldest change first.
+        """
+        with self._lock:
+            records = [dict(record) for record in self._events.get(event_id, {}).values()]
+        if since is not None:
+            records = sorted((record for record in records if record["seq"] > since),
+                             key=lambda record: record["seq"])
+        return records
+
+    def event_version(self, event_id: str) -> int:
+        """Sequence number of the latest change to an event (0 if none)"""
+        with self._lock:
+            return self._event_seq.get(event_id, 0)
+
+    def sync(self):
+        """fsync any journal records written since the last sync"""
+        with self._io_lock:
+            if self._unsynced:
+                os.fsync(self._journal.fileno())
+                self._unsynced = 0
+
+    def compact(self):
+        """Fold the journal into a fresh snapshot and truncate it"""
+        with self._io_lock:
+            # Queued records are already in memory, so the snapshot covers them;
+            # writing them to the truncated journal afterwards is harmless.
+            with self._lock:
+                data = {"events": {event_id: [dict(record) for record in records.values()]
+                                   for event_id, records in self._events.items()}}
+            tmp_file = self.snapshot_file + ".tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(data, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.snapshot_file)
+            # Replaying the journal over the new snapshot is idempotent, so a
+            # crash between the replace and the truncate loses nothing.
+            self._journal.truncate(0)
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._journal_records = 0
+            self._unsynced = 0
+
+    def close(self):
+        """Flush queued records, stop the writer and close the journal file"""
+        with self._lock:
+            self._closing = True
+            self._wakeup.notify()
+        if self._writer is not None:
+            self._writer.join()
+        with self._io_lock:
+            if not self._journal.closed:
+                self.flush()
+                self._journal.close()
@@ -0,0 +1,309 @@
+"""Offline, CPU-only benchmark of the recognition service.
+
+Measures gallery matching (exact and IVF) on synthetic galleries,
+DataManager operations, process_attendance_image on real images, and a
+replay of a recorded video, image directory or recorded live session
+through the live FrameRecognizer. Everything is written to one JSON report so runs can be
+diffed against each other.
+
+Usage:
+    python benchmark.py --sizes 100,1000,10000,100000 --images samples/ --output report.json
+    python benchmark.py --video event.mp4 --output report.json
+    python benchmark.py --session sessions/event1 --output report.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+import cv2
+import numpy as np
+from PIL import Image
+from data_manager import DataManager
+from face_gallery import FaceGallery, TemplateGallery
+from face_quality import QualityGate
+from face_index import IVFIndex
+from face_utils import process_attendance_image, FaceRecognitionError
+from frame_source import FrameSource, VideoFileSource, ImageDirectorySource, RecordedSessionSource
+from live_pipeline import FrameRecognizer
+from metrics import metrics
+from synthetic_data import synthetic_encodings, probe_queries
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+def summarize(samples: List[float], items: int = 1) -> Dict:
+    """Latency quantiles (ms) and throughput for a list of per-call durations (s)"""
+    if not samples:
+        return {"count": 0}
+    values = np.asarray(samples)
+    p50, p95, p99 = np.quantile(values, (0.5, 0.95, 0.99)) * 1000
+    return {
+        "count": len(values),
+        "mean_ms": round(float(values.mean() * 1000), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "per_second": round(len(values) * items / float(values.sum()), 2) if values.sum() else None,
+    }
+
+def measure(fn: Callable, repeat: int, items: int = 1) -> Dict:
+    """Call ``fn`` ``repeat`` times and summarize the durations"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples, items)
+
+def timed(fn: Callable):
+    """Result of ``fn()`` and how long it took in milliseconds"""
+    started = time.perf_counter()
+    result = fn()
+    return result, round((time.perf_counter() - started) * 1000, 3)
+
+def bench_matching(size: int, queries: int, batch: int, nprobe: int, rng: np.random.Generator) -> Dict:
+    """Exact and IVF search latency, throughput and recall on one synthetic gallery"""
+    encodings = synthetic_encodings(size, rng)
+    ids = [str(i) for i in range(size)]
+    query_vectors, answers = probe_queries(encodings, queries, rng)
+    answers = [str(row) for row in answers]
+
+    exact = FaceGallery()
+    _, build_ms = timed(lambda: exact.set_encodings(ids, encodings))
+    result = {"exact": {
+        "build_ms": build_ms,
+        "single": measure(lambda: exact.search(query_vectors[:1]), queries),
+        "batch": measure(lambda: exact.search(query_vectors[:batch]), max(1, queries // batch), batch),
+        "recall_at_1": recall(exact, query_vectors, answers),
+    }}
+
+    ivf = IVFIndex(nprobe=nprobe, min_train_size=min(1024, size))
+    _, build_ms = timed(lambda: ivf.add_many(ids, encodings))
+    result["ivf"] = {
+        "build_ms": build_ms,
+        "n_lists": ivf.n_lists,
+        "nprobe": nprobe,
+        "single": measure(lambda: ivf.search(query_vectors[:1]), queries),
+        "batch": measure(lambda: ivf.search(query_vectors[:batch]), max(1, queries // batch), batch),
+        "recall_at_1": recall(ivf, query_vectors, answers),
+    }
+    return result
+
+def recall(index, queries: np.ndarray, answers: List[str]) -> float:
+    hits = sum(1 for neighbours, answer in zip(index.search(queries), answers)
+               if neighbours and neighbours[0][0] == answer)
+    return round(hits / len(answers), 4)
+
+def bench_templates(size: int, templates: int, queries: int, shortlist: int, rng: np.random.Generator) -> Dict:
+    """Multi-template matching with the centroid pre-filter vs. scanning every template"""
+    centres = synthetic_encodings(size, rng)
+    encodings = np.repeat(centres, templates, axis=0) + rng.normal(scale=0.05, size=(size * templates, centres.shape[1]))
+    ids = [str(i) for i in np.repeat(np.arange(size), templates)]
+    query_vectors, answers = probe_queries(encodings, queries, rng)
+    answers = [ids[row] for row in answers]
+
+    flat = FaceGallery()
+    flat.set_encodings(ids, encodings)
+    single = FaceGallery()
+    single.set_encodings([str(i) for i in range(size)], encodings[::templates])
+    gallery = TemplateGallery(shortlist=shortlist)
+    _, build_ms = timed(lambda: gallery.set_encodings(ids, encodings))
+    return {
+        "templates_per_volunteer": templates,
+        "one_per_volunteer": measure(lambda: single.search(query_vectors[:1]), queries),
+        "all_templates_flat": measure(lambda: flat.search(query_vectors[:1]), queries),
+        "centroid_prefilter": dict(measure(lambda: gallery.search(query_vectors[:1]), queries),
+                                   build_ms=build_ms, shortlist=shortlist),
+        "recall_at_1": {"one_per_volunteer": recall(single, query_vectors, answers),
+                        "all_templates_flat": recall(flat, query_vectors, answers),
+                        "centroid_prefilter": recall(gallery, query_vectors, answers)},
+    }
+
+def placeholder_photo() -> bytes:
+    buffered = io.BytesIO()
+    Image.fromarray(np.full((160, 160, 3), 128, dtype=np.uint8)).save(buffered, format="JPEG")
+    return buffered.getvalue()
+
+def bench_data_manager(size: int, marks: int, rng: np.random.Generator) -> Dict:
+    """Registration, cold/warm gallery loads and attendance operations in a temp data dir"""
+    data_dir = tempfile.mkdtemp(prefix="face-bench-")
+    try:
+        data_manager = DataManager(data_dir)
+        photo = placeholder_photo()
+        encodings = synthetic_encodings(size, rng)
+        volunteers = [(str(i), f"Volunteer {i}", f"v{i}@example.org", encoding, photo)
+                      for i, encoding in enumerate(encodings)]
+        _, bulk_ms = timed(lambda: data_manager.register_volunteers_bulk(volunteers))
+        single = measure(lambda: data_manager.register_volunteer(
+            f"extra-{time.perf_counter_ns()}", "Extra", "extra@example.org", synthetic_encodings(1, rng)[0], photo), 20)
+
+        def cold_gallery():
+            data_manager.invalidate_cache()
+            return data_manager.get_gallery()
+
+        volunteer_ids = [str(i) for i in rng.integers(size, size=marks)]
+        marks_iter = iter(volunteer_ids)
+        result = {
+            "register_bulk_ms": bulk_ms,
+            "register_single": single,
+            "get_gallery_cold": measure(cold_gallery, 5),
+            "get_gallery_warm": measure(data_manager.get_gallery, 100),
+            "get_volunteer": measure(lambda: data_manager.get_volunteer(volunteer_ids[0]), 100),
+            "lookup": measure(lambda: data_manager.lookup(volunteer_ids[0]), 1000),
+            "mark_attendance": measure(lambda: data_manager.mark_attendance(
+                "bench", next(marks_iter), float(rng.uniform(90, 100))), marks),
+            "get_attendance_logs": measure(lambda: data_manager.get_attendance_logs("bench"), 20),
+        }
+        data_manager.close()
+        return result
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+def image_files(directory: str) -> List[str]:
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.lower().endswith(IMAGE_EXTENSIONS))
+
+def bench_attendance_images(directory: str, quality_gate: Optional[QualityGate] = None) -> Dict:
+    """process_attendance_image latency over every image in a directory"""
+    samples, faces, failed = [], 0, 0
+    low_quality = []
+    for path in image_files(directory):
+        with open(path, 'rb') as f:
+            image_data = f.read()
+        started = time.perf_counter()
+        try:
+            face_encodings, _ = process_attendance_image(image_data, quality_gate, low_quality)
+            faces += len(face_encodings)
+        except FaceRecognitionError:
+            failed += 1
+        samples.append(time.perf_counter() - started)
+    return dict(summarize(samples), faces=faces, low_quality_faces=len(low_quality), images_without_faces=failed)
+
+def replay_frames(source: FrameSource, limit: int) -> Iterator[np.ndarray]:
+    """Up to ``limit`` BGR frames from a frame source, in order"""
+    if not source.open():
+        return
+    try:
+        count = 0
+        while count < limit:
+            success, frame = source.read()
+            if not success:
+                break
+            count += 1
+            yield frame
+    finally:
+        source.release()
+
+def bench_replay(frames: Iterator[np.ndarray], gallery_size: int, detect_interval: int,
+                 rng: np.random.Generator, quality_gate: Optional[QualityGate] = None) -> Dict:
+    """Run recorded frames through the live FrameRecognizer and JPEG encoding"""
+    data_dir = tempfile.mkdtemp(prefix="face-bench-")
+    try:
+        data_manager = DataManager(data_dir)
+        photo = placeholder_photo()
+        data_manager.register_volunteers_bulk([
+            (str(i), f"Volunteer {i}", f"v{i}@example.org", encoding, photo)
+            for i, encoding in enumerate(synthetic_encodings(gallery_size, rng))
+        ])
+        recognizer = FrameRecognizer(data_manager, "replay", detect_interval, quality_gate=quality_gate)
+        metrics.reset()
+        samples = []
+        for frame in frames:
+            started = time.perf_counter()
+            annotated = recognizer.process(frame)
+            with metrics.timer("live", "jpeg"):
+                cv2.imencode('.jpg', annotated)
+            samples.append(time.perf_counter() - started)
+        data_manager.close()
+        snapshot = metrics.snapshot()
+        result = {"frames": summarize(samples), "stages": snapshot["stages"], "counters": snapshot["counters"]}
+        if quality_gate is not None:
+            result["face_quality"] = quality_gate.stats()
+        return result
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+def environment() -> Dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the face recognition service offline")
+    parser.add_argument('--sizes', default='100,1000,10000,100000',
+                        help='Comma-separated synthetic gallery sizes (default: 100,1000,10000,100000)')
+    parser.add_argument('--queries', type=int, default=200, help='Match queries per gallery size (default: 200)')
+    parser.add_argument('--batch', type=int, default=32, help='Faces per batched match (default: 32)')
+    parser.add_argument('--nprobe', type=int, default=8, help='IVF lists probed per query (default: 8)')
+    parser.add_argument('--templates', type=int, default=0,
+                        help='Also benchmark N templates per volunteer with the centroid pre-filter')
+    parser.add_argument('--shortlist', type=int, default=8, help='Volunteers compared template by template (default: 8)')
+    parser.add_argument('--dm-size', type=int, default=1000, help='Volunteers for DataManager benchmarks (default: 1000)')
+    parser.add_argument('--marks', type=int, default=1000, help='Attendance marks to time (default: 1000)')
+    parser.add_argument('--images', default=None, help='Directory of images for process_attendance_image and replay')
+    parser.add_argument('--video', default=None, help='Recorded video to replay through the live recognizer')
+    parser.add_argument('--session', default=None, help='Session recorded with frame_source.py to replay')
+    parser.add_argument('--realtime', action='store_true',
+                        help='Replay at the recorded speed instead of as fast as possible')
+    parser.add_argument('--max-frames', type=int, default=300, help='Frames to replay (default: 300)')
+    parser.add_argument('--detect-interval', type=int, default=5, help='Live detection interval for replay (default: 5)')
+    parser.add_argument('--quality-gate', action='store_true', help='Skip low-quality faces before encoding')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for synthetic data (default: 0)')
+    parser.add_argument('--output', default=None, help='Write the JSON report here (default: stdout)')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    report = {
+        "created_at": datetime.utcnow().isoformat(),
+        "environment": environment(),
+        "config": vars(args),
+        "matching": {},
+    }
+    for size in sizes:
+        print(f"Matching: {size} encodings", file=sys.stderr)
+        report["matching"][str(size)] = bench_matching(size, args.queries, args.batch, args.nprobe, rng)
+        if args.templates > 1:
+            report["matching"][str(size)]["templates"] = bench_templates(
+                size, args.templates, args.queries, args.shortlist, rng)
+
+    print(f"DataManager: {args.dm_size} volunteers", file=sys.stderr)
+    report["data_manager"] = bench_data_manager(args.dm_size, args.marks, rng)
+
+    if args.images:
+        print("process_attendance_image", file=sys.stderr)
+        gate = QualityGate() if args.quality_gate else None
+        report["attendance_images"] = bench_attendance_images(args.images, gate)
+    if args.video or args.images or args.session:
+        print("Replaying frames through the live recognizer", file=sys.stderr)
+        speed = 1.0 if args.realtime else 0
+        if args.session:
+            source = RecordedSessionSource(args.session, speed)
+        elif args.video:
+            source = VideoFileSource(args.video, speed)
+        else:
+            source = ImageDirectorySource(args.images, fps=10.0 * speed)
+        frames = replay_frames(source, args.max_frames)
+        gate = QualityGate() if args.quality_gate else None
+        report["replay"] = bench_replay(frames, args.dm_size, args.detect_interval, rng, gate)
+
+    output = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
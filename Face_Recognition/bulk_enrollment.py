@@ -0,0 +1,167 @@
+import csv
+import io
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from face_utils import process_registration_image, FaceRecognitionError, EncodingSettings, DEFAULT_ENCODING_SETTINGS
+from dedupe_gallery import duplicate_pairs
+from metrics import metrics
+from data_manager import is_valid_volunteer_id
+
+MANIFEST_NAME = "manifest.csv"
+REQUIRED_COLUMNS = ("volunteer_id", "name", "email")
+
+def parse_manifest(manifest_data: bytes) -> List[Dict]:
+    """Parse a CSV manifest with volunteer_id, name, email and an optional image column.
+
+    Raises ValueError if a row has a volunteer id that ``is_valid_volunteer_id`` rejects.
+    """
+    text = manifest_data.decode('utf-8-sig')
+    reader = csv.DictReader(io.StringIO(text))
+    columns = [column.strip() for column in reader.fieldnames or []]
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing:
+        raise ValueError(f"Manifest is missing columns: {', '.join(missing)}")
+    rows = []
+    for number, row in enumerate(reader, start=1):
+        row = {(key or "").strip(): (value or "").strip() for key, value in row.items()}
+        if row.get("volunteer_id") and not is_valid_volunteer_id(row["volunteer_id"]):
+            raise ValueError(f"Invalid volunteer ID on manifest row {number}: "
+                             f"use 1-64 letters, digits, '_' or '-'")
+        rows.append(row)
+    return rows
+
+def read_zip_batch(zip_data: bytes) -> Tuple[Optional[bytes], Dict[str, bytes]]:
+    """Return the manifest (if the archive has one) and images keyed by base name"""
+    images = {}
+    manifest = None
+    with zipfile.ZipFile(io.BytesIO(zip_data)) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            name = os.path.basename(info.filename)
+            if name.lower() == MANIFEST_NAME:
+                manifest = archive.read(info)
+            elif name.lower().endswith(('.jpg', '.jpeg', '.png')):
+                images[name] = archive.read(info)
+    return manifest, images
+
+def find_image(row: Dict, images: Dict[str, bytes]) -> Optional[bytes]:
+    """Image for a manifest row: the ``image`` column, or ``<volunteer_id>.jpg/.jpeg/.png``"""
+    if row.get("image"):
+        return images.get(os.path.basename(row["image"]))
+    for extension in ('.jpg', '.jpeg', '.png'):
+        image = images.get(f"{row['volunteer_id']}{extension}")
+        if image is not None:
+            return image
+    return None
+
+def _encode_image(image_data: bytes, settings: EncodingSettings = DEFAULT_ENCODING_SETTINGS
+                  ) -> Tuple[Optional[np.ndarray], Optional[str]]:
+    """Worker: detect and encode the single face in one registration image"""
+    try:
+        face_encoding, _ = process_registration_image(image_data, settings)
+        return face_encoding, None
+    except FaceRecognitionError as e:
+        return None, str(e)
+    except Exception as e:
+        return None, f"Failed to process image: {str(e)}"
+
+def find_batch_duplicates(data_manager, volunteer_ids: List[str], encodings: np.ndarray,
+                          min_confidence: float) -> List[List[Tuple[str, float]]]:
+    """Per batch entry, registered volunteers and earlier batch entries with the same face"""
+    duplicates: List[List[Tuple[str, float]]] = [[] for _ in volunteer_ids]
+    gallery = data_manager.get_gallery()
+    if len(gallery):
+        for position, matches in enumerate(gallery.match(encodings, top_k=3, min_confidence=min_confidence)):
+            duplicates[position] = [match for match in matches if match[0] != volunteer_ids[position]]
+    positions = {volunteer_id: position for position, volunteer_id in enumerate(volunteer_ids)}
+    for id_a, id_b, distance in duplicate_pairs(volunteer_ids, encodings, 1 - min_confidence / 100):
+        first, second = sorted((positions[id_a], positions[id_b]))
+        duplicates[second].append((volunteer_ids[first], (1 - distance) * 100))
+    return duplicates
+
+def enroll_batch(data_manager, rows: List[Dict], images: Dict[str, bytes],
+                 max_workers: Optional[int] = None, duplicate_threshold: Optional[float] = None,
+                 reject_duplicates: bool = True) -> Dict:
+    """Encode every manifest row across a process pool and register them in one write.
+
+    With ``duplicate_threshold`` set, faces matching a registered volunteer or an
+    earlier row of the batch are rejected, or registered and flagged when
+    ``reject_duplicates`` is False.
+
+    Returns a per-row report: ``{"registered": n, "failed": m, "results": [...]}``.
+    """
+    results = [{"row": number, "volunteer_id": row.get("volunteer_id", ""), "status": "pending"}
+               for number, row in enumerate(rows, start=1)]
+    jobs = []
+    seen_ids = set()
+    for result, row in zip(results, rows):
+        if not all(row.get(column) for column in REQUIRED_COLUMNS):
+            result.update(status="error", error="Missing required fields")
+        elif row["volunteer_id"] in seen_ids:
+            result.update(status="error", error="Duplicate volunteer ID in batch")
+        else:
+            image_data = find_image(row, images)
+            if image_data is None:
+                result.update(status="error", error="Image not found")
+            else:
+                seen_ids.add(row["volunteer_id"])
+                jobs.append((result, row, image_data))
+
+    # Detection and encoding are CPU-bound, so fan them out across processes
+    encoded = []
+    if jobs:
+        workers = max_workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(1, len(jobs) // (4 * workers))
+            outcomes = executor.map(_encode_image, [image_data for _, _, image_data in jobs],
+                                    repeat(data_manager.encoding_settings), chunksize=chunksize)
+            for (result, row, image_data), (face_encoding, error) in zip(jobs, outcomes):
+                if error:
+                    result.update(status="error", error=error)
+                else:
+                    encoded.append((result, row, face_encoding, image_data))
+
+    duplicates: Dict[str, List[Tuple[str, float]]] = {}
+    if duplicate_threshold is not None and encoded:
+        volunteer_ids = [row["volunteer_id"] for _, row, _, _ in encoded]
+        found = find_batch_duplicates(data_manager, volunteer_ids,
+                                      np.stack([face_encoding for _, _, face_encoding, _ in encoded]),
+                                      duplicate_threshold)
+        metrics.inc("duplicate_faces_total", sum(1 for matches in found if matches))
+        kept = []
+        for entry, matches in zip(encoded, found):
+            result, row = entry[0], entry[1]
+            if matches and reject_duplicates:
+                result.update(status="error", error="Face already registered",
+                              duplicates=[duplicate_id for duplicate_id, _ in matches])
+                continue
+            if matches:
+                duplicates[row["volunteer_id"]] = matches
+            kept.append(entry)
+        encoded = kept
+
+    # Commit every successful encoding to the store in one write
+    errors = data_manager.register_volunteers_bulk([
+        (row["volunteer_id"], row["name"], row["email"], face_encoding, image_data)
+        for _, row, face_encoding, image_data in encoded
+    ])
+    for result, row, _, _ in encoded:
+        error = errors.get(row["volunteer_id"])
+        if error:
+            result.update(status="error", error=error)
+        else:
+            result["status"] = "registered"
+            matches = duplicates.get(row["volunteer_id"])
+            if matches:
+                result["possible_duplicates"] = [duplicate_id for duplicate_id, _ in matches]
+                data_manager.flag_possible_duplicates(row["volunteer_id"], matches)
+                for duplicate_id, confidence in matches:
+                    data_manager.flag_possible_duplicates(duplicate_id, [(row["volunteer_id"], confidence)])
+
+    registered = sum(1 for result in results if result["status"] == "registered")
+    return {"registered": registered, "failed": len(results) - registered, "results": results}
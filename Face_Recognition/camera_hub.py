@@ -0,0 +1,103 @@
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from live_pipeline import LiveAttendancePipeline
+
+class _HubEntry:
+    """One camera/event slot; ``ready`` is set once its pipeline started (or failed to)"""
+
+    def __init__(self):
+        self.pipeline: Optional[LiveAttendancePipeline] = None
+        self.subscribers = 0
+        self.ready = threading.Event()
+
+class CameraHub:
+    """Process-wide registry that shares one live pipeline per camera/event.
+
+    Every viewer of the same camera and event subscribes to the same
+    ``LiveAttendancePipeline``: the camera is opened once, recognition runs
+    once, and each annotated frame is JPEG-encoded once and handed to every
+    MJPEG subscriber. The pipeline stops when its last subscriber disconnects.
+    """
+
+    def __init__(self, pipeline_factory: Callable[[int, str], LiveAttendancePipeline]):
+        self.pipeline_factory = pipeline_factory
+        # Guards the registry only; pipelines are started and stopped outside it,
+        # so a slow camera never blocks viewers of other cameras
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[int, str], _HubEntry] = {}
+
+    def subscribe(self, camera: int, event_id: str) -> Optional[LiveAttendancePipeline]:
+        """Join (starting if needed) the pipeline for a camera/event"""
+        key = (camera, event_id)
+        stale = None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.ready.is_set() and not entry.pipeline.running:
+                # The previous pipeline died with its camera
+                stale = entry.pipeline
+                entry = None
+            starting = entry is None
+            if starting:
+                # Reserve the slot; later viewers wait for this start to finish
+                entry = _HubEntry()
+                self._entries[key] = entry
+            entry.subscribers += 1
+        if stale is not None:
+            stale.stop()
+        if not starting:
+            entry.ready.wait()
+            return entry.pipeline
+
+        pipeline = None
+        try:
+            pipeline = self.pipeline_factory(camera, event_id)
+            if not pipeline.start():
+                pipeline = None
+        finally:
+            if pipeline is None:
+                with self._lock:
+                    if self._entries.get(key) is entry:
+                        del self._entries[key]
+            entry.pipeline = pipeline
+            entry.ready.set()
+        return pipeline
+
+    def unsubscribe(self, camera: int, event_id: str, pipeline: LiveAttendancePipeline):
+        """Leave a pipeline, stopping it when nobody is watching anymore"""
+        key = (camera, event_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.pipeline is pipeline:
+                entry.subscribers -= 1
+                if entry.subscribers > 0:
+                    return
+                del self._entries[key]
+            # Otherwise it was already replaced; just make sure the old one is down
+        pipeline.stop()
+
+    def stream(self, camera: int, event_id: str, fps: float) -> Iterator[bytes]:
+        """MJPEG parts for one subscriber; unsubscribes when the client goes away"""
+        pipeline = self.subscribe(camera, event_id)
+        if pipeline is None:
+            return
+        try:
+            yield from pipeline.stream(fps)
+        finally:
+            self.unsubscribe(camera, event_id, pipeline)
+
+    def stats(self) -> List[Dict]:
+        """Pipeline stats plus subscriber counts for every active camera/event"""
+        with self._lock:
+            active = [(entry.pipeline, entry.subscribers) for entry in self._entries.values()
+                      if entry.pipeline is not None]
+        return [dict(pipeline.stats(), subscribers=subscribers) for pipeline, subscribers in active]
+
+    def stop_all(self):
+        """Stop every pipeline regardless of subscribers"""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            entry.ready.wait()
+            if entry.pipeline is not None:
+                entry.pipeline.stop()
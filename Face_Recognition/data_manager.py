@@ -1,20 +1,93 @@
 import json
 import os
-import base64
+import re
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import threading
 import numpy as np
-from face_utils import encode_to_bytes, bytes_to_encoding
+from face_utils import bytes_to_encoding, make_thumbnail, EncodingSettings
+from face_gallery import build_exact_gallery
+from face_index import FaceIndex, IVFIndex
+from encoding_store import (
+    EncodingStore, StoreLock, gallery_version_dir, active_gallery_version, set_active_gallery_version,
+    read_version_info, GALLERY_POINTER, DEFAULT_VERSION
+)
+from attendance_journal import AttendanceJournal
+from attendance_events import AttendanceBroker
 import shutil
 
+# Volunteer ids name files and directories, so only this charset is accepted
+VOLUNTEER_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+def is_valid_volunteer_id(volunteer_id) -> bool:
+    """True if ``volunteer_id`` is 1-64 letters, digits, ``_`` or ``-``"""
+    return isinstance(volunteer_id, str) and VOLUNTEER_ID_PATTERN.fullmatch(volunteer_id) is not None
+
+class VolunteerRecord(dict):
+    """Volunteer dict that reads ``image_data`` from disk only when it is accessed"""
+
+    def __missing__(self, key):
+        if key == "image_data" and "image_path" in self:
+            with open(self["image_path"], 'rb') as f:
+                return f.read()
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except (KeyError, OSError):
+            return default
+
 class DataManager:
-    def __init__(self):
-        self.data_dir = "data"
+    def __init__(self, data_dir: str = "data", index_backend: str = "exact", index_options: Optional[Dict] = None,
+                 attendance_flush_interval: Optional[float] = None, gallery_dtype: str = "float64",
+                 gallery_rerank: int = 0, max_templates: int = 10, template_shortlist: int = 8):
+        self.data_dir = data_dir
         self.volunteers_dir = os.path.join(self.data_dir, "volunteers")
         self.faces_dir = os.path.join(self.volunteers_dir, "faces")
+        self.thumbnails_dir = os.path.join(self.volunteers_dir, "thumbnails")
+        # Photos of extra templates: templates/<volunteer_id>/<n>.jpg
+        self.templates_dir = os.path.join(self.volunteers_dir, "templates")
+        self.gallery_pointer_file = os.path.join(self.volunteers_dir, GALLERY_POINTER)
+        self.gallery_version = active_gallery_version(self.volunteers_dir)
+        self.encodings_dir = gallery_version_dir(self.volunteers_dir, self.gallery_version)
         self.events_dir = os.path.join(self.data_dir, "events")
         self.volunteers_file = os.path.join(self.volunteers_dir, "volunteers.json")
         self.attendance_file = os.path.join(self.events_dir, "attendance.json")
+        self.attendance_journal_file = os.path.join(self.events_dir, "attendance.jsonl")
+        
+        # Matching backend: "exact" (FaceGallery) or "ivf" (approximate IVFIndex)
+        if index_backend not in ("exact", "ivf"):
+            raise ValueError(f"Unknown index backend '{index_backend}'")
+        self.index_backend = index_backend
+        self.index_options = index_options or {}
+        self._ann_index: Optional[IVFIndex] = None
+        # In-memory gallery representation: "float64", "float32" or "int8"
+        # (int8 optionally re-ranks its top ``gallery_rerank`` candidates exactly)
+        if gallery_dtype not in ("float64", "float32", "int8"):
+            raise ValueError(f"Unknown gallery dtype '{gallery_dtype}'")
+        if gallery_dtype == "int8" and index_backend == "ivf":
+            raise ValueError("The int8 gallery is only available with the exact index backend")
+        self.gallery_dtype = gallery_dtype
+        self.gallery_rerank = gallery_rerank
+        # Volunteers may enroll up to ``max_templates`` encodings; matching compares
+        # per-volunteer centroids first and only the ``template_shortlist`` closest
+        # volunteers (plus any the centroid bound cannot rule out) template by template
+        self.max_templates = max_templates
+        self.template_shortlist = template_shortlist
+        # When set, attendance writes go through a background write-behind queue
+        self.attendance_flush_interval = attendance_flush_interval
+        
+        # Cached volunteer snapshot, invalidated by version bumps or file changes
+        self._lock = threading.RLock()
+        self._version = 0
+        self._cache_key = None
+        self._volunteers_cache: List[Tuple[str, VolunteerRecord]] = []
+        self._volunteers_by_id: Dict[str, VolunteerRecord] = {}
+        self._legacy_count = 0
+        self._gallery_cache: Optional[FaceIndex] = None
+        # Serializes encoding writes and gallery switches with other processes
+        self.store_lock = StoreLock(self.volunteers_dir)
         
         # Create directories if they don't exist
         os.makedirs(self.faces_dir, exist_ok=True)
@@ -22,6 +95,88 @@ class DataManager:
         
         # Initialize JSON files if they don't exist
         self._init_json_files()
+        self.encoding_store = EncodingStore(self.encodings_dir)
+        self._pointer_stamp = self._gallery_pointer_stamp()
+        self.attendance = self._open_attendance_journal()
+        # Live subscribers (e.g. the SSE stream) are notified of every attendance change
+        self.attendance_events = AttendanceBroker()
+    
+    def _open_attendance_journal(self) -> AttendanceJournal:
+        if self.attendance_flush_interval is None:
+            return AttendanceJournal(self.attendance_file, self.attendance_journal_file)
+        return AttendanceJournal(self.attendance_file, self.attendance_journal_file,
+                                 write_behind=True, flush_interval=self.attendance_flush_interval)
+    
+    @property
+    def ann_index_file(self) -> str:
+        return os.path.join(self.encodings_dir, "ivf_index.npz")
+    
+    @property
+    def encoding_settings(self) -> EncodingSettings:
+        """Settings new registrations must be encoded with to match the live gallery version"""
+        info = read_version_info(self.encodings_dir) or {}
+        return EncodingSettings(**info.get("settings", {}))
+    
+    def _gallery_pointer_stamp(self) -> Tuple[int, int]:
+        try:
+            stat = os.stat(self.gallery_pointer_file)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return 0, 0
+    
+    def _check_gallery_version(self):
+        """Switch to another gallery version if the pointer was moved (e.g. by reencode_gallery.py)"""
+        stamp = self._gallery_pointer_stamp()
+        if stamp == self._pointer_stamp:
+            return
+        self._pointer_stamp = stamp
+        version = active_gallery_version(self.volunteers_dir)
+        if version == self.gallery_version:
+            return
+        self.gallery_version = version
+        self.encodings_dir = gallery_version_dir(self.volunteers_dir, version)
+        self.encoding_store = EncodingStore(self.encodings_dir)
+        self._ann_index = None
+        self._version += 1
+    
+    def activate_gallery_version(self, version: str) -> bool:
+        """Make a completely built gallery version live for every process using this data dir"""
+        with self._lock, self.store_lock:
+            directory = gallery_version_dir(self.volunteers_dir, version)
+            info = read_version_info(directory)
+            if version != DEFAULT_VERSION and not (info and info.get("completed_at")):
+                return False
+            set_active_gallery_version(self.volunteers_dir, version)
+            self._check_gallery_version()
+            return True
+    
+    def volunteer_image_paths(self, volunteer_id: str, image_path: Optional[str] = None) -> List[str]:
+        """Profile photo followed by the photos of any extra templates, in enrollment order"""
+        paths = [image_path or os.path.join(self.faces_dir, f"{volunteer_id}.jpg")]
+        template_dir = os.path.join(self.templates_dir, volunteer_id)
+        if os.path.isdir(template_dir):
+            names = sorted((name for name in os.listdir(template_dir) if name.endswith('.jpg')),
+                           key=lambda name: int(os.path.splitext(name)[0]))
+            paths.extend(os.path.join(template_dir, name) for name in names)
+        return paths
+    
+    def _save_template_images(self, volunteer_id: str, images: Sequence[bytes]) -> List[str]:
+        if not is_valid_volunteer_id(volunteer_id):
+            raise ValueError(f"Invalid volunteer ID {volunteer_id!r}")
+        template_dir = os.path.join(self.templates_dir, volunteer_id)
+        os.makedirs(template_dir, exist_ok=True)
+        start = len(self.volunteer_image_paths(volunteer_id)) - 1
+        paths = []
+        for number, image_data in enumerate(images, start=start + 1):
+            path = os.path.join(template_dir, f"{number}.jpg")
+            with open(path, 'wb') as f:
+                f.write(image_data)
+            paths.append(path)
+        return paths
+    
+    def close(self):
+        """Flush pending attendance writes and close the journal"""
+        self.attendance.close()
     
     def _init_json_files(self):
         """Initialize JSON files with empty data structures if they don't exist"""
@@ -34,8 +189,24 @@ class DataManager:
             with open(self.attendance_file, 'w') as f:
                 json.dump({"events": {}}, f)
     
-    def register_volunteer(self, volunteer_id: str, name: str, email: str, face_encoding: np.ndarray, image_data: bytes) -> bool:
-        """Register a new volunteer with their face encoding and photo"""
+    def register_volunteer(self, volunteer_id: str, name: str, email: str, face_encoding: np.ndarray, image_data: bytes,
+                           extra_encodings: Sequence[np.ndarray] = (), extra_images: Sequence[bytes] = ()) -> bool:
+        """Register a new volunteer with their face encoding and photo.
+        
+        ``extra_encodings`` are further templates of the same face, made from
+        ``extra_images``; at most ``max_templates`` encodings are kept in total.
+        Returns False for ids that are not ``is_valid_volunteer_id``.
+        """
+        if not is_valid_volunteer_id(volunteer_id):
+            print(f"Error registering volunteer: invalid volunteer ID {volunteer_id!r}")
+            return False
+        with self._lock, self.store_lock:
+            self._check_gallery_version()
+            return self._register_volunteer(volunteer_id, name, email, face_encoding, image_data,
+                                            extra_encodings, extra_images)
+    
+    def _register_volunteer(self, volunteer_id: str, name: str, email: str, face_encoding: np.ndarray, image_data: bytes,
+                            extra_encodings: Sequence[np.ndarray] = (), extra_images: Sequence[bytes] = ()) -> bool:
         try:
             # Load existing volunteers
             with open(self.volunteers_file, 'r') as f:
@@ -49,22 +220,23 @@ class DataManager:
             image_path = os.path.join(self.faces_dir, f"{volunteer_id}.jpg")
             with open(image_path, 'wb') as f:
                 f.write(image_data)
+            self._save_thumbnail(volunteer_id, image_data)
             
-            # Add volunteer data with proper base64 padding
-            encoding_bytes = face_encoding.tobytes()
-            encoding_base64 = base64.b64encode(encoding_bytes).decode('utf-8')
+            # Face encodings live in the binary encoding store, not in the JSON
+            templates = [face_encoding, *extra_encodings][:self.max_templates]
+            self._save_template_images(volunteer_id, list(extra_images)[:len(templates) - 1])
+            self.encoding_store.append_many([volunteer_id] * len(templates), np.stack(templates))
             
             data["volunteers"][volunteer_id] = {
                 "name": name,
                 "email": email,
-                "face_encoding": encoding_base64,
                 "image_path": image_path,
                 "created_at": datetime.utcnow().isoformat()
             }
             
             # Save updated data
-            with open(self.volunteers_file, 'w') as f:
-                json.dump(data, f, indent=4)
+            self._write_volunteers(data)
+            self.invalidate_cache()
             
             return True
         
@@ -73,143 +245,469 @@ class DataManager:
             # Clean up any partially created files
             if 'image_path' in locals() and os.path.exists(image_path):
                 os.remove(image_path)
+            shutil.rmtree(os.path.join(self.templates_dir, volunteer_id), ignore_errors=True)
+            if volunteer_id in self.encoding_store.rows_by_id():
+                self.encoding_store.remove(volunteer_id)
             return False
     
-    def get_volunteer(self, volunteer_id: str) -> Optional[Dict]:
-        """Get volunteer information by ID"""
-        try:
-            with open(self.volunteers_file, 'r') as f:
-                data = json.load(f)
+    def add_volunteer_templates(self, volunteer_id: str, face_encodings: Sequence[np.ndarray],
+                                images: Sequence[bytes] = ()) -> bool:
+        """Store more templates for a registered volunteer, with the photos they came from.
+        
+        Returns False if the volunteer does not exist or the templates would
+        exceed ``max_templates``.
+        """
+        if not is_valid_volunteer_id(volunteer_id):
+            print(f"Error adding volunteer templates: invalid volunteer ID {volunteer_id!r}")
+            return False
+        with self._lock, self.store_lock:
+            self._check_gallery_version()
+            try:
+                with open(self.volunteers_file, 'r') as f:
+                    data = json.load(f)
+                if volunteer_id not in data["volunteers"] or not len(face_encodings):
+                    return False
+                if self.template_count(volunteer_id) + len(face_encodings) > self.max_templates:
+                    return False
+                self._save_template_images(volunteer_id, images)
+                self.encoding_store.append_many([volunteer_id] * len(face_encodings), np.stack(face_encodings))
+                if self._ann_index is not None:
+                    # Re-added with all of its templates on the next sync
+                    self._ann_index.remove(volunteer_id)
+                self.invalidate_cache()
+                return True
             
-            if volunteer_id in data["volunteers"]:
-                volunteer = data["volunteers"][volunteer_id].copy()
-                # Convert face encoding back to numpy array with proper padding
-                encoding_base64 = volunteer["face_encoding"]
-                encoding_bytes = base64.b64decode(encoding_base64.encode('utf-8'))
-                volunteer["face_encoding"] = np.frombuffer(encoding_bytes, dtype=np.float64)
+            except Exception as e:
+                print(f"Error adding volunteer templates: {str(e)}")
+                return False
+    
+    def find_duplicates(self, face_encodings: Sequence[np.ndarray], min_confidence: float,
+                        top_k: int = 3) -> List[Tuple[str, float]]:
+        """Registered volunteers whose face matches any of the given encodings.
+        
+        Returns up to ``top_k`` (volunteer_id, confidence) pairs, best first.
+        """
+        gallery = self.get_gallery()
+        if not len(gallery) or not len(face_encodings):
+            return []
+        best: Dict[str, float] = {}
+        for matches in gallery.match(np.stack(face_encodings), top_k=top_k, min_confidence=min_confidence):
+            for volunteer_id, confidence in matches:
+                best[volunteer_id] = max(confidence, best.get(volunteer_id, 0.0))
+        return sorted(best.items(), key=lambda match: match[1], reverse=True)[:top_k]
+    
+    def flag_possible_duplicates(self, volunteer_id: str, duplicates: Sequence[Tuple[str, float]]) -> bool:
+        """Record volunteers that look like the same person in ``possible_duplicates``"""
+        with self._lock:
+            try:
+                with open(self.volunteers_file, 'r') as f:
+                    data = json.load(f)
+                volunteer = data["volunteers"].get(volunteer_id)
+                if volunteer is None:
+                    return False
+                flagged = {entry["volunteer_id"]: entry["confidence_score"]
+                           for entry in volunteer.get("possible_duplicates", [])}
+                for duplicate_id, confidence in duplicates:
+                    flagged[duplicate_id] = round(max(float(confidence), flagged.get(duplicate_id, 0.0)), 2)
+                volunteer["possible_duplicates"] = [
+                    {"volunteer_id": duplicate_id, "confidence_score": confidence}
+                    for duplicate_id, confidence in sorted(flagged.items(), key=lambda entry: entry[1], reverse=True)
+                ]
+                self._write_volunteers(data)
+                self.invalidate_cache()
+                return True
+            
+            except Exception as e:
+                print(f"Error flagging duplicates: {str(e)}")
+                return False
+    
+    def template_count(self, volunteer_id: str) -> int:
+        """Number of stored encodings for a volunteer"""
+        return len(self.encoding_store.rows_by_id().get(volunteer_id, []))
+    
+    def register_volunteers_bulk(self, volunteers: List[Tuple[str, str, str, np.ndarray, bytes]]) -> Dict[str, str]:
+        """Register many (volunteer_id, name, email, face_encoding, image_data) entries at once.
+        
+        Encodings are appended to the store and volunteers.json is rewritten a
+        single time. Returns an error message for every entry that was rejected.
+        """
+        errors: Dict[str, str] = {}
+        written_images = []
+        accepted = []
+        accepted_ids = set()
+        with self._lock, self.store_lock:
+            self._check_gallery_version()
+            try:
+                with open(self.volunteers_file, 'r') as f:
+                    data = json.load(f)
                 
-                # Read the image data
-                with open(volunteer["image_path"], 'rb') as f:
-                    volunteer["image_data"] = f.read()
-                return volunteer
-            return None
+                for volunteer_id, name, email, face_encoding, image_data in volunteers:
+                    if not is_valid_volunteer_id(volunteer_id):
+                        errors[volunteer_id] = "Invalid volunteer ID"
+                        continue
+                    if volunteer_id in data["volunteers"] or volunteer_id in accepted_ids:
+                        errors[volunteer_id] = "Volunteer ID already exists"
+                        continue
+                    accepted_ids.add(volunteer_id)
+                    image_path = os.path.join(self.faces_dir, f"{volunteer_id}.jpg")
+                    with open(image_path, 'wb') as f:
+                        f.write(image_data)
+                    written_images.append(image_path)
+                    self._save_thumbnail(volunteer_id, image_data)
+                    accepted.append((volunteer_id, name, email, face_encoding, image_path))
+                
+                if accepted:
+                    self.encoding_store.append_many(
+                        [entry[0] for entry in accepted],
+                        np.stack([entry[3] for entry in accepted])
+                    )
+                    created_at = datetime.utcnow().isoformat()
+                    for volunteer_id, name, email, _, image_path in accepted:
+                        data["volunteers"][volunteer_id] = {
+                            "name": name,
+                            "email": email,
+                            "image_path": image_path,
+                            "created_at": created_at
+                        }
+                    self._write_volunteers(data)
+                    self.invalidate_cache()
+                return errors
+            
+            except Exception as e:
+                print(f"Error registering volunteers: {str(e)}")
+                # Roll back so no entry of the failed batch is half-registered
+                stored = self.encoding_store.rows_by_id()
+                for volunteer_id, *_ in accepted:
+                    if volunteer_id in stored:
+                        self.encoding_store.remove(volunteer_id)
+                for volunteer_id, *_ in volunteers:
+                    errors.setdefault(volunteer_id, "Failed to save volunteer")
+                for image_path in written_images:
+                    if os.path.exists(image_path):
+                        os.remove(image_path)
+                return errors
+    
+    def _write_volunteers(self, data: Dict):
+        """Atomically replace volunteers.json"""
+        tmp_file = self.volunteers_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(data, f, indent=4)
+        os.replace(tmp_file, self.volunteers_file)
+    
+    def migrate_json_encodings(self) -> int:
+        """Move base64 encodings out of volunteers.json into the encoding store.
         
-        except Exception as e:
-            print(f"Error getting volunteer: {str(e)}")
-            return None
+        Returns the number of encodings migrated. Safe to run repeatedly.
+        """
+        with self._lock, self.store_lock:
+            with open(self.volunteers_file, 'r') as f:
+                data = json.load(f)
+            
+            stored = self.encoding_store.rows_by_id()
+            ids, encodings = [], []
+            for volunteer_id, volunteer in data["volunteers"].items():
+                if "face_encoding" not in volunteer:
+                    continue
+                if volunteer_id not in stored:
+                    ids.append(volunteer_id)
+                    encodings.append(bytes_to_encoding(volunteer["face_encoding"]))
+            
+            if ids:
+                self.encoding_store.append_many(ids, np.stack(encodings))
+            for volunteer in data["volunteers"].values():
+                volunteer.pop("face_encoding", None)
+            self._write_volunteers(data)
+            self.invalidate_cache()
+            return len(ids)
     
-    def get_all_volunteers(self) -> List[Tuple[str, Dict]]:
-        """Get all volunteers with their face encodings"""
+    @property
+    def version(self) -> int:
+        """Counter bumped whenever this manager changes the volunteer store"""
+        return self._version
+    
+    def invalidate_cache(self):
+        """Force the next read to reload volunteers from disk"""
+        with self._lock:
+            self._version += 1
+    
+    def _store_stamp(self) -> Tuple[int, int]:
+        """mtime/size of the volunteers file, used to detect external changes"""
         try:
+            stat = os.stat(self.volunteers_file)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return 0, 0
+    
+    def _load_volunteers(self) -> List[Tuple[str, VolunteerRecord]]:
+        """Return the cached volunteer snapshot, reloading it only if the store changed"""
+        with self._lock:
+            self._check_gallery_version()
+            cache_key = (self._version, self._store_stamp(), self.encoding_store.stamp())
+            if cache_key == self._cache_key:
+                return self._volunteers_cache
+            
             with open(self.volunteers_file, 'r') as f:
                 data = json.load(f)
             
+            matrix = self.encoding_store.matrix
+            rows = self.encoding_store.rows_by_id()
             volunteers = []
+            legacy_count = 0
             for volunteer_id, volunteer in data["volunteers"].items():
-                volunteer_copy = volunteer.copy()
-                # Convert face encoding back to numpy array with proper padding
-                encoding_base64 = volunteer["face_encoding"]
-                encoding_bytes = base64.b64decode(encoding_base64.encode('utf-8'))
-                volunteer_copy["face_encoding"] = np.frombuffer(encoding_bytes, dtype=np.float64)
-                
-                # Read the image data
-                with open(volunteer["image_path"], 'rb') as f:
-                    volunteer_copy["image_data"] = f.read()
-                volunteers.append((volunteer_id, volunteer_copy))
+                record = VolunteerRecord(volunteer)
+                if volunteer_id in rows:
+                    # Zero-copy view into the memory-mapped encoding matrix (newest template)
+                    record["face_encoding"] = matrix[rows[volunteer_id][-1]]
+                    record["template_count"] = len(rows[volunteer_id])
+                elif "face_encoding" in volunteer:
+                    # Legacy store that has not been migrated yet
+                    record["face_encoding"] = bytes_to_encoding(volunteer["face_encoding"])
+                    legacy_count += 1
+                else:
+                    continue
+                volunteers.append((volunteer_id, record))
             
+            self._volunteers_cache = volunteers
+            self._volunteers_by_id = dict(volunteers)
+            self._legacy_count = legacy_count
+            self._gallery_cache = None
+            self._cache_key = cache_key
             return volunteers
+    
+    def _snapshot_by_id(self) -> Dict[str, VolunteerRecord]:
+        """id -> record map of the current snapshot, built once per reload"""
+        with self._lock:
+            self._load_volunteers()
+            return self._volunteers_by_id
+    
+    def lookup(self, volunteer_id: str) -> Optional[VolunteerRecord]:
+        """Cached, read-only record of a volunteer (without loading the photo), or None"""
+        try:
+            return self._snapshot_by_id().get(volunteer_id)
+        
+        except Exception as e:
+            print(f"Error looking up volunteer: {str(e)}")
+            return None
+    
+    def volunteer_count(self) -> int:
+        """Number of volunteers that can be matched"""
+        try:
+            return len(self._load_volunteers())
+        
+        except Exception as e:
+            print(f"Error counting volunteers: {str(e)}")
+            return 0
+    
+    def legacy_encoding_count(self) -> int:
+        """Volunteers whose encoding is still only in volunteers.json (see ``migrate_json_encodings``)"""
+        with self._lock:
+            self._load_volunteers()
+            return self._legacy_count
+    
+    def get_volunteer(self, volunteer_id: str) -> Optional[Dict]:
+        """Get volunteer information by ID"""
+        try:
+            record = self._snapshot_by_id().get(volunteer_id)
+            if record is None:
+                return None
+            volunteer = dict(record)
+            volunteer["image_data"] = record["image_data"]
+            return volunteer
+        
+        except Exception as e:
+            print(f"Error getting volunteer: {str(e)}")
+            return None
+    
+    def get_all_volunteers(self) -> List[Tuple[str, Dict]]:
+        """Get all volunteers with their face encodings.
+        
+        Returns the cached, read-only snapshot itself (reloads replace it
+        rather than mutate it); ``image_data`` is read from disk only when a
+        caller accesses it.
+        """
+        try:
+            return self._load_volunteers()
         
         except Exception as e:
             print(f"Error getting all volunteers: {str(e)}")
             return []
     
-    def mark_attendance(self, event_id: str, volunteer_id: str, confidence_score: float) -> bool:
-        """Mark attendance for a volunteer at an event"""
+    def get_gallery(self) -> FaceIndex:
+        """Get an index of all registered encodings, rebuilt only when the store changes"""
+        with self._lock:
+            volunteers = self.get_all_volunteers()
+            if self._gallery_cache is None:
+                if self.index_backend == "ivf":
+                    self._gallery_cache = self._sync_ann_index(volunteers)
+                else:
+                    self._gallery_cache = self._build_exact_gallery(volunteers)
+            return self._gallery_cache
+    
+    def _build_exact_gallery(self, volunteers: List[Tuple[str, Dict]]) -> FaceIndex:
+        known = {volunteer_id for volunteer_id, _ in volunteers}
+        stored_ids, rows = self.encoding_store.active_rows()
+        matrix = self.encoding_store.matrix
+        if len(stored_ids) == len(matrix) and stored_ids and set(stored_ids) == known:
+            # Every stored row is live: build straight from the memory map
+            # (zero-copy for float64; int8 keeps it only as the re-rank source)
+            return self._new_exact_gallery(stored_ids, matrix)
+        # Every live template of a known volunteer, then legacy JSON-only encodings
+        template_rows = [(volunteer_id, row) for volunteer_id, row in zip(stored_ids, rows) if volunteer_id in known]
+        stored = {volunteer_id for volunteer_id, _ in template_rows}
+        legacy = [(volunteer_id, volunteer) for volunteer_id, volunteer in volunteers if volunteer_id not in stored]
+        ids = [volunteer_id for volunteer_id, _ in template_rows] + [volunteer_id for volunteer_id, _ in legacy]
+        if not ids:
+            return self._new_exact_gallery([], np.empty((0, self.encoding_store.dim)))
+        encodings = np.concatenate([
+            matrix[[row for _, row in template_rows]],
+            np.array([volunteer["face_encoding"] for _, volunteer in legacy]).reshape(-1, self.encoding_store.dim)
+        ])
+        return self._new_exact_gallery(ids, encodings)
+    
+    def _new_exact_gallery(self, ids: List[str], encodings: np.ndarray) -> FaceIndex:
+        return build_exact_gallery(ids, encodings, self.encoding_store.dim, self.gallery_dtype,
+                                   self.gallery_rerank, self.template_shortlist)
+    
+    def _sync_ann_index(self, volunteers: List[Tuple[str, Dict]]) -> IVFIndex:
+        """Bring the persisted IVF index up to date with incremental adds/removes"""
+        index = self._ann_index
+        if index is None and os.path.exists(self.ann_index_file):
+            try:
+                index = IVFIndex.load(self.ann_index_file)
+                index.nprobe = self.index_options.get("nprobe", index.nprobe)
+            except Exception as e:
+                print(f"Error loading ANN index, rebuilding: {str(e)}")
+                index = None
+        if index is None:
+            index = IVFIndex(dim=self.encoding_store.dim, dtype=self.gallery_dtype, **self.index_options)
+        
+        current = dict(volunteers)
+        rows = self.encoding_store.rows_by_id()
+        stale = [volunteer_id for volunteer_id in index.volunteer_ids() if volunteer_id not in current]
+        # Not indexed yet, or templates added since (legacy JSON volunteers have one)
+        missing = [volunteer_id for volunteer_id in current
+                   if index.template_count(volunteer_id) != len(rows.get(volunteer_id, [None]))]
+        for volunteer_id in stale:
+            index.remove(volunteer_id)
+        if missing:
+            # Every template is its own row, so a match on any of them finds the volunteer
+            matrix = self.encoding_store.matrix
+            ids = [volunteer_id for volunteer_id in missing for _ in rows.get(volunteer_id, [None])]
+            index.add_many(ids, np.concatenate([
+                matrix[rows[volunteer_id]] if volunteer_id in rows else current[volunteer_id]["face_encoding"][None, :]
+                for volunteer_id in missing]))
+        if stale or missing:
+            index.save(self.ann_index_file)
+        self._ann_index = index
+        return index
+    
+    def mark_attendance(self, event_id: str, volunteer_id: str, confidence_score: float,
+                        timestamp: Optional[str] = None) -> bool:
+        """Mark attendance for a volunteer at an event (``timestamp`` defaults to now)"""
         try:
-            # Load existing attendance data
-            with open(self.attendance_file, 'r') as f:
-                data = json.load(f)
-            
-            # Initialize event if it doesn't exist
-            if event_id not in data["events"]:
-                data["events"][event_id] = []
-            
-            # Check if attendance already marked
-            for attendance in data["events"][event_id]:
-                if attendance["volunteer_id"] == volunteer_id:
-                    # Update confidence score if new score is higher
-                    if confidence_score > attendance["confidence_score"]:
-                        attendance["confidence_score"] = confidence_score
-                        attendance["timestamp"] = datetime.utcnow().isoformat()
-                        with open(self.attendance_file, 'w') as f:
-                            json.dump(data, f, indent=4)
-                        return True
-                    return False
-            
-            # Add attendance record
-            attendance_record = {
-                "volunteer_id": volunteer_id,
-                "timestamp": datetime.utcnow().isoformat(),
-                "confidence_score": confidence_score
-            }
-            
-            data["events"][event_id].append(attendance_record)
-            
-            # Save updated data
-            with open(self.attendance_file, 'w') as f:
-                json.dump(data, f, indent=4)
-            
+            # O(1) in-memory "already marked" check; only real changes are written
+            if not self.attendance.mark(event_id, volunteer_id, confidence_score, timestamp):
+                return False
+            self.attendance_events.publish(event_id, self.attendance.get_record(event_id, volunteer_id))
             return True
         
         except Exception as e:
             print(f"Error marking attendance: {str(e)}")
             return False
     
-    def get_attendance_logs(self, event_id: str) -> List[Dict]:
-        """Get attendance logs for an event with volunteer photos"""
+    def _save_thumbnail(self, volunteer_id: str, image_data: bytes) -> Optional[str]:
+        """Write the small JPEG served in attendance logs; failures are not fatal"""
         try:
-            with open(self.attendance_file, 'r') as f:
-                data = json.load(f)
-            
-            if event_id not in data["events"]:
+            os.makedirs(self.thumbnails_dir, exist_ok=True)
+            thumbnail_path = os.path.join(self.thumbnails_dir, f"{volunteer_id}.jpg")
+            with open(thumbnail_path, 'wb') as f:
+                f.write(make_thumbnail(image_data))
+            return thumbnail_path
+        except Exception as e:
+            print(f"Error creating thumbnail: {str(e)}")
+            return None
+    
+    def get_thumbnail_path(self, volunteer_id: str) -> Optional[str]:
+        """Path of a registered volunteer's thumbnail, generating it on first use"""
+        volunteer = self.lookup(volunteer_id)
+        if volunteer is None:
+            return None
+        thumbnail_path = os.path.join(self.thumbnails_dir, f"{volunteer_id}.jpg")
+        if os.path.exists(thumbnail_path):
+            return thumbnail_path
+        image_data = volunteer.get("image_data")
+        if image_data is None:
+            return None
+        return self._save_thumbnail(volunteer_id, image_data)
+    
+    def attendance_etag(self, event_id: str, since: Optional[int] = None, version: Optional[int] = None) -> str:
+        """Entity tag for an attendance log response; changes whenever the log would.
+        
+        ``version`` is the ``event_version`` the response was built from
+        (read now if not given).
+        """
+        if version is None:
+            version = self.attendance.event_version(event_id)
+        self._load_volunteers()
+        return f"{event_id}-{version}-{since}-{hash(self._cache_key) & 0xffffffff:x}"
+    
+    def get_attendance_logs(self, event_id: str, since: Optional[int] = None,
+                            photo_url: Optional[Callable[[str], str]] = None) -> List[Dict]:
+        """Get attendance logs for an event.
+        
+        ``since`` limits the result to records created or improved after that
+        sequence number (each record carries its ``seq``). When ``photo_url``
+        is given it maps a volunteer id to the URL of their thumbnail.
+        """
+        try:
+            records = self.attendance.get_event(event_id, since)
+            if not records:
                 return []
             
-            # Load volunteer data to include names and photos
-            with open(self.volunteers_file, 'r') as f:
-                volunteers = json.load(f)["volunteers"]
-            
-            # Add volunteer names and photos to attendance records
-            attendance_logs = []
-            for record in data["events"][event_id]:
-                volunteer = volunteers.get(record["volunteer_id"], {})
-                log_entry = {
-                    "volunteer_id": record["volunteer_id"],
-                    "volunteer_name": volunteer.get("name", "Unknown"),
-                    "timestamp": record["timestamp"],
-                    "confidence_score": record["confidence_score"]
-                }
-                
-                # Add volunteer photo if available
-                if "image_path" in volunteer and os.path.exists(volunteer["image_path"]):
-                    with open(volunteer["image_path"], 'rb') as f:
-                        log_entry["photo"] = base64.b64encode(f.read()).decode('utf-8')
-                
-                attendance_logs.append(log_entry)
+            # Cached volunteer data provides names without re-reading the JSON
+            volunteers = self._snapshot_by_id()
             
-            return attendance_logs
+            return [self._log_entry(record, volunteers, photo_url) for record in records]
         
         except Exception as e:
             print(f"Error getting attendance logs: {str(e)}")
             return []
     
+    def get_attendance_log_entry(self, record: Dict, photo_url: Optional[Callable[[str], str]] = None) -> Dict:
+        """Turn one attendance record (e.g. from ``attendance_events``) into a log entry"""
+        return self._log_entry(record, self._snapshot_by_id(), photo_url)
+    
+    def _log_entry(self, record: Dict, volunteers: Dict, photo_url: Optional[Callable[[str], str]]) -> Dict:
+        volunteer = volunteers.get(record["volunteer_id"], {})
+        log_entry = {
+            "volunteer_id": record["volunteer_id"],
+            "volunteer_name": volunteer.get("name", "Unknown"),
+            "timestamp": record["timestamp"],
+            "confidence_score": record["confidence_score"],
+            "seq": record["seq"]
+        }
+        
+        # Link to the volunteer's thumbnail instead of inlining the photo
+        if photo_url and "image_path" in volunteer:
+            log_entry["photo_url"] = photo_url(record["volunteer_id"])
+        return log_entry
+    
     def cleanup(self):
         """Clean up all data (useful for testing)"""
         try:
+            self.attendance.close()
             if os.path.exists(self.data_dir):
                 shutil.rmtree(self.data_dir)
             os.makedirs(self.faces_dir, exist_ok=True)
             os.makedirs(self.events_dir, exist_ok=True)
             self._init_json_files()
+            self.gallery_version = DEFAULT_VERSION
+            self.encodings_dir = gallery_version_dir(self.volunteers_dir, DEFAULT_VERSION)
+            self.encoding_store = EncodingStore(self.encodings_dir)
+            self._pointer_stamp = self._gallery_pointer_stamp()
+            self._ann_index = None
+            self.attendance = self._open_attendance_journal()
+            self.invalidate_cache()
             return True
         except Exception as e:
             print(f"Error cleaning up data: {str(e)}")
@@ -0,0 +1,127 @@
+"""Find volunteers that were registered more than once under different ids.
+
+Every stored encoding is compared with every other one, a block of rows at a
+time, so memory stays bounded (``block_rows`` squared distances per step) on
+galleries of any size. Pairs of different volunteers whose templates are
+closer than the match threshold are reported, and grouped into clusters of
+ids that probably belong to the same person.
+
+Usage:
+    python dedupe_gallery.py --data-dir data [--threshold 90] [--flag] [--output duplicates.json]
+"""
+import argparse
+import json
+import time
+from typing import Dict, List, Tuple
+import numpy as np
+
+BLOCK_ROWS = 2048
+
+DuplicatePair = Tuple[str, str, float]
+
+def duplicate_pairs(ids: List[str], encodings: np.ndarray, max_distance: float,
+                    block_rows: int = BLOCK_ROWS) -> List[DuplicatePair]:
+    """(id_a, id_b, distance) for every pair of different ids closer than ``max_distance``.
+
+    Only the upper triangle of the distance matrix is computed, block by
+    block. With several templates per id the closest pair of templates counts.
+    """
+    ids = np.asarray(ids, dtype=object)
+    encodings = np.asarray(encodings)
+    sq_norms = np.einsum('ij,ij->i', encodings, encodings)
+    limit = max_distance * max_distance
+    best: Dict[Tuple[str, str], float] = {}
+    for start in range(0, len(encodings), block_rows):
+        rows = np.asarray(encodings[start:start + block_rows], dtype=np.float64)
+        for other in range(start, len(encodings), block_rows):
+            cols = np.asarray(encodings[other:other + block_rows], dtype=np.float64)
+            sq = sq_norms[start:start + len(rows), None] + sq_norms[None, other:other + len(cols)] - 2.0 * (rows @ cols.T)
+            if other == start:
+                # Diagonal block: skip self-pairs and the mirrored lower triangle
+                sq[np.tril_indices(len(rows), m=len(cols))] = np.inf
+            hits_row, hits_col = np.nonzero(sq <= limit)
+            for row, col in zip(hits_row, hits_col):
+                id_a, id_b = ids[start + row], ids[other + col]
+                if id_a == id_b:
+                    continue
+                key = (id_a, id_b) if id_a < id_b else (id_b, id_a)
+                distance = float(np.sqrt(max(sq[row, col], 0.0)))
+                if distance < best.get(key, np.inf):
+                    best[key] = distance
+    return sorted(((id_a, id_b, distance) for (id_a, id_b), distance in best.items()), key=lambda pair: pair[2])
+
+def group_duplicates(pairs: List[DuplicatePair]) -> List[List[str]]:
+    """Connected groups of ids linked by duplicate pairs, largest first"""
+    parent: Dict[str, str] = {}
+
+    def find(volunteer_id: str) -> str:
+        parent.setdefault(volunteer_id, volunteer_id)
+        while parent[volunteer_id] != volunteer_id:
+            parent[volunteer_id] = parent[parent[volunteer_id]]
+            volunteer_id = parent[volunteer_id]
+        return volunteer_id
+
+    for id_a, id_b, _ in pairs:
+        parent[find(id_a)] = find(id_b)
+    groups: Dict[str, List[str]] = {}
+    for volunteer_id in parent:
+        groups.setdefault(find(volunteer_id), []).append(volunteer_id)
+    return sorted((sorted(group) for group in groups.values()), key=lambda group: (-len(group), group))
+
+def main():
+    parser = argparse.ArgumentParser(description="Report volunteers registered more than once")
+    parser.add_argument('--data-dir', default='data', help='DataManager data directory (default: data)')
+    parser.add_argument('--threshold', type=float, default=90,
+                        help='Confidence above which two volunteers count as the same face (default: 90)')
+    parser.add_argument('--block-rows', type=int, default=BLOCK_ROWS,
+                        help=f'Rows per distance block (default: {BLOCK_ROWS})')
+    parser.add_argument('--flag', action='store_true',
+                        help='Record the matches as possible_duplicates in volunteers.json')
+    parser.add_argument('--output', default=None, help='Write the JSON report here (default: stdout)')
+    args = parser.parse_args()
+
+    from data_manager import DataManager
+    data_manager = DataManager(args.data_dir)
+    volunteers = dict(data_manager.get_all_volunteers())
+    stored_ids, rows = data_manager.encoding_store.active_rows()
+    keep = [index for index, volunteer_id in enumerate(stored_ids) if volunteer_id in volunteers]
+    ids = [stored_ids[index] for index in keep]
+    encodings = data_manager.encoding_store.matrix[rows[keep]] if keep else np.empty((0, data_manager.encoding_store.dim))
+
+    started = time.perf_counter()
+    pairs = duplicate_pairs(ids, encodings, 1 - args.threshold / 100, args.block_rows)
+    elapsed = time.perf_counter() - started
+
+    if args.flag:
+        matches: Dict[str, List[Tuple[str, float]]] = {}
+        for id_a, id_b, distance in pairs:
+            confidence = (1 - distance) * 100
+            matches.setdefault(id_a, []).append((id_b, confidence))
+            matches.setdefault(id_b, []).append((id_a, confidence))
+        for volunteer_id, duplicates in matches.items():
+            data_manager.flag_possible_duplicates(volunteer_id, duplicates)
+    data_manager.close()
+
+    report = {
+        "volunteers": len(volunteers),
+        "encodings": len(ids),
+        "threshold": args.threshold,
+        "elapsed_seconds": round(elapsed, 3),
+        "pairs": [{
+            "volunteer_a": id_a,
+            "name_a": volunteers[id_a].get("name"),
+            "volunteer_b": id_b,
+            "name_b": volunteers[id_b].get("name"),
+            "confidence_score": round((1 - distance) * 100, 2),
+        } for id_a, id_b, distance in pairs],
+        "groups": group_duplicates(pairs),
+    }
+    output = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+import json
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Gallery versions: ``<volunteers_dir>/galleries/<version>/`` each hold a complete
+# encoding store; ``gallery.json`` names the live one. Without a pointer (or
+# with version "default") the original ``encodings/`` store is live.
+GALLERY_POINTER = "gallery.json"
+GALLERIES_DIR = "galleries"
+DEFAULT_VERSION = "default"
+VERSION_INFO = "version.json"
+# Held by every process while it writes encodings or moves the gallery pointer
+STORE_LOCK = "store.lock"
+
+def gallery_version_dir(volunteers_dir: str, version: str) -> str:
+    """Directory of a gallery version's encoding store"""
+    if version == DEFAULT_VERSION:
+        return os.path.join(volunteers_dir, "encodings")
+    if not version or os.sep in version or version.startswith('.'):
+        raise ValueError(f"Invalid gallery version '{version}'")
+    return os.path.join(volunteers_dir, GALLERIES_DIR, version)
+
+def active_gallery_version(volunteers_dir: str) -> str:
+    """Version named by the gallery pointer"""
+    try:
+        with open(os.path.join(volunteers_dir, GALLERY_POINTER), 'r') as f:
+            return json.load(f)["version"]
+    except (OSError, ValueError, KeyError):
+        return DEFAULT_VERSION
+
+def set_active_gallery_version(volunteers_dir: str, version: str):
+    """Atomically point the gallery at another version"""
+    pointer = os.path.join(volunteers_dir, GALLERY_POINTER)
+    tmp_file = pointer + ".tmp"
+    with open(tmp_file, 'w') as f:
+        json.dump({"version": version}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, pointer)
+
+def read_version_info(directory: str) -> Optional[Dict]:
+    """Settings and progress a gallery version was built with, or None"""
+    try:
+        with open(os.path.join(directory, VERSION_INFO), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_version_info(directory: str, info: Dict):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, VERSION_INFO)
+    with open(path + ".tmp", 'w') as f:
+        json.dump(info, f, indent=4)
+    os.replace(path + ".tmp", path)
+
+def _read_lines(path: str) -> List[bytes]:
+    """Newline-terminated lines of a file, without their newlines; a torn last line is ignored"""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return []
+    return data[:data.rfind(b'\n') + 1].split(b'\n')[:-1]
+
+class StoreLock:
+    """Exclusive inter-process lock on a volunteers directory.
+
+    Registrations hold it while they append to the live store and
+    ``reencode_gallery.py`` holds it for its final pass and the pointer switch,
+    so no registration lands in a version after it was copied or before it
+    became live. Re-entrant within one holder; not shared between threads.
+    """
+
+    def __init__(self, volunteers_dir: str):
+        self.path = os.path.join(volunteers_dir, STORE_LOCK)
+        self._file = None
+        self._depth = 0
+
+    def __enter__(self):
+        if self._depth == 0:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = open(self.path, 'a+')
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            else:
+                while True:
+                    try:
+                        self._file.seek(0)
+                        msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        # LK_LOCK gives up after ~10 seconds; keep waiting
+                        continue
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self._depth -= 1
+        if self._depth == 0:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            self._file.close()
+            self._file = None
+
+class EncodingStore:
+    """Binary, memory-mapped store of face encodings.
+
+    Layout inside ``directory``:
+
+    - ``encodings.bin``: raw fixed-stride matrix, one ``dim``-wide row per encoding
+    - ``encodings.ids``: one volunteer id per line; line ``i`` owns row ``i``
+    - ``encodings.removed``: row numbers that were removed, one per line
+    - ``encodings.meta.json``: ``dim`` and ``dtype`` of the matrix
+
+    Appends only ever add bytes to the end of these files, so registering a
+    volunteer is O(1), and loading the gallery is a single ``np.memmap`` call.
+    """
+
+    def __init__(self, directory: str, dim: int = 128, dtype: str = "float64"):
+        self.directory = directory
+        self.matrix_file = os.path.join(directory, "encodings.bin")
+        self.ids_file = os.path.join(directory, "encodings.ids")
+        self.removed_file = os.path.join(directory, "encodings.removed")
+        self.meta_file = os.path.join(directory, "encodings.meta.json")
+        os.makedirs(directory, exist_ok=True)
+
+        if os.path.exists(self.meta_file):
+            with open(self.meta_file, 'r') as f:
+                meta = json.load(f)
+            self.dim = meta["dim"]
+            self.dtype = np.dtype(meta["dtype"])
+        else:
+            self.dim = dim
+            self.dtype = np.dtype(dtype)
+            with open(self.meta_file, 'w') as f:
+                json.dump({"dim": self.dim, "dtype": self.dtype.name}, f)
+        self.row_bytes = self.dim * self.dtype.itemsize
+
+        self._stamp = None
+        self._row_ids: List[str] = []
+        self._removed: set = set()
+        self._ids_size = 0
+        self._removed_size = 0
+        self._matrix: Optional[np.ndarray] = None
+
+    def stamp(self) -> Tuple:
+        """Sizes and mtimes of the store files; changes whenever the store changes"""
+        stamp = []
+        for path in (self.matrix_file, self.ids_file, self.removed_file):
+            try:
+                stat = os.stat(path)
+                stamp.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamp.append((0, 0))
+        return tuple(stamp)
+
+    def _refresh(self):
+        """Re-read ids and re-map the matrix if the files changed on disk"""
+        stamp = self.stamp()
+        if stamp == self._stamp:
+            return
+        # A crash can leave a torn last line in either text file; only
+        # newline-terminated lines count
+        id_lines = _read_lines(self.ids_file)
+        removed_lines = _read_lines(self.removed_file)
+        removed = {int(line) for line in removed_lines if line.strip()}
+
+        # An interrupted append may leave a partial row or a row without an id;
+        # only rows that have both bytes and an id line are visible.
+        matrix_rows = os.path.getsize(self.matrix_file) // self.row_bytes if os.path.exists(self.matrix_file) else 0
+        rows = min(len(id_lines), matrix_rows)
+        if rows:
+            self._matrix = np.memmap(self.matrix_file, dtype=self.dtype, mode='r', shape=(rows, self.dim))
+        else:
+            self._matrix = np.empty((0, self.dim), dtype=self.dtype)
+        self._row_ids = [line.decode('utf-8').rstrip('\r') for line in id_lines[:rows]]
+        self._removed = {row for row in removed if row < rows}
+        # Byte lengths of the committed parts, for cutting off torn tails before appends
+        self._ids_size = sum(len(line) + 1 for line in id_lines[:rows])
+        self._removed_size = sum(len(line) + 1 for line in removed_lines)
+        self._stamp = stamp
+
+    def __len__(self) -> int:
+        self._refresh()
+        return len(self._row_ids) - len(self._removed)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Read-only memory map of every stored row, including removed ones"""
+        self._refresh()
+        return self._matrix
+
+    def active_rows(self) -> Tuple[List[str], np.ndarray]:
+        """Ids and row numbers of all rows that have not been removed"""
+        self._refresh()
+        rows = [row for row in range(len(self._row_ids)) if row not in self._removed]
+        return [self._row_ids[row] for row in rows], np.array(rows, dtype=np.int64)
+
+    def rows_by_id(self) -> Dict[str, List[int]]:
+        """Map each volunteer id to its active row numbers"""
+        ids, rows = self.active_rows()
+        by_id: Dict[str, List[int]] = {}
+        for volunteer_id, row in zip(ids, rows):
+            by_id.setdefault(volunteer_id, []).append(int(row))
+        return by_id
+
+    def get(self, volunteer_id: str) -> Optional[np.ndarray]:
+        """Most recently stored encoding for a volunteer, or None"""
+        rows = self.rows_by_id().get(volunteer_id)
+        if not rows:
+            return None
+        return np.array(self._matrix[rows[-1]])
+
+    def append(self, volunteer_id: str, encoding: np.ndarray):
+        """Append one encoding for a volunteer"""
+        self.append_many([volunteer_id], np.asarray(encoding).reshape(1, -1))
+
+    def append_many(self, volunteer_ids: Sequence[str], encodings: np.ndarray):
+        """Append several encodings with a single write to each file"""
+        encodings = np.ascontiguousarray(encodings, dtype=self.dtype).reshape(-1, self.dim)
+        if len(volunteer_ids) != len(encodings):
+            raise ValueError("Number of ids does not match number of encodings")
+        if any('\n' in volunteer_id for volunteer_id in volunteer_ids):
+            raise ValueError("Volunteer ids cannot contain newlines")
+        if not len(encodings):
+            return
+
+        self._refresh()
+        rows = len(self._row_ids)
+        with open(self.matrix_file, 'ab') as f:
+            # Drop any partial row left behind by an interrupted append
+            if f.tell() > rows * self.row_bytes:
+                f.truncate(rows * self.row_bytes)
+            f.write(encodings.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        # The id lines are the commit point: rows without ids are ignored on load
+        with open(self.ids_file, 'ab') as f:
+            # Drop a torn id line, or ids of rows that never got their bytes
+            if f.tell() > self._ids_size:
+                f.truncate(self._ids_size)
+            f.write(''.join(f"{volunteer_id}\n" for volunteer_id in volunteer_ids).encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+        self._stamp = None
+
+    def remove(self, volunteer_id: str) -> bool:
+        """Remove every row belonging to a volunteer"""
+        rows = self.rows_by_id().get(volunteer_id)
+        if not rows:
+            return False
+        with open(self.removed_file, 'ab') as f:
+            if f.tell() > self._removed_size:
+                f.truncate(self._removed_size)
+            f.write(''.join(f"{row}\n" for row in rows).encode('ascii'))
+            f.flush()
+            os.fsync(f.fileno())
+        self._stamp = None
+        return True
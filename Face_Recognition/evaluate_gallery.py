@@ -0,0 +1,103 @@
+"""Compare compact gallery representations against the float64 reference.
+
+For float32, int8 and int8 with exact re-ranking, reports how often the match
+decision (matched volunteer, or no match below the threshold) agrees with
+float64, the largest confidence difference, resident memory and search latency.
+
+Usage:
+    python evaluate_gallery.py --data-dir data [--queries probes.npy]
+    python evaluate_gallery.py --synthetic 100000
+"""
+import argparse
+import json
+import time
+from typing import Dict, List, Tuple
+import numpy as np
+from face_gallery import FaceGallery, QuantizedGallery
+from synthetic_data import synthetic_encodings
+
+def probe_encodings(gallery: np.ndarray, count: int, rng: np.random.Generator) -> np.ndarray:
+    """Genuine probes at distances around the match threshold, plus impostors"""
+    genuine = count // 2
+    rows = rng.integers(len(gallery), size=genuine)
+    # Per-dimension noise from 0.002 to 0.018 puts probes 0.02-0.2 away from their
+    # volunteer, straddling the default 90% (distance 0.1) decision boundary
+    noise = rng.uniform(0.002, 0.018, size=(genuine, 1))
+    probes = gallery[rows] + rng.normal(size=(genuine, gallery.shape[1])) * noise
+    impostors = synthetic_encodings(count - genuine, rng, gallery.shape[1])
+    return np.vstack([probes, impostors])
+
+def decisions(gallery, queries: np.ndarray, min_confidence: float) -> Tuple[List, float]:
+    """Top-1 match per query (with and without the threshold) and seconds per query"""
+    started = time.perf_counter()
+    matches = gallery.match(queries, top_k=1)
+    elapsed = (time.perf_counter() - started) / max(len(queries), 1)
+    best = [candidates[0] if candidates else (None, 0.0) for candidates in matches]
+    accepted = [volunteer_id if confidence >= min_confidence else None for volunteer_id, confidence in best]
+    return list(zip(accepted, best)), elapsed
+
+def evaluate(ids: List[str], encodings: np.ndarray, queries: np.ndarray,
+             min_confidence: float = 90, rerank: int = 10) -> Dict:
+    reference = FaceGallery(dim=encodings.shape[1])
+    reference.set_encodings(ids, encodings)
+    float32 = FaceGallery(dim=encodings.shape[1], dtype=np.float32)
+    float32.set_encodings(ids, encodings)
+    int8 = QuantizedGallery(dim=encodings.shape[1])
+    int8.set_encodings(ids, encodings)
+    int8_rerank = QuantizedGallery(dim=encodings.shape[1], rerank=rerank)
+    int8_rerank.set_encodings(ids, encodings)
+
+    expected, reference_seconds = decisions(reference, queries, min_confidence)
+    per_100k = 100000 / len(ids)
+    report = {"float64": {
+        "memory_mb": round(reference.nbytes / 1e6, 2),
+        "memory_mb_per_100k": round(reference.nbytes * per_100k / 1e6, 2),
+        "ms_per_query": round(reference_seconds * 1000, 3),
+    }}
+    for name, gallery, resident in (("float32", float32, float32.nbytes),
+                                    ("int8", int8, int8.nbytes),
+                                    (f"int8_rerank{rerank}", int8_rerank, int8_rerank.nbytes)):
+        actual, seconds = decisions(gallery, queries, min_confidence)
+        report[name] = {
+            "decision_agreement": round(np.mean([a[0] == e[0] for a, e in zip(actual, expected)]), 6),
+            "top1_agreement": round(np.mean([a[1][0] == e[1][0] for a, e in zip(actual, expected)]), 6),
+            "max_confidence_delta": round(max(abs(a[1][1] - e[1][1]) for a, e in zip(actual, expected)), 4),
+            "memory_mb": round(resident / 1e6, 2),
+            "memory_mb_per_100k": round(resident * per_100k / 1e6, 2),
+            "ms_per_query": round(seconds * 1000, 3),
+        }
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Check float32/int8 galleries against float64 match decisions")
+    parser.add_argument('--data-dir', default=None, help='Evaluate the gallery of this DataManager data directory')
+    parser.add_argument('--synthetic', type=int, default=None, help='Evaluate a synthetic gallery of this size instead')
+    parser.add_argument('--queries', default=None, help='.npy file of probe encodings (default: generated probes)')
+    parser.add_argument('--num-queries', type=int, default=2000, help='Generated probes (default: 2000)')
+    parser.add_argument('--threshold', type=float, default=90, help='Match confidence threshold (default: 90)')
+    parser.add_argument('--rerank', type=int, default=10, help='Candidates re-ranked exactly for int8 (default: 10)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for generated data (default: 0)')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.synthetic:
+        encodings = synthetic_encodings(args.synthetic, rng)
+        ids = [str(i) for i in range(args.synthetic)]
+    else:
+        from data_manager import DataManager
+        data_manager = DataManager(args.data_dir or "data")
+        volunteers = data_manager.get_all_volunteers()
+        data_manager.close()
+        if not volunteers:
+            parser.error("The gallery is empty; register volunteers or use --synthetic")
+        ids = [volunteer_id for volunteer_id, _ in volunteers]
+        encodings = np.stack([volunteer["face_encoding"] for _, volunteer in volunteers]).astype(np.float64)
+
+    queries = np.load(args.queries) if args.queries else probe_encodings(encodings, args.num_queries, rng)
+    report = evaluate(ids, encodings, queries, args.threshold, args.rerank)
+    report["gallery_size"] = len(ids)
+    report["queries"] = len(queries)
+    print(json.dumps(report, indent=4))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,499 @@
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Tuple
+from face_index import FaceIndex, Neighbours, squared_distances, top_k_rows
+
+class FaceGallery(FaceIndex):
+    """In-memory gallery of face encodings stored as one contiguous matrix.
+
+    Row ``i`` of ``encodings`` belongs to ``ids[i]``, so a whole frame's faces
+    can be compared against every registered volunteer with a single batched
+    distance computation instead of a Python loop per volunteer. This is the
+    exact backend of the ``FaceIndex`` interface.
+    """
+
+    def __init__(self, dim: int = 128, dtype=np.float64):
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.ids = np.empty(0, dtype=object)
+        self.encodings = np.empty((0, dim), dtype=self.dtype)
+        self._sq_norms = np.empty(0, dtype=self.dtype)
+        self._rows: Dict[str, int] = {}
+
+    @classmethod
+    def from_volunteers(cls, volunteers: Iterable[Tuple[str, Dict]]) -> "FaceGallery":
+        """Build a gallery from ``DataManager.get_all_volunteers()`` output"""
+        volunteers = list(volunteers)
+        gallery = cls()
+        if volunteers:
+            ids = [volunteer_id for volunteer_id, _ in volunteers]
+            encodings = np.stack([volunteer["face_encoding"] for _, volunteer in volunteers])
+            gallery.set_encodings(ids, encodings)
+        return gallery
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, volunteer_id: str) -> bool:
+        return volunteer_id in self._rows
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the encoding matrix and per-row norms"""
+        return self.encodings.nbytes + self._sq_norms.nbytes
+
+    def set_encodings(self, ids: List[str], encodings: np.ndarray):
+        """Replace the gallery contents with the given ids and N x dim matrix"""
+        encodings = np.ascontiguousarray(encodings, dtype=self.dtype).reshape(-1, self.dim)
+        if len(ids) != len(encodings):
+            raise ValueError("Number of ids does not match number of encodings")
+        self.ids = np.array(ids, dtype=object)
+        self.encodings = encodings
+        self._sq_norms = np.einsum('ij,ij->i', encodings, encodings)
+        self._rows = {volunteer_id: row for row, volunteer_id in enumerate(ids)}
+
+    def add(self, volunteer_id: str, encoding: np.ndarray):
+        """Add (or replace) the encoding for a volunteer"""
+        encoding = np.asarray(encoding, dtype=self.dtype).reshape(1, self.dim)
+        if volunteer_id in self._rows:
+            if not self.encodings.flags.writeable:
+                self.encodings = self.encodings.copy()
+            row = self._rows[volunteer_id]
+            self.encodings[row] = encoding[0]
+            self._sq_norms[row] = encoding[0] @ encoding[0]
+            return
+        self._rows[volunteer_id] = len(self.ids)
+        self.ids = np.append(self.ids, np.array([volunteer_id], dtype=object))
+        self.encodings = np.vstack([self.encodings, encoding])
+        self._sq_norms = np.append(self._sq_norms, encoding[0] @ encoding[0])
+
+    def remove(self, volunteer_id: str) -> bool:
+        """Remove a volunteer from the gallery, returning False if absent"""
+        row = self._rows.get(volunteer_id)
+        if row is None:
+            return False
+        keep = np.ones(len(self.ids), dtype=bool)
+        keep[row] = False
+        self.set_encodings(list(self.ids[keep]), self.encodings[keep])
+        return True
+
+    def distances(self, face_encodings) -> np.ndarray:
+        """Euclidean distances between M query encodings and all N gallery rows (M x N)"""
+        queries = np.asarray(face_encodings, dtype=self.dtype).reshape(-1, self.dim)
+        if len(self.ids) == 0 or len(queries) == 0:
+            return np.empty((len(queries), len(self.ids)), dtype=self.dtype)
+        return np.sqrt(squared_distances(queries, self.encodings, self._sq_norms))
+
+    def search(self, face_encodings, k: int = 1) -> List[Neighbours]:
+        distances = self.distances(face_encodings)
+        if distances.shape[1] == 0:
+            return [[] for _ in range(distances.shape[0])]
+        rows, values = top_k_rows(distances, k)
+        return [[(self.ids[row], float(value)) for row, value in zip(query_rows, query_values)]
+                for query_rows, query_values in zip(rows, values)]
+
+    def save(self, path: str):
+        """Persist ids and encodings to an .npz file"""
+        np.savez(path, ids=np.array(self.ids, dtype=str), encodings=self.encodings)
+
+    @classmethod
+    def load(cls, path: str) -> "FaceGallery":
+        """Load a gallery written by ``save``"""
+        with np.load(path, allow_pickle=False) as data:
+            encodings = data["encodings"]
+            gallery = cls(dim=encodings.shape[1], dtype=encodings.dtype)
+            gallery.set_encodings([str(volunteer_id) for volunteer_id in data["ids"]], encodings)
+        return gallery
+
+class QuantizedGallery(FaceIndex):
+    """Gallery stored as scalar-quantized int8 codes (1 byte per dimension).
+
+    Each dimension is mapped affinely onto 256 levels between its minimum and
+    maximum over the gallery, so encoding ``x`` is approximated by
+    ``codes * scale + offset``. Scale and offset are folded into the query, so
+    distances are computed directly against the codes, one block of rows at a
+    time, without ever materializing the float matrix.
+
+    With ``rerank > 0`` the original encodings are kept as a re-rank source
+    (typically the read-only memory map of the encoding store, so they cost no
+    resident memory) and the ``rerank`` best candidates are re-scored with
+    exact float64 distances before the top ``k`` are returned. Encodings
+    added after the build are kept in a small pending list beside it, so the
+    source is never copied.
+
+    A volunteer may own several rows (one per template); searches return each
+    volunteer once, at the distance of their closest row.
+    """
+
+    BLOCK_ROWS = 16384
+
+    def __init__(self, dim: int = 128, rerank: int = 0):
+        self.dim = dim
+        self.rerank = rerank
+        self.ids = np.empty(0, dtype=object)
+        self.codes = np.empty((0, dim), dtype=np.int8)
+        self.scale = np.ones(dim, dtype=np.float32)
+        self.offset = np.zeros(dim, dtype=np.float32)
+        self._sq_norms = np.empty(0, dtype=np.float32)
+        self._rows: Dict[str, List[int]] = {}
+        self._max_rows = 0
+        self._source: Optional[np.ndarray] = None
+        # Per row, its source row; rows past len(_source) index _pending
+        self._source_rows: Optional[np.ndarray] = None
+        self._pending: List[np.ndarray] = []
+
+    @classmethod
+    def from_volunteers(cls, volunteers: Iterable[Tuple[str, Dict]], rerank: int = 0) -> "QuantizedGallery":
+        """Build a gallery from ``DataManager.get_all_volunteers()`` output"""
+        volunteers = list(volunteers)
+        gallery = cls(rerank=rerank)
+        if volunteers:
+            gallery.set_encodings([volunteer_id for volunteer_id, _ in volunteers],
+                                  np.stack([volunteer["face_encoding"] for _, volunteer in volunteers]))
+        return gallery
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, volunteer_id: str) -> bool:
+        return volunteer_id in self._rows
+
+    @property
+    def nbytes(self) -> int:
+        """Resident size of the codes, per-row norms and quantization parameters"""
+        return self.codes.nbytes + self._sq_norms.nbytes + self.scale.nbytes + self.offset.nbytes
+
+    def set_encodings(self, ids: List[str], encodings: np.ndarray):
+        """Quantize an N x dim matrix; with re-ranking it is kept (not copied) as the source"""
+        encodings = np.asarray(encodings).reshape(-1, self.dim)
+        if len(ids) != len(encodings):
+            raise ValueError("Number of ids does not match number of encodings")
+        if len(encodings):
+            low = encodings.min(axis=0).astype(np.float32)
+            high = encodings.max(axis=0).astype(np.float32)
+            self.scale = np.maximum((high - low) / 255.0, np.float32(1e-12))
+            # Codes run from -128 to 127, so code 0 sits 128 steps above the minimum
+            self.offset = low + 128.0 * self.scale
+        self.ids = np.array(ids, dtype=object)
+        self.codes = self._quantize(encodings)
+        self._sq_norms = self._reconstructed_sq_norms(self.codes)
+        self._index_rows()
+        self._source = encodings if self.rerank else None
+        self._source_rows = np.arange(len(encodings)) if self.rerank else None
+        self._pending = []
+
+    def _index_rows(self):
+        """Rebuild the id -> rows map after the row order changed"""
+        self._rows = {}
+        for row, volunteer_id in enumerate(self.ids):
+            self._rows.setdefault(volunteer_id, []).append(row)
+        self._max_rows = max((len(rows) for rows in self._rows.values()), default=0)
+
+    def _exact(self, rows: np.ndarray) -> np.ndarray:
+        """Original float64 encodings of the given rows, from the source or the pending list"""
+        source_rows = self._source_rows[rows]
+        exact = np.empty((len(rows), self.dim), dtype=np.float64)
+        built = source_rows < len(self._source)
+        exact[built] = self._source[source_rows[built]]
+        for position in np.flatnonzero(~built):
+            exact[position] = self._pending[source_rows[position] - len(self._source)]
+        return exact
+
+    @property
+    def low(self) -> np.ndarray:
+        return self.offset - 128.0 * self.scale
+
+    @property
+    def high(self) -> np.ndarray:
+        return self.offset + 127.0 * self.scale
+
+    def _widen(self, encodings: np.ndarray):
+        """Stretch the quantization ranges over ``encodings`` and re-quantize the stored rows"""
+        low = np.minimum(self.low, encodings.min(axis=0)).astype(np.float32)
+        high = np.maximum(self.high, encodings.max(axis=0)).astype(np.float32)
+        scale = np.maximum((high - low) / 255.0, np.float32(1e-12))
+        offset = low + 128.0 * scale
+        for start in range(0, len(self.codes), self.BLOCK_ROWS):
+            end = start + self.BLOCK_ROWS
+            if self._source is not None:
+                block = self._exact(np.arange(start, min(end, len(self.codes)))).astype(np.float32)
+            else:
+                block = self.codes[start:end] * self.scale + self.offset
+            self.codes[start:end] = np.clip(np.rint((block - offset) / scale), -128, 127)
+        self.scale, self.offset = scale, offset
+        self._sq_norms = self._reconstructed_sq_norms(self.codes)
+
+    def _quantize(self, encodings: np.ndarray) -> np.ndarray:
+        codes = np.empty(encodings.shape, dtype=np.int8)
+        for start in range(0, len(encodings), self.BLOCK_ROWS):
+            block = (np.asarray(encodings[start:start + self.BLOCK_ROWS], dtype=np.float32) - self.offset) / self.scale
+            codes[start:start + self.BLOCK_ROWS] = np.clip(np.rint(block), -128, 127)
+        return codes
+
+    def _reconstructed_sq_norms(self, codes: np.ndarray) -> np.ndarray:
+        norms = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), self.BLOCK_ROWS):
+            block = codes[start:start + self.BLOCK_ROWS] * self.scale + self.offset
+            norms[start:start + self.BLOCK_ROWS] = np.einsum('ij,ij->i', block, block)
+        return norms
+
+    def add(self, volunteer_id: str, encoding: np.ndarray):
+        """Add (or replace) a volunteer, widening the quantization ranges if needed"""
+        encoding = np.asarray(encoding, dtype=np.float64).reshape(1, self.dim)
+        self.remove(volunteer_id)
+        if not len(self.ids):
+            self.set_encodings([volunteer_id], encoding)
+            return
+        # Values outside the fitted ranges would all clip to the edge codes
+        if np.any(encoding < self.low - self.scale / 2) or np.any(encoding > self.high + self.scale / 2):
+            self._widen(encoding)
+        code = self._quantize(encoding)
+        self._rows[volunteer_id] = [len(self.ids)]
+        self._max_rows = max(self._max_rows, 1)
+        self.ids = np.append(self.ids, np.array([volunteer_id], dtype=object))
+        self.codes = np.vstack([self.codes, code])
+        self._sq_norms = np.append(self._sq_norms, self._reconstructed_sq_norms(code))
+        if self._source is not None:
+            self._source_rows = np.append(self._source_rows, len(self._source) + len(self._pending))
+            self._pending.append(encoding[0])
+
+    def remove(self, volunteer_id: str) -> bool:
+        """Remove a volunteer and all of their rows, returning False if absent"""
+        rows = self._rows.get(volunteer_id)
+        if rows is None:
+            return False
+        keep = np.ones(len(self.ids), dtype=bool)
+        keep[rows] = False
+        self.ids = self.ids[keep]
+        self.codes = self.codes[keep]
+        self._sq_norms = self._sq_norms[keep]
+        if self._source is not None:
+            self._source_rows = self._source_rows[keep]
+            self._drop_unused_pending()
+        self._index_rows()
+        return True
+
+    def _drop_unused_pending(self):
+        """Forget pending encodings whose rows were removed"""
+        added = self._source_rows >= len(self._source)
+        if np.count_nonzero(added) == len(self._pending):
+            return
+        # Rows keep their order, so the surviving pending entries are still in row order
+        self._pending = [self._pending[row - len(self._source)] for row in self._source_rows[added]]
+        self._source_rows[added] = len(self._source) + np.arange(len(self._pending))
+
+    def squared_distances(self, face_encodings) -> np.ndarray:
+        """Approximate squared distances (M x N), computed block-wise on the int8 codes"""
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, self.dim)
+        # q.x ~= (q * scale).codes + q.offset
+        scaled = queries * self.scale
+        base = np.einsum('ij,ij->i', queries, queries) - 2.0 * (queries @ self.offset)
+        sq = np.empty((len(queries), len(self.codes)), dtype=np.float32)
+        for start in range(0, len(self.codes), self.BLOCK_ROWS):
+            block = self.codes[start:start + self.BLOCK_ROWS].astype(np.float32)
+            end = start + len(block)
+            sq[:, start:end] = base[:, None] + self._sq_norms[None, start:end] - 2.0 * (scaled @ block.T)
+        np.maximum(sq, 0.0, out=sq)
+        return sq
+
+    def search(self, face_encodings, k: int = 1) -> List[Neighbours]:
+        queries = np.asarray(face_encodings, dtype=np.float64).reshape(-1, self.dim)
+        if not len(self.ids) or not len(queries):
+            return [[] for _ in range(len(queries))]
+        # With up to m rows per volunteer, the k best volunteers are all within the k * m best rows
+        candidates = k * max(self._max_rows, 1)
+        if self._source is not None:
+            candidates = max(candidates, self.rerank)
+        rows, values = top_k_rows(self.squared_distances(queries), candidates)
+        results = []
+        for query, query_rows, query_values in zip(queries, rows, values):
+            if self._source is not None:
+                # Exact float re-rank of the shortlist; sorted rows keep memory-map reads sequential
+                query_rows = np.sort(query_rows)
+                exact = self._exact(query_rows)
+                query_values = np.sum((exact - query) ** 2, axis=1)
+                order = np.argsort(query_values)
+                query_rows, query_values = query_rows[order], query_values[order]
+            neighbours, seen = [], set()
+            for row, value in zip(query_rows, query_values):
+                volunteer_id = self.ids[row]
+                if volunteer_id in seen:
+                    continue
+                seen.add(volunteer_id)
+                neighbours.append((volunteer_id, float(np.sqrt(value))))
+                if len(neighbours) == k:
+                    break
+            results.append(neighbours)
+        return results
+
+    def save(self, path: str):
+        """Persist ids, codes and quantization parameters to an .npz file"""
+        np.savez(path, ids=np.array(self.ids, dtype=str), codes=self.codes,
+                 scale=self.scale, offset=self.offset)
+
+    @classmethod
+    def load(cls, path: str) -> "QuantizedGallery":
+        """Load a gallery written by ``save`` (without a re-rank source)"""
+        with np.load(path, allow_pickle=False) as data:
+            codes = data["codes"]
+            gallery = cls(dim=codes.shape[1])
+            gallery.scale = data["scale"]
+            gallery.offset = data["offset"]
+            gallery.ids = np.array([str(volunteer_id) for volunteer_id in data["ids"]], dtype=object)
+            gallery.codes = codes
+            gallery._sq_norms = gallery._reconstructed_sq_norms(codes)
+            gallery._index_rows()
+        return gallery
+
+class TemplateGallery(FaceIndex):
+    """Gallery holding several encodings ("templates") per volunteer.
+
+    Each volunteer's templates are stored contiguously, together with their
+    centroid and radius (largest template distance from the centroid). A
+    query is first compared against the centroid matrix only, one vector per
+    volunteer. By the triangle inequality no template of a volunteer can be
+    closer than ``centroid distance - radius``, so only the ``shortlist``
+    nearest volunteers, plus any other volunteer whose bound still beats the
+    current ``k``-th best (or the match threshold), have their individual
+    templates compared. Results are the same as scanning every template.
+    """
+
+    def __init__(self, dim: int = 128, dtype=np.float64, shortlist: int = 8):
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.shortlist = shortlist
+        self.ids = np.empty(0, dtype=object)
+        self.templates = np.empty((0, dim), dtype=self.dtype)
+        self.centroids = np.empty((0, dim), dtype=self.dtype)
+        self.radii = np.empty(0, dtype=self.dtype)
+        self._starts = np.zeros(1, dtype=np.int64)
+        self._template_sq_norms = np.empty(0, dtype=self.dtype)
+        self._centroid_sq_norms = np.empty(0, dtype=self.dtype)
+        self._rows: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, volunteer_id: str) -> bool:
+        return volunteer_id in self._rows
+
+    @property
+    def template_count(self) -> int:
+        return len(self.templates)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the template and centroid matrices and their norms"""
+        return (self.templates.nbytes + self.centroids.nbytes + self.radii.nbytes +
+                self._template_sq_norms.nbytes + self._centroid_sq_norms.nbytes + self._starts.nbytes)
+
+    def set_encodings(self, ids: List[str], encodings: np.ndarray):
+        """Replace the contents; ``ids`` may repeat, one entry per template row"""
+        encodings = np.asarray(encodings).reshape(-1, self.dim)
+        if len(ids) != len(encodings):
+            raise ValueError("Number of ids does not match number of encodings")
+        rows_by_id: Dict[str, List[int]] = {}
+        for row, volunteer_id in enumerate(ids):
+            rows_by_id.setdefault(volunteer_id, []).append(row)
+        order = np.array([row for rows in rows_by_id.values() for row in rows], dtype=np.int64)
+        counts = np.array([len(rows) for rows in rows_by_id.values()], dtype=np.int64)
+
+        self.ids = np.array(list(rows_by_id), dtype=object)
+        self.templates = np.ascontiguousarray(encodings[order], dtype=self.dtype)
+        self._starts = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self._template_sq_norms = np.einsum('ij,ij->i', self.templates, self.templates)
+        if len(counts):
+            self.centroids = np.add.reduceat(self.templates, self._starts[:-1], axis=0) / counts[:, None]
+            spread = np.linalg.norm(self.templates - np.repeat(self.centroids, counts, axis=0), axis=1)
+            self.radii = np.maximum.reduceat(spread, self._starts[:-1]).astype(self.dtype)
+        else:
+            self.centroids = np.empty((0, self.dim), dtype=self.dtype)
+            self.radii = np.empty(0, dtype=self.dtype)
+        self.centroids = self.centroids.astype(self.dtype)
+        self._centroid_sq_norms = np.einsum('ij,ij->i', self.centroids, self.centroids)
+        self._rows = {volunteer_id: row for row, volunteer_id in enumerate(self.ids)}
+
+    def _row_ids(self) -> List[str]:
+        return list(np.repeat(self.ids, np.diff(self._starts)))
+
+    def add(self, volunteer_id: str, encoding: np.ndarray):
+        """Replace a volunteer's templates with this one encoding (see ``FaceIndex.add``)"""
+        encoding = np.asarray(encoding, dtype=self.dtype).reshape(1, self.dim)
+        row_ids = self._row_ids()
+        keep = np.array([row_id != volunteer_id for row_id in row_ids], dtype=bool)
+        self.set_encodings([row_id for row_id, kept in zip(row_ids, keep) if kept] + [volunteer_id],
+                           np.vstack([self.templates[keep], encoding]))
+
+    def remove(self, volunteer_id: str) -> bool:
+        """Remove a volunteer and all of their templates, returning False if absent"""
+        row = self._rows.get(volunteer_id)
+        if row is None:
+            return False
+        keep = np.ones(len(self.templates), dtype=bool)
+        keep[self._starts[row]:self._starts[row + 1]] = False
+        self.set_encodings([volunteer_id for volunteer_id, kept in zip(self._row_ids(), keep) if kept],
+                           self.templates[keep])
+        return True
+
+    def _closest_templates(self, query: np.ndarray, volunteers: np.ndarray) -> np.ndarray:
+        """Distance from ``query`` to the nearest template of each given volunteer"""
+        counts = self._starts[volunteers + 1] - self._starts[volunteers]
+        rows = np.concatenate([np.arange(self._starts[v], self._starts[v + 1]) for v in volunteers])
+        sq = self._template_sq_norms[rows] + query @ query - 2.0 * (self.templates[rows] @ query)
+        offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        return np.sqrt(np.maximum(np.minimum.reduceat(sq, offsets), 0.0))
+
+    def search(self, face_encodings, k: int = 1) -> List[Neighbours]:
+        return self.search_within(face_encodings, k, np.inf)
+
+    def search_within(self, face_encodings, k: int, max_distance: float) -> List[Neighbours]:
+        queries = np.asarray(face_encodings, dtype=self.dtype).reshape(-1, self.dim)
+        if not len(self.ids) or not len(queries):
+            return [[] for _ in range(len(queries))]
+        # Stage 1: one vectorized pass over the centroids
+        centroid_distances = np.sqrt(squared_distances(queries, self.centroids, self._centroid_sq_norms))
+        bounds = centroid_distances - self.radii
+        shortlists, _ = top_k_rows(centroid_distances, max(k, self.shortlist))
+        results = []
+        for query, query_bounds, shortlist in zip(queries, bounds, shortlists):
+            # Stage 2: exact template distances for the shortlisted volunteers
+            volunteers = shortlist[query_bounds[shortlist] <= max_distance]
+            distances = self._closest_templates(query, volunteers) if len(volunteers) else np.empty(0)
+            # Anyone outside the shortlist whose bound beats the k-th best could still rank
+            limit = max_distance if len(distances) < k else min(max_distance, np.partition(distances, k - 1)[k - 1])
+            extra = np.setdiff1d(np.flatnonzero(query_bounds < limit), volunteers, assume_unique=True)
+            if len(extra):
+                volunteers = np.concatenate([volunteers, extra])
+                distances = np.concatenate([distances, self._closest_templates(query, extra)])
+            order = np.argsort(distances)[:k]
+            results.append([(self.ids[volunteers[i]], float(distances[i])) for i in order])
+        return results
+
+    def save(self, path: str):
+        """Persist template ids and encodings to an .npz file"""
+        np.savez(path, ids=np.array(self._row_ids(), dtype=str), encodings=self.templates)
+
+    @classmethod
+    def load(cls, path: str) -> "TemplateGallery":
+        """Load a gallery written by ``save``"""
+        with np.load(path, allow_pickle=False) as data:
+            encodings = data["encodings"]
+            gallery = cls(dim=encodings.shape[1], dtype=encodings.dtype)
+            gallery.set_encodings([str(volunteer_id) for volunteer_id in data["ids"]], encodings)
+        return gallery
+
+def build_exact_gallery(ids: List[str], encodings: np.ndarray, dim: int = 128, dtype: str = "float64",
+                        rerank: int = 0, shortlist: int = 8) -> FaceIndex:
+    """Exact gallery for stored encoding rows, where ``ids`` may repeat.
+
+    Volunteers with several templates get a ``TemplateGallery``; int8 keeps
+    every template as its own quantized row, which already returns the
+    closest template of each volunteer.
+    """
+    if dtype == "int8":
+        gallery = QuantizedGallery(dim=dim, rerank=rerank)
+    elif len(set(ids)) < len(ids):
+        gallery = TemplateGallery(dim=dim, dtype=dtype, shortlist=shortlist)
+    else:
+        gallery = FaceGallery(dim=dim, dtype=dtype)
+    gallery.set_encodings(ids, encodings)
+    return gallery
@@ -0,0 +1,298 @@
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+
+Neighbours = List[Tuple[str, float]]
+
+def squared_distances(queries: np.ndarray, vectors: np.ndarray, vector_sq_norms: np.ndarray) -> np.ndarray:
+    """Squared Euclidean distances (M x N) via ||q||^2 + ||v||^2 - 2 q.v"""
+    sq = np.einsum('ij,ij->i', queries, queries)[:, None] + vector_sq_norms[None, :]
+    sq -= 2.0 * (queries @ vectors.T)
+    np.maximum(sq, 0.0, out=sq)
+    return sq
+
+def top_k_rows(distances: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Column indices and values of the ``k`` smallest entries of each row, sorted"""
+    n = distances.shape[1]
+    k = min(k, n)
+    if k < n:
+        rows = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    else:
+        rows = np.tile(np.arange(n), (distances.shape[0], 1))
+    values = np.take_along_axis(distances, rows, axis=1)
+    order = np.argsort(values, axis=1)
+    return np.take_along_axis(rows, order, axis=1), np.take_along_axis(values, order, axis=1)
+
+class FaceIndex:
+    """Common interface of the face encoding indexes.
+
+    Backends implement ``add``, ``remove``, ``search``, ``save`` and ``load``;
+    confidence-based matching is shared and uses the same ``(1 - distance) * 100``
+    scale as ``face_utils.compare_faces``.
+
+    A volunteer may own several encodings ("templates"); searches return each
+    volunteer once, at the distance of their closest template. Backends that
+    hold several templates per volunteer are built with repeated ids in one
+    go (``set_encodings``, ``IVFIndex.add_many``), while ``add`` always leaves
+    exactly one.
+    """
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def add(self, volunteer_id: str, encoding: np.ndarray):
+        """Make ``encoding`` the volunteer's only template, replacing any they had"""
+        raise NotImplementedError
+
+    def remove(self, volunteer_id: str) -> bool:
+        """Remove a volunteer and all of their templates, returning False if absent"""
+        raise NotImplementedError
+
+    def search(self, face_encodings, k: int = 1) -> List[Neighbours]:
+        """The ``k`` nearest (volunteer_id, distance) pairs for each query, closest first"""
+        raise NotImplementedError
+
+    def search_within(self, face_encodings, k: int, max_distance: float) -> List[Neighbours]:
+        """Like ``search``, but neighbours further than ``max_distance`` may be left out.
+
+        Backends that can prune with the bound override this; the default simply searches.
+        """
+        return self.search(face_encodings, k)
+
+    def save(self, path: str):
+        raise NotImplementedError
+
+    def match(self, face_encodings, top_k: int = 1, min_confidence: float = 0.0) -> List[List[Tuple[str, float]]]:
+        """Return the ``top_k`` (volunteer_id, confidence) pairs for each query face.
+
+        Candidates below ``min_confidence`` are dropped.
+        """
+        results = []
+        for neighbours in self.search_within(face_encodings, top_k, 1 - min_confidence / 100):
+            matches = []
+            for volunteer_id, distance in neighbours:
+                confidence = float((1 - distance) * 100)
+                if confidence < min_confidence:
+                    break
+                matches.append((volunteer_id, confidence))
+            results.append(matches)
+        return results
+
+    def best_matches(self, face_encodings, min_confidence: float = 0.0) -> List[Optional[Tuple[str, float]]]:
+        """Top-1 match per query face, or None when nothing reaches ``min_confidence``"""
+        return [matches[0] if matches else None
+                for matches in self.match(face_encodings, top_k=1, min_confidence=min_confidence)]
+
+class IVFIndex(FaceIndex):
+    """Approximate nearest-neighbour index using an inverted file (IVF).
+
+    Encodings are assigned to the nearest of ``n_lists`` k-means centroids; a
+    query only scans the lists of its ``nprobe`` closest centroids. Raising
+    ``nprobe`` trades latency for recall (``nprobe == n_lists`` is exact).
+    Until ``min_train_size`` encodings are present every query scans everything.
+    Every template of a volunteer is indexed as its own row.
+    """
+
+    def __init__(self, dim: int = 128, n_lists: Optional[int] = None, nprobe: int = 8,
+                 min_train_size: int = 1024, dtype=np.float64, seed: int = 0):
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.seed = seed
+
+        self.centroids: Optional[np.ndarray] = None
+        self._vectors = np.empty((0, dim), dtype=self.dtype)
+        self._sq_norms = np.empty(0, dtype=self.dtype)
+        self._ids = np.empty(0, dtype=object)
+        self._assign = np.empty(0, dtype=np.int64)
+        self._alive = np.empty(0, dtype=bool)
+        self._rows: Dict[str, List[int]] = {}
+        self._lists: Optional[List[np.ndarray]] = None
+        # Most templates any volunteer has, refreshed with the inverted lists
+        self._max_rows = 1
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, volunteer_id: str) -> bool:
+        return volunteer_id in self._rows
+
+    def volunteer_ids(self) -> List[str]:
+        return list(self._rows)
+
+    def template_count(self, volunteer_id: str) -> int:
+        return len(self._rows.get(volunteer_id, ()))
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, vectors: Optional[np.ndarray] = None, iterations: int = 20):
+        """Fit the coarse quantizer with k-means and reassign every stored vector"""
+        if vectors is None:
+            vectors = self._vectors[self._alive]
+        vectors = np.asarray(vectors, dtype=self.dtype).reshape(-1, self.dim)
+        n_lists = self.n_lists or max(1, int(np.sqrt(len(vectors))))
+        n_lists = min(n_lists, len(vectors))
+        if n_lists == 0:
+            return
+        rng = np.random.default_rng(self.seed)
+        # A few dozen points per list are plenty to place the centroids
+        if len(vectors) > 64 * n_lists:
+            vectors = vectors[rng.choice(len(vectors), 64 * n_lists, replace=False)]
+        self.centroids = _kmeans(vectors, n_lists, iterations, rng)
+        self.n_lists = n_lists
+        if len(self._vectors):
+            self._assign = self._nearest_centroid(self._vectors)
+        self._lists = None
+
+    def _nearest_centroid(self, vectors: np.ndarray) -> np.ndarray:
+        centroid_sq = np.einsum('ij,ij->i', self.centroids, self.centroids)
+        return np.argmin(squared_distances(vectors, self.centroids, centroid_sq), axis=1)
+
+    def add(self, volunteer_id: str, encoding: np.ndarray):
+        """Add (or replace) the encoding for a volunteer"""
+        self.add_many([volunteer_id], np.asarray(encoding).reshape(1, -1))
+
+    def add_many(self, ids: Sequence[str], encodings: np.ndarray):
+        """Add encodings, one row per template (``ids`` may repeat).
+
+        The templates of every listed volunteer replace the ones they had. The
+        quantizer is trained once enough data exists.
+        """
+        encodings = np.asarray(encodings, dtype=self.dtype).reshape(-1, self.dim)
+        for volunteer_id in set(ids):
+            self.remove(volunteer_id)
+        start = len(self._ids)
+        self._vectors = np.vstack([self._vectors, encodings])
+        self._sq_norms = np.append(self._sq_norms, np.einsum('ij,ij->i', encodings, encodings))
+        self._ids = np.append(self._ids, np.array(list(ids), dtype=object))
+        self._alive = np.append(self._alive, np.ones(len(ids), dtype=bool))
+        assign = self._nearest_centroid(encodings) if self.trained else np.zeros(len(ids), dtype=np.int64)
+        self._assign = np.append(self._assign, assign)
+        for offset, volunteer_id in enumerate(ids):
+            self._rows.setdefault(volunteer_id, []).append(start + offset)
+        self._lists = None
+        if not self.trained and np.count_nonzero(self._alive) >= self.min_train_size:
+            self.train()
+
+    def remove(self, volunteer_id: str) -> bool:
+        """Remove a volunteer's templates; storage is compacted once half the rows are dead"""
+        rows = self._rows.pop(volunteer_id, None)
+        if rows is None:
+            return False
+        self._alive[rows] = False
+        self._lists = None
+        if np.count_nonzero(self._alive) < len(self._alive) // 2:
+            self._compact()
+        return True
+
+    def _compact(self):
+        keep = self._alive
+        self._vectors = self._vectors[keep]
+        self._sq_norms = self._sq_norms[keep]
+        self._ids = self._ids[keep]
+        self._assign = self._assign[keep]
+        self._alive = np.ones(len(self._ids), dtype=bool)
+        self._index_rows()
+
+    def _index_rows(self):
+        """Rebuild the id -> rows map after the row order changed"""
+        self._rows = {}
+        for row, volunteer_id in enumerate(self._ids):
+            self._rows.setdefault(volunteer_id, []).append(row)
+
+    def _inverted_lists(self) -> List[np.ndarray]:
+        """Live row numbers per centroid, rebuilt lazily after changes"""
+        if self._lists is None:
+            live = np.flatnonzero(self._alive)
+            n_lists = self.n_lists if self.trained else 1
+            order = live[np.argsort(self._assign[live], kind='stable')]
+            bounds = np.searchsorted(self._assign[order], np.arange(n_lists + 1))
+            self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(n_lists)]
+            self._max_rows = max((len(rows) for rows in self._rows.values()), default=1)
+        return self._lists
+
+    def search(self, face_encodings, k: int = 1) -> List[Neighbours]:
+        queries = np.asarray(face_encodings, dtype=self.dtype).reshape(-1, self.dim)
+        if not len(self) or not len(queries):
+            return [[] for _ in range(len(queries))]
+        lists = self._inverted_lists()
+        if self.trained:
+            centroid_sq = np.einsum('ij,ij->i', self.centroids, self.centroids)
+            probes, _ = top_k_rows(squared_distances(queries, self.centroids, centroid_sq), self.nprobe)
+        else:
+            probes = np.zeros((len(queries), 1), dtype=np.int64)
+
+        results = []
+        for query, probe in zip(queries, probes):
+            candidates = np.concatenate([lists[p] for p in probe])
+            if not len(candidates):
+                results.append([])
+                continue
+            sq = squared_distances(query[None, :], self._vectors[candidates], self._sq_norms[candidates])
+            # Enough rows for k distinct volunteers, however many templates each has
+            rows, values = top_k_rows(sq, k * self._max_rows)
+            neighbours, seen = [], set()
+            for row, value in zip(rows[0], values[0]):
+                volunteer_id = self._ids[candidates[row]]
+                if volunteer_id not in seen:
+                    seen.add(volunteer_id)
+                    neighbours.append((volunteer_id, float(np.sqrt(value))))
+            results.append(neighbours[:k])
+        return results
+
+    def save(self, path: str):
+        """Persist the index (centroids, vectors, ids and assignments) to an .npz file"""
+        self._compact()
+        np.savez(
+            path,
+            centroids=self.centroids if self.trained else np.empty((0, self.dim), dtype=self.dtype),
+            vectors=self._vectors,
+            ids=np.array(self._ids, dtype=str),
+            assign=self._assign,
+            params=np.array([self.dim, self.n_lists or 0, self.nprobe, self.min_train_size, self.seed]),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        """Load an index written by ``save``"""
+        with np.load(path, allow_pickle=False) as data:
+            dim, n_lists, nprobe, min_train_size, seed = (int(value) for value in data["params"])
+            vectors = data["vectors"]
+            index = cls(dim, n_lists or None, nprobe, min_train_size, vectors.dtype, seed)
+            if len(data["centroids"]):
+                index.centroids = data["centroids"]
+            ids = [str(volunteer_id) for volunteer_id in data["ids"]]
+            index._vectors = vectors
+            index._sq_norms = np.einsum('ij,ij->i', vectors, vectors)
+            index._ids = np.array(ids, dtype=object)
+            index._assign = data["assign"].astype(np.int64)
+            index._alive = np.ones(len(ids), dtype=bool)
+            index._index_rows()
+        return index
+
+def _kmeans(vectors: np.ndarray, k: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    """Plain Lloyd's k-means with k-means++ seeding"""
+    centroids = np.empty((k, vectors.shape[1]), dtype=vectors.dtype)
+    centroids[0] = vectors[rng.integers(len(vectors))]
+    closest = np.sum((vectors - centroids[0]) ** 2, axis=1)
+    for i in range(1, k):
+        total = closest.sum()
+        pick = rng.choice(len(vectors), p=closest / total) if total > 0 else rng.integers(len(vectors))
+        centroids[i] = vectors[pick]
+        closest = np.minimum(closest, np.sum((vectors - centroids[i]) ** 2, axis=1))
+
+    for _ in range(iterations):
+        centroid_sq = np.einsum('ij,ij->i', centroids, centroids)
+        assign = np.argmin(squared_distances(vectors, centroids, centroid_sq), axis=1)
+        counts = np.bincount(assign, minlength=k)
+        sums = np.stack([np.bincount(assign, weights=vectors[:, d], minlength=k)
+                         for d in range(vectors.shape[1])], axis=1)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        if empty.any():
+            # Re-seed empty clusters with random points
+            centroids[empty] = vectors[rng.integers(len(vectors), size=int(empty.sum()))]
+    return centroids
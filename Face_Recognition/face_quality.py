@@ -0,0 +1,110 @@
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import cv2
+import face_recognition
+import numpy as np
+
+FaceLocation = Tuple[int, int, int, int]
+
+# Face crops are resized to this side before measuring sharpness, so the score
+# does not depend on how large the face is in the frame
+SHARPNESS_SIDE = 96
+
+class FaceQuality(NamedTuple):
+    size: int          # shorter side of the face box in pixels
+    sharpness: float   # variance of the Laplacian of the normalized crop
+    yaw: Optional[float]  # nose offset from the eye midpoint, in inter-eye distances
+    reason: Optional[str]  # why the face was rejected, None if usable
+
+    @property
+    def usable(self) -> bool:
+        return self.reason is None
+
+def laplacian_sharpness(image: np.ndarray, location: FaceLocation) -> float:
+    """Variance of the Laplacian over the face crop (low means blurred)"""
+    top, right, bottom, left = location
+    crop = image[max(top, 0):bottom, max(left, 0):right]
+    if crop.size == 0:
+        return 0.0
+    if crop.ndim == 3:
+        crop = cv2.cvtColor(crop, cv2.COLOR_RGB2GRAY)
+    crop = cv2.resize(crop, (SHARPNESS_SIDE, SHARPNESS_SIDE), interpolation=cv2.INTER_AREA)
+    return float(cv2.Laplacian(crop, cv2.CV_64F).var())
+
+def landmark_yaw(landmarks: Dict[str, List[Tuple[int, int]]]) -> Optional[float]:
+    """Horizontal nose offset from the eye midpoint; near 0 for frontal faces"""
+    try:
+        left_eye = np.mean(landmarks["left_eye"], axis=0)
+        right_eye = np.mean(landmarks["right_eye"], axis=0)
+        nose = np.mean(landmarks["nose_tip"], axis=0)
+    except (KeyError, ValueError):
+        return None
+    eye_distance = np.linalg.norm(right_eye - left_eye)
+    if eye_distance == 0:
+        return None
+    return float((nose[0] - (left_eye[0] + right_eye[0]) / 2) / eye_distance)
+
+class QualityGate:
+    """Cheap pre-encoding checks that skip faces which could never match.
+
+    Checks run cheapest first: box size, then Laplacian sharpness, then
+    landmark-based pose (5-point landmarks, far cheaper than an encoding).
+    Counters record how many encodings were skipped.
+    """
+
+    def __init__(self, min_size: int = 40, min_sharpness: float = 20.0, max_yaw: float = 0.35):
+        self.min_size = min_size
+        self.min_sharpness = min_sharpness
+        self.max_yaw = max_yaw
+
+        self._lock = threading.Lock()
+        self.faces_assessed = 0
+        self.faces_skipped: Dict[str, int] = {"small": 0, "blurred": 0, "pose": 0}
+
+    def assess(self, image: np.ndarray, location: FaceLocation) -> FaceQuality:
+        """Score one face in an RGB image"""
+        top, right, bottom, left = location
+        size = min(bottom - top, right - left)
+        if size < self.min_size:
+            return FaceQuality(size, 0.0, None, "small")
+        sharpness = laplacian_sharpness(image, location)
+        if sharpness < self.min_sharpness:
+            return FaceQuality(size, sharpness, None, "blurred")
+        yaw = None
+        if self.max_yaw is not None:
+            landmarks = face_recognition.face_landmarks(image, [location], model="small")
+            yaw = landmark_yaw(landmarks[0]) if landmarks else None
+            if yaw is not None and abs(yaw) > self.max_yaw:
+                return FaceQuality(size, sharpness, yaw, "pose")
+        return FaceQuality(size, sharpness, yaw, None)
+
+    def filter(self, image: np.ndarray, locations: List[FaceLocation]) -> Tuple[List[int], List[Tuple[int, str]]]:
+        """Indexes of usable faces, and (index, reason) for the skipped ones"""
+        usable, skipped = [], []
+        for index, location in enumerate(locations):
+            quality = self.assess(image, location)
+            if quality.usable:
+                usable.append(index)
+            else:
+                skipped.append((index, quality.reason))
+        self.record(len(locations), [reason for _, reason in skipped])
+        return usable, skipped
+
+    def record(self, assessed: int, reasons: List[str]):
+        """Count faces assessed elsewhere (e.g. by a worker process's copy of the gate)"""
+        with self._lock:
+            self.faces_assessed += assessed
+            for reason in reasons:
+                self.faces_skipped[reason] += 1
+
+    def stats(self) -> Dict:
+        """How much encoding work the gate saved"""
+        with self._lock:
+            skipped = sum(self.faces_skipped.values())
+            return {
+                "faces_assessed": self.faces_assessed,
+                "faces_encoded": self.faces_assessed - skipped,
+                "encodings_skipped": skipped,
+                "skipped_by_reason": dict(self.faces_skipped),
+                "encoding_saved_ratio": round(skipped / self.faces_assessed, 4) if self.faces_assessed else 0.0,
+            }
@@ -0,0 +1,143 @@
+import itertools
+from typing import List, Optional, Tuple
+import cv2
+import numpy as np
+
+FaceLocation = Tuple[int, int, int, int]
+
+# 'mil' ships with stock opencv-python; kcf, csrt and mosse need opencv-contrib-python
+TRACKER_TYPES = ('iou', 'mil', 'kcf', 'csrt', 'mosse')
+
+def box_iou(a: FaceLocation, b: FaceLocation) -> float:
+    """Intersection-over-union of two (top, right, bottom, left) boxes"""
+    top, right = max(a[0], b[0]), min(a[1], b[1])
+    bottom, left = min(a[2], b[2]), max(a[3], b[3])
+    intersection = max(0, right - left) * max(0, bottom - top)
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    union = area_a + area_b - intersection
+    return intersection / union if union > 0 else 0.0
+
+def _create_cv_tracker(tracker_type: str):
+    """Create an OpenCV single-object tracker, or None if this build lacks it"""
+    factory_name = f"Tracker{tracker_type.upper()}_create"
+    for module in (getattr(cv2, 'legacy', None), cv2):
+        factory = getattr(module, factory_name, None) if module is not None else None
+        if factory is not None:
+            return factory()
+    return None
+
+class Track:
+    """A face followed across frames, carrying its identity once known"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, location: FaceLocation):
+        self.track_id = next(self._ids)
+        self.location = location
+        self.volunteer_id: Optional[str] = None
+        self.confidence = 0.0
+        self.label = "Unknown"
+        self.color = (0, 0, 255)
+        self.missed = 0
+        self.cv_tracker = None
+
+    @property
+    def identified(self) -> bool:
+        return self.volunteer_id is not None
+
+class FaceTracker:
+    """Carries face boxes between full detections.
+
+    Detection (and encoding) only has to run every ``detect_interval`` frames
+    or right after a track is lost. In between, boxes are either kept in place
+    (``tracker_type='iou'``) or moved by an OpenCV tracker (``'mil'``, ``'kcf'``,
+    ``'csrt'``, ``'mosse'``). Detections are associated with existing tracks by
+    IoU, so an identified face keeps its identity and is not re-encoded.
+    """
+
+    def __init__(self, detect_interval: int = 5, tracker_type: str = 'iou',
+                 iou_threshold: float = 0.3, max_missed: int = 2):
+        if tracker_type not in TRACKER_TYPES:
+            raise ValueError(f"Unknown tracker type '{tracker_type}', expected one of {TRACKER_TYPES}")
+        if tracker_type != 'iou' and _create_cv_tracker(tracker_type) is None:
+            print(f"Warning: OpenCV tracker '{tracker_type}' not available, falling back to IoU tracking")
+            tracker_type = 'iou'
+        self.detect_interval = max(1, detect_interval)
+        self.tracker_type = tracker_type
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.tracks: List[Track] = []
+        self._frames_since_detection = self.detect_interval
+        self._track_lost = False
+
+    def should_detect(self) -> bool:
+        """Whether the current frame needs a full detection pass"""
+        return self._track_lost or self._frames_since_detection >= self.detect_interval
+
+    def update_detections(self, frame: np.ndarray, locations: List[FaceLocation]) -> List[Track]:
+        """Associate fresh detections with tracks; returns tracks that still need identifying"""
+        self._frames_since_detection = 1
+        self._track_lost = False
+
+        # Greedy IoU association, best overlaps first
+        pairs = sorted(
+            ((box_iou(track.location, location), t, d)
+             for t, track in enumerate(self.tracks)
+             for d, location in enumerate(locations)),
+            reverse=True
+        )
+        matched_tracks, matched_detections = set(), set()
+        for iou, t, d in pairs:
+            if iou < self.iou_threshold:
+                break
+            if t in matched_tracks or d in matched_detections:
+                continue
+            matched_tracks.add(t)
+            matched_detections.add(d)
+            self.tracks[t].location = locations[d]
+            self.tracks[t].missed = 0
+
+        survivors = []
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.missed += 1
+                if track.missed > self.max_missed:
+                    continue
+            survivors.append(track)
+        for d, location in enumerate(locations):
+            if d not in matched_detections:
+                survivors.append(Track(location))
+        self.tracks = survivors
+
+        if self.tracker_type != 'iou':
+            for track in self.tracks:
+                if track.missed == 0:
+                    self._start_cv_tracker(track, frame)
+        return [track for track in self.tracks if not track.identified and track.missed == 0]
+
+    def advance(self, frame: np.ndarray):
+        """Move tracks to the current frame without running detection"""
+        self._frames_since_detection += 1
+        if self.tracker_type == 'iou':
+            return
+        alive = []
+        for track in self.tracks:
+            ok, (x, y, w, h) = track.cv_tracker.update(frame) if track.cv_tracker else (False, (0, 0, 0, 0))
+            if ok:
+                track.location = (int(y), int(x + w), int(y + h), int(x))
+                alive.append(track)
+            else:
+                self._track_lost = True
+        self.tracks = alive
+
+    def _start_cv_tracker(self, track: Track, frame: np.ndarray):
+        top, right, bottom, left = track.location
+        track.cv_tracker = _create_cv_tracker(self.tracker_type)
+        track.cv_tracker.init(frame, (left, top, right - left, bottom - top))
+
+    def reset(self):
+        """Drop all tracks and force detection on the next frame"""
+        self.tracks = []
+        self._frames_since_detection = self.detect_interval
+        self._track_lost = False
@@ -1,35 +1,93 @@
 import face_recognition
 import numpy as np
 import cv2
-from PIL import Image
+from PIL import Image, ImageOps
 import io
-from typing import Tuple, List, Optional
+from typing import Tuple, List, NamedTuple, Optional
 import base64
 
 class FaceRecognitionError(Exception):
     """Custom exception for face recognition errors"""
     pass
 
-def image_to_array(image_data: bytes) -> np.ndarray:
-    """Convert image bytes to numpy array"""
+# Longest side uploads are decoded to before detection; faces in phone photos
+# stay well above HOG's minimum size at this resolution
+MAX_DETECTION_SIDE = 1024
+
+class EncodingSettings(NamedTuple):
+    """How registration photos are turned into encodings.
+
+    None of these change the encoding network, so encodings made with
+    different settings can still be compared with each other.
+    """
+    detection_model: str = "hog"  # face detector: "hog" or "cnn"
+    upsample: int = 1             # times the image is upsampled to find small faces
+    jitters: int = 1              # re-sampled crops averaged into the encoding
+
+DEFAULT_ENCODING_SETTINGS = EncodingSettings()
+
+# EXIF orientations that rotate the image by 90 degrees
+_TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+class DecodedImage:
+    """An upload decoded once at working resolution, with the mapping back to full size"""
+
+    def __init__(self, array: np.ndarray, full_size: Tuple[int, int]):
+        self.array = array
+        self.full_size = full_size
+        height, width = array.shape[:2]
+        self.scale = full_size[0] / width if width else 1.0
+
+    def to_full_resolution(self, face_location: Tuple[int, int, int, int]) -> Tuple[int, int, int, int]:
+        """Map a (top, right, bottom, left) box from working to full resolution"""
+        return tuple(int(round(value * self.scale)) for value in face_location)
+
+    def to_working_resolution(self, face_location: Tuple[int, int, int, int]) -> Tuple[int, int, int, int]:
+        """Map a (top, right, bottom, left) box from full to working resolution"""
+        return tuple(int(round(value / self.scale)) for value in face_location)
+
+def decode_image(image_data: bytes, max_side: Optional[int] = MAX_DETECTION_SIDE) -> DecodedImage:
+    """Decode image bytes to an upright RGB array no larger than ``max_side``.
+    
+    JPEGs are downscaled inside the decoder (PIL ``draft``, i.e. DCT scaling),
+    so a 12 MP photo is never fully materialized; EXIF orientation is applied.
+    """
     try:
         image = Image.open(io.BytesIO(image_data))
-        return np.array(image)
+        width, height = image.size
+        orientation = image.getexif().get(0x0112, 1)
+        full_size = (height, width) if orientation in _TRANSPOSED_ORIENTATIONS else (width, height)
+        
+        if max_side and max(width, height) > max_side:
+            factor = max_side / max(width, height)
+            # draft only scales by powers of two and never below the requested size
+            image.draft('RGB', (int(width * factor), int(height * factor)))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        if max_side and max(image.size) > max_side:
+            factor = max_side / max(image.size)
+            image = image.resize((max(1, round(image.width * factor)), max(1, round(image.height * factor))),
+                                 Image.BILINEAR)
+        return DecodedImage(np.asarray(image), full_size)
     except Exception as e:
         raise FaceRecognitionError(f"Failed to process image: {str(e)}")
 
-def detect_faces(image_array: np.ndarray) -> List[Tuple[int, int, int, int]]:
+def image_to_array(image_data: bytes) -> np.ndarray:
+    """Convert image bytes to numpy array"""
+    return decode_image(image_data, max_side=None).array
+
+def detect_faces(image_array: np.ndarray, upsample: int = 1, model: str = "hog") -> List[Tuple[int, int, int, int]]:
     """Detect faces in the image and return their locations"""
-    face_locations = face_recognition.face_locations(image_array)
+    face_locations = face_recognition.face_locations(image_array, upsample, model)
     if not face_locations:
         raise FaceRecognitionError("No face detected in the image")
     if len(face_locations) > 1:
         raise FaceRecognitionError("Multiple faces detected. Please provide an image with only one face")
     return face_locations
 
-def get_face_encoding(image_array: np.ndarray, face_location: Tuple[int, int, int, int]) -> np.ndarray:
+def get_face_encoding(image_array: np.ndarray, face_location: Tuple[int, int, int, int],
+                      num_jitters: int = 1) -> np.ndarray:
     """Get face encoding for a specific face location"""
-    face_encodings = face_recognition.face_encodings(image_array, [face_location])
+    face_encodings = face_recognition.face_encodings(image_array, [face_location], num_jitters)
     if not face_encodings:
         raise FaceRecognitionError("Failed to encode face")
     return face_encodings[0]
@@ -52,6 +110,19 @@ def draw_face_box(image_array: np.ndarray, face_location: Tuple[int, int, int, i
     
     return image_array
 
+def make_thumbnail(image_data: bytes, size: int = 96, quality: int = 80) -> bytes:
+    """Create a small JPEG thumbnail from image bytes"""
+    try:
+        image = Image.open(io.BytesIO(image_data))
+        image.draft('RGB', (size, size))
+        image = image.convert('RGB')
+        image.thumbnail((size, size))
+        buffered = io.BytesIO()
+        image.save(buffered, format="JPEG", quality=quality)
+        return buffered.getvalue()
+    except Exception as e:
+        raise FaceRecognitionError(f"Failed to create thumbnail: {str(e)}")
+
 def encode_to_bytes(encoding: np.ndarray) -> bytes:
     """Convert numpy array to bytes for database storage"""
     return base64.b64encode(encoding.tobytes())
@@ -60,24 +131,56 @@ def bytes_to_encoding(encoded_bytes: bytes) -> np.ndarray:
     """Convert bytes from database back to numpy array"""
     return np.frombuffer(base64.b64decode(encoded_bytes), dtype=np.float64)
 
-def process_registration_image(image_data: bytes) -> Tuple[np.ndarray, Tuple[int, int, int, int]]:
-    """Process image for registration, ensuring single face"""
-    image_array = image_to_array(image_data)
-    face_location = detect_faces(image_array)[0]
-    face_encoding = get_face_encoding(image_array, face_location)
-    return face_encoding, face_location
+def process_registration_image(image_data, settings: EncodingSettings = DEFAULT_ENCODING_SETTINGS
+                               ) -> Tuple[np.ndarray, Tuple[int, int, int, int]]:
+    """Process image for registration, ensuring single face.
+    
+    Accepts raw bytes or an already ``DecodedImage``; the returned face location
+    is in full-resolution coordinates.
+    """
+    decoded = image_data if isinstance(image_data, DecodedImage) else decode_image(image_data)
+    face_location = detect_faces(decoded.array, settings.upsample, settings.detection_model)[0]
+    face_encoding = get_face_encoding(decoded.array, face_location, settings.jitters)
+    return face_encoding, decoded.to_full_resolution(face_location)
+
+def detect_face_locations(image_array: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    """Detect all faces in the image, returning an empty list when there are none"""
+    return face_recognition.face_locations(image_array)
+
+def encode_faces(image_array: np.ndarray, face_locations: List[Tuple[int, int, int, int]]) -> List[np.ndarray]:
+    """Compute face encodings for the given face locations"""
+    if not face_locations:
+        return []
+    return face_recognition.face_encodings(image_array, face_locations)
 
-def process_attendance_image(image_data) -> Tuple[List[np.ndarray], List[Tuple[int, int, int, int]]]:
-    """Process image for attendance, allowing multiple faces"""
-    # If input is bytes, convert to numpy array
+def process_attendance_image(image_data, quality_gate=None,
+                             low_quality: Optional[list] = None) -> Tuple[List[np.ndarray], List[Tuple[int, int, int, int]]]:
+    """Process image for attendance, allowing multiple faces.
+    
+    With a ``face_quality.QualityGate``, faces failing it are not encoded; their
+    (location, reason) pairs are appended to ``low_quality`` if given.
+    """
+    # If input is bytes, decode once at working resolution
+    decoded = None
     if isinstance(image_data, bytes):
-        image_array = image_to_array(image_data)
+        decoded = decode_image(image_data)
+        image_array = decoded.array
     else:
         image_array = image_data  # Already a numpy array
         
-    face_locations = face_recognition.face_locations(image_array)
+    face_locations = detect_face_locations(image_array)
     if not face_locations:
         raise FaceRecognitionError("No faces detected in the image")
     
-    face_encodings = face_recognition.face_encodings(image_array, face_locations)
-    return face_encodings, face_locations
\ No newline at end of file
+    if quality_gate is not None:
+        usable, skipped = quality_gate.filter(image_array, face_locations)
+        if low_quality is not None:
+            low_quality.extend(
+                (decoded.to_full_resolution(face_locations[index]) if decoded is not None else face_locations[index], reason)
+                for index, reason in skipped)
+        face_locations = [face_locations[index] for index in usable]
+    
+    face_encodings = encode_faces(image_array, face_locations)
+    if decoded is not None:
+        face_locations = [decoded.to_full_resolution(location) for location in face_locations]
+    return face_encodings, face_locations
@@ -0,0 +1,322 @@
+"""Where live frames come from: webcams, video files or streams, image
+directories and recorded sessions, plus a recorder for live sessions.
+
+Record a session from a webcam (or any other source) for later replay:
+    python frame_source.py --source 0 --record sessions/event1 --seconds 120
+
+A recorded session is a directory of JPEG frames plus ``session.jsonl``, one
+``{"frame": n, "file": ..., "t": seconds}`` line per frame, so it can be
+replayed with its original timing or as fast as frames can be decoded.
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Union
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+SESSION_INDEX = "session.jsonl"
+
+class FrameSource:
+    """A sequence of BGR frames with the ``read()`` contract of ``cv2.VideoCapture``.
+
+    ``open()`` prepares the source and returns False if it cannot be used,
+    ``read()`` returns ``(success, frame)`` and fails once the source is
+    exhausted, and ``release()`` frees it.
+    """
+
+    name = "source"
+
+    def open(self) -> bool:
+        return True
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        raise NotImplementedError
+
+    def release(self):
+        pass
+
+    def stats(self) -> Dict:
+        return {"source": self.name, "type": type(self).__name__}
+
+class Pacer:
+    """Sleeps so frames come out at their timestamps scaled by ``1 / speed`` (0 means no waiting)"""
+
+    def __init__(self, speed: float = 1.0):
+        self.speed = speed
+        self._started: Optional[float] = None
+
+    def wait(self, timestamp: float):
+        if not self.speed:
+            return
+        now = time.monotonic()
+        if self._started is None:
+            self._started = now - timestamp / self.speed
+        delay = self._started + timestamp / self.speed - now
+        if delay > 0:
+            time.sleep(delay)
+
+class WebcamSource(FrameSource):
+    """A local camera opened by index at the requested resolution"""
+
+    def __init__(self, index: int = 0, width: int = 640, height: int = 480):
+        self.index = index
+        self.width = width
+        self.height = height
+        self.name = str(index)
+        self._cap = None
+
+    def open(self) -> bool:
+        self._cap = cv2.VideoCapture(self.index)
+        if not self._cap.isOpened():
+            print("Error: Could not open webcam")
+            return False
+        self._cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        self._cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        return True
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        return self._cap.read()
+
+    def release(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+class VideoFileSource(FrameSource):
+    """A video file, or a network stream such as an RTSP URL.
+
+    Files are played at their own frame rate scaled by ``speed`` (0 reads as
+    fast as possible) and can ``loop``; network streams are live already and
+    are never paced.
+    """
+
+    def __init__(self, path: str, speed: float = 1.0, loop: bool = False):
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self.name = path
+        self.is_stream = "://" in path
+        self._cap = None
+        self._pacer = Pacer(0 if self.is_stream else speed)
+        self._fps = 0.0
+        self._frame = 0
+
+    def open(self) -> bool:
+        self._cap = cv2.VideoCapture(self.path)
+        if not self._cap.isOpened():
+            print(f"Error: Could not open video {self.path}")
+            return False
+        self._fps = self._cap.get(cv2.CAP_PROP_FPS) or 25.0
+        return True
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        success, frame = self._cap.read()
+        if not success and self.loop and not self.is_stream and self._frame:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            success, frame = self._cap.read()
+        if success:
+            self._pacer.wait(self._frame / self._fps)
+            self._frame += 1
+        return success, frame
+
+    def release(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+class ImageDirectorySource(FrameSource):
+    """Every image of a directory in name order, at ``fps`` frames per second (0: no pacing)"""
+
+    def __init__(self, directory: str, fps: float = 10.0, loop: bool = False):
+        self.directory = directory
+        self.fps = fps
+        self.loop = loop
+        self.name = directory
+        self._files: List[str] = []
+        self._pacer = Pacer(1.0 if fps else 0)
+        self._frame = 0
+
+    def open(self) -> bool:
+        if not os.path.isdir(self.directory):
+            print(f"Error: {self.directory} is not a directory")
+            return False
+        self._files = sorted(os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                             if name.lower().endswith(IMAGE_EXTENSIONS))
+        return bool(self._files)
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        # Give up once a full pass over the files has not decoded a single one
+        unreadable = 0
+        while (self.loop or self._frame < len(self._files)) and unreadable < len(self._files):
+            frame = cv2.imread(self._files[self._frame % len(self._files)])
+            self._pacer.wait(self._frame / self.fps if self.fps else 0.0)
+            self._frame += 1
+            if frame is not None:
+                return True, frame
+            unreadable += 1
+        return False, None
+
+class RecordedSessionSource(FrameSource):
+    """Replays a session written by ``RecordingSource`` with its original timing.
+
+    ``speed`` scales the recorded timing (2.0 plays twice as fast) and 0
+    replays as fast as frames can be decoded, for reproducible profiling.
+    """
+
+    def __init__(self, directory: str, speed: float = 1.0):
+        self.directory = directory
+        self.speed = speed
+        self.name = directory
+        self._entries: List[Dict] = []
+        self._pacer = Pacer(speed)
+        self._frame = 0
+
+    @staticmethod
+    def is_session(directory: str) -> bool:
+        return os.path.isfile(os.path.join(directory, SESSION_INDEX))
+
+    def open(self) -> bool:
+        try:
+            with open(os.path.join(self.directory, SESSION_INDEX), 'r') as f:
+                # A session cut short by a crash may end with a partial line
+                self._entries = [json.loads(line) for line in f if line.endswith('\n')]
+        except OSError as e:
+            print(f"Error: Could not open session {self.directory}: {str(e)}")
+            return False
+        return bool(self._entries)
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if self._frame >= len(self._entries):
+            return False, None
+        entry = self._entries[self._frame]
+        self._frame += 1
+        frame = cv2.imread(os.path.join(self.directory, entry["file"]))
+        if frame is None:
+            return False, None
+        self._pacer.wait(entry["t"])
+        return True, frame
+
+    def stats(self) -> Dict:
+        return dict(super().stats(), frames=len(self._entries), position=self._frame, speed=self.speed)
+
+class RecordingSource(FrameSource):
+    """Passes frames through from another source while recording them as a session.
+
+    Frames are JPEG-encoded and written by a background thread, so the
+    capture loop only pays for a copy; it blocks only if the disk falls
+    ``buffer`` frames behind, and never drops a recorded frame. A session is
+    never written over another one: if ``directory`` already has files, the
+    first free ``<directory>-<n>`` is used instead.
+    """
+
+    def __init__(self, source: FrameSource, directory: str, jpeg_quality: int = 95, buffer: int = 64):
+        self.source = source
+        self.directory = directory
+        self.jpeg_quality = jpeg_quality
+        self.name = source.name
+        self._queue: "queue.Queue" = queue.Queue(maxsize=buffer)
+        self._writer: Optional[threading.Thread] = None
+        self._started: Optional[float] = None
+        self._frame = 0
+        self.frames_recorded = 0
+
+    def open(self) -> bool:
+        if not self.source.open():
+            return False
+        self.directory = self._claim_directory(self.directory)
+        self._writer = threading.Thread(target=self._write_loop, name="session-recorder", daemon=True)
+        self._writer.start()
+        return True
+
+    @staticmethod
+    def _claim_directory(directory: str) -> str:
+        """``directory`` if it is new or empty, else the first new ``<directory>-<n>``"""
+        candidate, suffix = directory, 0
+        while True:
+            try:
+                os.makedirs(candidate)
+                return candidate
+            except FileExistsError:
+                if os.path.isdir(candidate) and not os.listdir(candidate):
+                    return candidate
+            suffix += 1
+            candidate = f"{directory}-{suffix}"
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        success, frame = self.source.read()
+        if success:
+            now = time.monotonic()
+            if self._started is None:
+                self._started = now
+            self._queue.put((self._frame, now - self._started, frame.copy()))
+            self._frame += 1
+        return success, frame
+
+    def _write_loop(self):
+        with open(os.path.join(self.directory, SESSION_INDEX), 'w') as index:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                number, timestamp, frame = item
+                name = f"{number:06d}.jpg"
+                cv2.imwrite(os.path.join(self.directory, name), frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+                index.write(json.dumps({"frame": number, "file": name, "t": round(timestamp, 4)}) + "\n")
+                index.flush()
+                self.frames_recorded += 1
+
+    def release(self):
+        self.source.release()
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+
+    def stats(self) -> Dict:
+        return dict(self.source.stats(), recording=self.directory, frames_recorded=self.frames_recorded)
+
+def open_frame_source(spec: Union[int, str, FrameSource], width: int = 640, height: int = 480,
+                      speed: float = 1.0) -> FrameSource:
+    """Frame source for a spec: a camera index, a video file or stream URL,
+    a recorded session directory or a directory of images"""
+    if isinstance(spec, FrameSource):
+        return spec
+    if isinstance(spec, int) or str(spec).isdigit():
+        return WebcamSource(int(spec), width, height)
+    if os.path.isdir(spec):
+        if RecordedSessionSource.is_session(spec):
+            return RecordedSessionSource(spec, speed)
+        return ImageDirectorySource(spec, fps=10.0 * speed)
+    return VideoFileSource(spec, speed)
+
+def main():
+    parser = argparse.ArgumentParser(description="Record frames from a source for later replay")
+    parser.add_argument('--source', default='0', help='Camera index, video file, RTSP URL or image directory (default: 0)')
+    parser.add_argument('--record', required=True, help='Directory to write the session to')
+    parser.add_argument('--seconds', type=float, default=None, help='Stop after this long (default: until the source ends)')
+    parser.add_argument('--width', type=int, default=640, help='Webcam capture width (default: 640)')
+    parser.add_argument('--height', type=int, default=480, help='Webcam capture height (default: 480)')
+    args = parser.parse_args()
+
+    source = RecordingSource(open_frame_source(args.source, args.width, args.height), args.record)
+    if not source.open():
+        raise SystemExit(f"Could not open {args.source}")
+    started = time.monotonic()
+    try:
+        while args.seconds is None or time.monotonic() - started < args.seconds:
+            success, _ = source.read()
+            if not success:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        source.release()
+    print(f"Recorded {source.frames_recorded} frames to {source.directory}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,343 @@
+import threading
+import time
+from typing import Dict, Iterator, Optional, Union
+import cv2
+import numpy as np
+from face_utils import detect_face_locations, encode_faces
+from face_tracker import FaceTracker
+from face_quality import QualityGate
+from motion_gate import MotionGate
+from quality_controller import QualityController
+from frame_source import FrameSource, RecordingSource, open_frame_source
+from metrics import metrics
+
+class FrameRecognizer:
+    """Detects, tracks, identifies and annotates faces frame by frame for one event"""
+
+    def __init__(self, data_manager, event_id: str, detect_interval: int = 5,
+                 tracker_type: str = 'iou', match_threshold: float = 90,
+                 quality_gate: Optional[QualityGate] = None,
+                 motion_gate: Optional[MotionGate] = None):
+        self.data_manager = data_manager
+        self.event_id = event_id
+        self.match_threshold = match_threshold
+        self.tracker = FaceTracker(detect_interval, tracker_type)
+        # Faces failing the gate are not encoded and are re-checked at the next detection
+        self.quality_gate = quality_gate
+        # Without motion and with no face tracked, detection is skipped entirely
+        self.motion_gate = motion_gate
+        # Detection runs on the frame resized by this factor (set by the quality controller)
+        self.detection_scale = 1.0
+        # Seconds spent in each stage of the last processed frame
+        self.timings: Dict[str, float] = {}
+
+    def process(self, frame: np.ndarray) -> np.ndarray:
+        """Run recognition on a BGR frame and draw the results onto it"""
+        self.timings = {}
+        try:
+            # Volunteer count of the cached snapshot (reloaded only when the store changes)
+            if not self.data_manager.volunteer_count():
+                self.tracker.reset()
+                # If no volunteers, just show the frame with a message
+                cv2.putText(frame, "No registered volunteers", (10, 30),
+                          cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+            elif self._idle(frame):
+                cv2.putText(frame, "Idle", (10, 30),
+                          cv2.FONT_HERSHEY_SIMPLEX, 0.7, (200, 200, 200), 2)
+            else:
+                if self.tracker.should_detect():
+                    # Convert frame to RGB (face_recognition uses RGB)
+                    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+                    # Full detection; only faces without an identity get encoded
+                    with metrics.timer("live", "detect", self.timings):
+                        face_locations = self.detect(rgb_frame)
+                    metrics.inc("faces_detected_total", len(face_locations))
+                    with metrics.timer("live", "track", self.timings):
+                        new_tracks = self.tracker.update_detections(frame, face_locations)
+                    self.identify_tracks(new_tracks, rgb_frame)
+                else:
+                    with metrics.timer("live", "track", self.timings):
+                        self.tracker.advance(frame)
+
+                self.draw_tracks(frame)
+
+        except Exception as e:
+            print(f"Error processing frame: {str(e)}")
+            # Add error message to frame
+            cv2.putText(frame, f"Error: {str(e)}", (10, 30),
+                      cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+        return frame
+
+    def _idle(self, frame: np.ndarray) -> bool:
+        """Whether the motion gate lets this frame skip detection and tracking"""
+        if self.motion_gate is None:
+            return False
+        with metrics.timer("live", "motion", self.timings):
+            moving = self.motion_gate.update(frame)
+        active = moving or bool(self.tracker.tracks)
+        metrics.set_gauge("live_motion_active", int(active), {"event_id": self.event_id})
+        if not active:
+            metrics.inc("frames_idle_total")
+        return not active
+
+    def detect(self, rgb_frame: np.ndarray):
+        """Detect faces on a downscaled copy, returning full-frame locations"""
+        scale = self.detection_scale
+        if scale >= 1.0:
+            return detect_face_locations(rgb_frame)
+        small_frame = cv2.resize(rgb_frame, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return [tuple(int(round(value / scale)) for value in location)
+                for location in detect_face_locations(small_frame)]
+
+    def identify_tracks(self, tracks, rgb_frame: np.ndarray):
+        """Encode and match the faces of unidentified tracks, marking attendance"""
+        if self.quality_gate is not None and tracks:
+            with metrics.timer("live", "quality", self.timings):
+                usable, skipped = self.quality_gate.filter(rgb_frame, [track.location for track in tracks])
+            for index, reason in skipped:
+                tracks[index].label = f"Low quality ({reason})"
+                tracks[index].color = (128, 128, 128)  # Gray
+            metrics.inc("faces_low_quality_total", len(skipped))
+            tracks = [tracks[index] for index in usable]
+        if not tracks:
+            return
+        with metrics.timer("live", "encode", self.timings):
+            face_encodings = encode_faces(rgb_frame, [track.location for track in tracks])
+
+        # Match every new face against the whole gallery in one batch
+        with metrics.timer("live", "match", self.timings):
+            gallery = self.data_manager.get_gallery()
+            matches = gallery.best_matches(face_encodings, min_confidence=self.match_threshold)
+
+        for track, match in zip(tracks, matches):
+            volunteer = self.data_manager.lookup(match[0]) if match else None
+            if volunteer is None:
+                metrics.inc("face_unknowns_total")
+                track.label = "Unknown"
+                track.color = (0, 0, 255)  # Red
+                continue
+            metrics.inc("face_matches_total")
+            volunteer_id, confidence = match
+            track.volunteer_id = volunteer_id
+            track.confidence = confidence
+            # Mark attendance
+            with metrics.timer("live", "mark", self.timings):
+                marked = self.data_manager.mark_attendance(self.event_id, volunteer_id, confidence)
+            if marked:
+                track.color = (0, 255, 0)  # Green
+                track.label = f"{volunteer['name']} ({confidence:.1f}%) - Marked!"
+            else:
+                track.color = (0, 165, 255)  # Orange in BGR
+                track.label = f"{volunteer['name']} - Already Marked"
+
+    def draw_tracks(self, frame: np.ndarray):
+        """Draw box and label for every currently visible track"""
+        for track in self.tracker.tracks:
+            if track.missed:
+                continue
+            top, right, bottom, left = track.location
+            cv2.rectangle(frame, (left, top), (right, bottom), track.color, 2)
+            cv2.rectangle(frame, (left, bottom - 35), (right, bottom), track.color, cv2.FILLED)
+            cv2.putText(frame, track.label, (left + 6, bottom - 6),
+                      cv2.FONT_HERSHEY_DUPLEX, 0.6, (255, 255, 255), 1)
+
+class LiveAttendancePipeline:
+    """Camera capture, recognition and streaming decoupled into separate stages.
+
+    - A capture thread reads the camera as fast as it delivers and keeps only
+      the latest frame; a frame replaced before inference picked it up is
+      counted as dropped.
+    - An inference thread takes the latest frame whenever it is free, runs the
+      ``FrameRecognizer`` and JPEG-encodes the annotated result.
+    - ``stream()`` hands out the latest annotated JPEG at a fixed rate, so slow
+      recognition never stalls the camera buffer or the viewer.
+
+    With a ``QualityController`` every frame's stage timings are reported to it
+    and its detection scale, detection interval and JPEG quality are applied
+    to the next frame; the current settings are drawn onto the stream.
+
+    ``source`` is a camera index, anything ``open_frame_source`` accepts, or a
+    ``FrameSource``; with ``record_dir`` the captured frames are also recorded
+    as a replayable session.
+    """
+
+    def __init__(self, recognizer: FrameRecognizer, source: Union[int, str, FrameSource] = 0,
+                 width: int = 640, height: int = 480,
+                 controller: Optional[QualityController] = None, record_dir: Optional[str] = None):
+        self.recognizer = recognizer
+        self.controller = controller
+        self.source = open_frame_source(source, width, height)
+        if record_dir:
+            self.source = RecordingSource(self.source, record_dir)
+        self.width = width
+        self.height = height
+
+        self._stop = threading.Event()
+        self._frame_ready = threading.Condition()
+        self._output_ready = threading.Condition()
+        self._latest_frame: Optional[np.ndarray] = None
+        self._latest_jpeg: Optional[bytes] = None
+        self._output_seq = 0
+        self._threads = []
+        self._source_open = False
+
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.frames_processed = 0
+        self.frames_streamed = 0
+        self.inference_seconds = 0.0
+        self.started_at = None
+        self._jpeg_quality = 95
+        if controller is not None:
+            self._apply_settings(controller.settings)
+
+    def _apply_settings(self, settings):
+        self.recognizer.detection_scale = settings.detection_scale
+        self.recognizer.tracker.detect_interval = settings.detect_interval
+        self._jpeg_quality = settings.jpeg_quality
+
+    def start(self) -> bool:
+        """Open the frame source and start the capture and inference threads"""
+        if not self.source.open():
+            return False
+        self._source_open = True
+
+        self.started_at = time.monotonic()
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="live-capture", daemon=True),
+            threading.Thread(target=self._inference_loop, name="live-inference", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        return True
+
+    def stop(self):
+        """Stop all stages and release the frame source"""
+        self._stop.set()
+        with self._frame_ready:
+            self._frame_ready.notify_all()
+        with self._output_ready:
+            self._output_ready.notify_all()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=2)
+        if self._source_open:
+            self.source.release()
+            self._source_open = False
+
+    @property
+    def running(self) -> bool:
+        return not self._stop.is_set()
+
+    def _capture_loop(self):
+        while not self._stop.is_set():
+            with metrics.timer("live", "capture"):
+                success, frame = self.source.read()
+            if not success:
+                print("Error: Could not read frame")
+                self._stop.set()
+                break
+            with self._frame_ready:
+                if self._latest_frame is not None:
+                    # Inference is behind: drop the stale frame explicitly
+                    self.frames_dropped += 1
+                    metrics.inc("frames_dropped_total")
+                self._latest_frame = frame
+                self.frames_captured += 1
+                self._frame_ready.notify()
+        with self._frame_ready:
+            self._frame_ready.notify_all()
+        with self._output_ready:
+            self._output_ready.notify_all()
+
+    def _inference_loop(self):
+        while True:
+            with self._frame_ready:
+                while self._latest_frame is None and not self._stop.is_set():
+                    self._frame_ready.wait()
+                if self._stop.is_set():
+                    break
+                frame, self._latest_frame = self._latest_frame, None
+
+            started = time.perf_counter()
+            annotated = self.recognizer.process(frame)
+            if self.controller is not None:
+                cv2.putText(annotated, self.controller.overlay_text(), (10, annotated.shape[0] - 10),
+                          cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
+            encode_started = time.perf_counter()
+            try:
+                # Convert frame to JPEG once; every stream tick reuses the bytes
+                ret, buffer = cv2.imencode('.jpg', annotated, [cv2.IMWRITE_JPEG_QUALITY, self._jpeg_quality])
+                if not ret:
+                    print("Error: Could not encode frame")
+                    continue
+            except Exception as e:
+                print(f"Error streaming frame: {str(e)}")
+                continue
+            finished = time.perf_counter()
+            metrics.observe("live", "jpeg", finished - encode_started)
+            metrics.inc("frames_processed_total")
+            self.inference_seconds += finished - started
+            if self.controller is not None:
+                timings = dict(self.recognizer.timings, jpeg=finished - encode_started)
+                self._apply_settings(self.controller.record(timings))
+
+            with self._output_ready:
+                self._latest_jpeg = buffer.tobytes()
+                self._output_seq += 1
+                self.frames_processed += 1
+                self._output_ready.notify_all()
+
+    def latest_jpeg(self, timeout: float = None) -> Optional[bytes]:
+        """Latest annotated JPEG, waiting up to ``timeout`` for the first one"""
+        with self._output_ready:
+            if self._latest_jpeg is None and self.running:
+                self._output_ready.wait(timeout)
+            return self._latest_jpeg
+
+    def stream(self, fps: float = 15) -> Iterator[bytes]:
+        """Yield the latest annotated frame as MJPEG parts at a fixed rate"""
+        interval = 1.0 / fps
+        next_tick = time.monotonic()
+        while self.running:
+            frame_bytes = self.latest_jpeg(timeout=1.0)
+            if frame_bytes is not None:
+                self.frames_streamed += 1
+                # Yield frame for streaming
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.monotonic()
+
+    def stats(self) -> Dict:
+        """Counters describing how the stages keep up with each other"""
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        with self._frame_ready:
+            queue_depth = 0 if self._latest_frame is None else 1
+        stats = {
+            "event_id": self.recognizer.event_id,
+            "camera": self.source.name,
+            "source": self.source.stats(),
+            "running": self.running,
+            "queue_depth": queue_depth,
+            "frames_captured": self.frames_captured,
+            "frames_dropped": self.frames_dropped,
+            "frames_processed": self.frames_processed,
+            "frames_streamed": self.frames_streamed,
+            "capture_fps": round(self.frames_captured / elapsed, 2) if elapsed else 0.0,
+            "inference_fps": round(self.frames_processed / elapsed, 2) if elapsed else 0.0,
+            "avg_inference_ms": round(1000 * self.inference_seconds / self.frames_processed, 2)
+                                if self.frames_processed else 0.0,
+        }
+        if self.controller is not None:
+            stats["quality"] = self.controller.stats()
+        if self.recognizer.quality_gate is not None:
+            stats["face_quality"] = self.recognizer.quality_gate.stats()
+        if self.recognizer.motion_gate is not None:
+            stats["motion"] = self.recognizer.motion_gate.stats()
+        return stats
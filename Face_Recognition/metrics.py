@@ -0,0 +1,131 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+import numpy as np
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+COUNTERS = {
+    "faces_detected_total": "Faces found by full detection passes",
+    "face_matches_total": "Detected faces matched to a registered volunteer",
+    "face_unknowns_total": "Detected faces that matched no volunteer",
+    "faces_low_quality_total": "Detected faces skipped by the quality gate instead of being encoded",
+    "duplicate_faces_total": "Registrations whose face matched an already registered volunteer",
+    "frames_processed_total": "Live frames run through recognition",
+    "frames_dropped_total": "Live frames replaced before recognition picked them up",
+    "frames_idle_total": "Live frames skipped by the motion gate with no face tracked",
+    "worker_restarts_total": "Recognition worker processes restarted after dying",
+}
+
+GAUGES = {
+    "live_motion_active": "1 while a live stream sees motion or tracks a face, 0 while idle",
+}
+
+class RollingHistogram:
+    """Latency samples over a sliding window plus lifetime count and sum"""
+
+    def __init__(self, window: int = 1024):
+        self._samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float):
+        self._samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def quantiles(self, quantiles=QUANTILES) -> Dict[float, float]:
+        if not self._samples:
+            return {}
+        values = np.quantile(np.fromiter(self._samples, dtype=float), quantiles)
+        return dict(zip(quantiles, values.tolist()))
+
+class Metrics:
+    """Per-stage latency histograms and counters rendered in Prometheus text format.
+
+    Latencies are keyed by ``(path, stage)``, e.g. ``("live", "detect")`` or
+    ``("register", "store")``; quantiles come from the last ``window`` samples.
+    """
+
+    def __init__(self, window: int = 1024):
+        self.window = window
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, str], RollingHistogram] = {}
+        self._counters: Dict[str, int] = dict.fromkeys(COUNTERS, 0)
+        self._gauges: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+
+    def observe(self, path: str, stage: str, seconds: float):
+        with self._lock:
+            histogram = self._histograms.get((path, stage))
+            if histogram is None:
+                histogram = self._histograms[(path, stage)] = RollingHistogram(self.window)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, path: str, stage: str, timings: Optional[Dict[str, float]] = None) -> Iterator[None]:
+        """Time a block; the elapsed seconds are also added to ``timings[stage]`` if given"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.observe(path, stage, elapsed)
+            if timings is not None:
+                timings[stage] = timings.get(stage, 0.0) + elapsed
+
+    def inc(self, counter: str, amount: int = 1):
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + amount
+
+    def set_gauge(self, gauge: str, value: float, labels: Optional[Dict[str, str]] = None):
+        with self._lock:
+            self._gauges[(gauge, tuple(sorted((labels or {}).items())))] = value
+
+    def snapshot(self) -> Dict:
+        """Counters and per-stage count and quantiles (milliseconds) as plain data"""
+        with self._lock:
+            stages = {f"{path}.{stage}": {
+                "count": histogram.count,
+                **{f"p{int(q * 100)}_ms": round(1000 * value, 3)
+                   for q, value in histogram.quantiles().items()}
+            } for (path, stage), histogram in sorted(self._histograms.items())}
+            gauges = {gauge + "".join(f"[{key}={value}]" for key, value in labels): value
+                      for (gauge, labels), value in sorted(self._gauges.items())}
+            return {"counters": dict(self._counters), "gauges": gauges, "stages": stages}
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+            self._counters = dict.fromkeys(COUNTERS, 0)
+            self._gauges = {}
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines = [
+            "# HELP face_stage_seconds Latency of each recognition stage",
+            "# TYPE face_stage_seconds summary",
+        ]
+        with self._lock:
+            for (path, stage), histogram in sorted(self._histograms.items()):
+                labels = f'path="{path}",stage="{stage}"'
+                for q, value in histogram.quantiles().items():
+                    lines.append(f'face_stage_seconds{{{labels},quantile="{q}"}} {value:.6f}')
+                lines.append(f"face_stage_seconds_sum{{{labels}}} {histogram.total:.6f}")
+                lines.append(f"face_stage_seconds_count{{{labels}}} {histogram.count}")
+            for counter, value in sorted(self._counters.items()):
+                lines.append(f"# HELP {counter} {COUNTERS.get(counter, counter)}")
+                lines.append(f"# TYPE {counter} counter")
+                lines.append(f"{counter} {value}")
+            for gauge in sorted({gauge for gauge, _ in self._gauges}):
+                lines.append(f"# HELP {gauge} {GAUGES.get(gauge, gauge)}")
+                lines.append(f"# TYPE {gauge} gauge")
+                for (name, labels), value in sorted(self._gauges.items()):
+                    if name == gauge:
+                        label_text = ",".join(f'{key}="{label}"' for key, label in labels)
+                        lines.append(f"{gauge}{{{label_text}}} {value:g}" if label_text else f"{gauge} {value:g}")
+        return "\n".join(lines) + "\n"
+
+# Process-wide registry shared by the live pipeline and the Flask routes
+metrics = Metrics()
@@ -0,0 +1,19 @@
+"""Convert a legacy volunteers.json (base64 encodings) to the binary encoding store.
+
+Usage:
+    python migrate_encodings.py [--data-dir data]
+"""
+import argparse
+from data_manager import DataManager
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate base64 face encodings to the binary encoding store")
+    parser.add_argument('--data-dir', default='data', help='DataManager data directory (default: data)')
+    args = parser.parse_args()
+    
+    data_manager = DataManager(args.data_dir)
+    migrated = data_manager.migrate_json_encodings()
+    print(f"Migrated {migrated} encodings to {data_manager.encodings_dir}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import threading
+from typing import Dict, Optional
+import cv2
+import numpy as np
+
+class MotionGate:
+    """Cheap motion detector that lets an idle camera skip face detection.
+
+    Each frame is shrunk to ``width`` pixels wide, converted to blurred
+    grayscale and compared with a running-average background. The score is
+    the fraction of pixels that differ from the background by more than
+    ``pixel_threshold``. Motion above ``threshold`` makes the gate active. It
+    stays active for ``hold_frames`` frames after the last motion, so a person
+    standing still in front of the kiosk is not dropped straight away.
+    """
+
+    def __init__(self, threshold: float = 0.01, pixel_threshold: int = 25, width: int = 160,
+                 learning_rate: float = 0.05, hold_frames: int = 30):
+        self.threshold = threshold
+        self.pixel_threshold = pixel_threshold
+        self.width = width
+        self.learning_rate = learning_rate
+        self.hold_frames = hold_frames
+
+        self._lock = threading.Lock()
+        self._background: Optional[np.ndarray] = None
+        self._frames_since_motion = hold_frames
+        self.score = 0.0
+        self.frames_seen = 0
+        self.frames_idle = 0
+
+    @property
+    def active(self) -> bool:
+        return self._frames_since_motion < self.hold_frames
+
+    def update(self, frame: np.ndarray) -> bool:
+        """Score a BGR frame; returns whether the gate is active (detection should run)"""
+        height, width = frame.shape[:2]
+        small = cv2.resize(frame, (self.width, max(1, height * self.width // width)), interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0).astype(np.float32)
+        with self._lock:
+            self.frames_seen += 1
+            if self._background is None or self._background.shape != gray.shape:
+                # First frame: nothing to compare against, so treat it as motion
+                self._background = gray
+                self.score = 1.0
+            else:
+                diff = cv2.absdiff(gray, self._background)
+                self.score = float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+                cv2.accumulateWeighted(gray, self._background, self.learning_rate)
+            if self.score > self.threshold:
+                self._frames_since_motion = 0
+            else:
+                self._frames_since_motion += 1
+            if not self.active:
+                self.frames_idle += 1
+            return self.active
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "state": "active" if self.active else "idle",
+                "score": round(self.score, 4),
+                "threshold": self.threshold,
+                "frames_seen": self.frames_seen,
+                "frames_idle": self.frames_idle,
+            }
@@ -0,0 +1,417 @@
+import multiprocessing
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+from typing import Dict, List, Optional, Set, Tuple, Union
+import cv2
+import numpy as np
+from encoding_store import EncodingStore, gallery_version_dir, active_gallery_version
+from face_gallery import build_exact_gallery
+from face_utils import process_attendance_image, FaceRecognitionError
+from face_quality import QualityGate
+from live_pipeline import LiveAttendancePipeline
+from frame_source import FrameSource
+from metrics import metrics
+
+# (location, volunteer_id or None, confidence, low-quality reason or None)
+FaceResult = Tuple[Tuple[int, int, int, int], Optional[str], float, Optional[str]]
+
+class FrameRing:
+    """Fixed number of equally sized frame slots in one shared memory block.
+
+    The owning process creates the block; workers attach to it by name and
+    read slots in place, so frames never pass through a pipe or get pickled.
+    """
+
+    def __init__(self, slots: int, shape: Tuple[int, ...], name: Optional[str] = None):
+        self.slots = slots
+        self.shape = tuple(shape)
+        slot_bytes = int(np.prod(self.shape))
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.array = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def slot(self, index: int) -> np.ndarray:
+        """Writable view of one slot (no copy)"""
+        return self.array[index]
+
+    def close(self):
+        # Views into the buffer must be released before the mapping can close
+        self.array = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+def _active_encodings_dir(volunteers_dir: str) -> str:
+    return gallery_version_dir(volunteers_dir, active_gallery_version(volunteers_dir))
+
+def _load_gallery(volunteers_dir: str, gallery_dtype: str, rerank: int, shortlist: int):
+    """Build the matching gallery straight from the live encoding store's memory map"""
+    store = EncodingStore(_active_encodings_dir(volunteers_dir))
+    ids, rows = store.active_rows()
+    matrix = store.matrix
+    encodings = matrix if len(rows) == len(matrix) else matrix[rows]
+    return store, build_exact_gallery(ids, encodings, store.dim, gallery_dtype, rerank, shortlist)
+
+def _recognition_worker(ring_name: str, slots: int, shape: Tuple[int, ...], tasks, results,
+                        volunteers_dir: str, match_threshold: float, gallery_dtype: str,
+                        rerank: int, shortlist: int, quality: Optional[Tuple[int, float, float]]):
+    """Worker process: recognize faces in ring slots and send back small result tuples.
+
+    ``tasks`` and ``results`` are this worker's own pipe ends, so a worker that
+    dies cannot leave a lock or a half-written message behind for the others.
+    """
+    ring = FrameRing(slots, shape, name=ring_name)
+    quality_gate = QualityGate(*quality) if quality else None
+    store, gallery = _load_gallery(volunteers_dir, gallery_dtype, rerank, shortlist)
+    stamp, checked = store.stamp(), time.monotonic()
+    try:
+        while True:
+            try:
+                task = tasks.recv()
+            except EOFError:
+                break
+            if task is None:
+                break
+            seq, slot = task
+            started = time.perf_counter()
+            # Pick up registrations and gallery version switches (checked at most once a second)
+            if time.monotonic() - checked >= 1.0:
+                checked = time.monotonic()
+                if store.stamp() != stamp or store.directory != _active_encodings_dir(volunteers_dir):
+                    store, gallery = _load_gallery(volunteers_dir, gallery_dtype, rerank, shortlist)
+                    stamp = store.stamp()
+
+            rgb_frame = cv2.cvtColor(ring.slot(slot), cv2.COLOR_BGR2RGB)
+            low_quality = []
+            try:
+                face_encodings, face_locations = process_attendance_image(rgb_frame, quality_gate, low_quality)
+            except FaceRecognitionError:
+                face_encodings, face_locations = [], []
+            recognized = time.perf_counter()
+
+            faces: List[FaceResult] = [(location, None, 0.0, reason) for location, reason in low_quality]
+            if face_encodings:
+                matches = gallery.best_matches(face_encodings, min_confidence=match_threshold) if len(gallery) \
+                    else [None] * len(face_encodings)
+                for location, match in zip(face_locations, matches):
+                    volunteer_id, confidence = match if match else (None, 0.0)
+                    faces.append((tuple(int(value) for value in location), volunteer_id, float(confidence), None))
+            finished = time.perf_counter()
+            results.send((seq, slot, faces, {"recognize": recognized - started, "match": finished - recognized}))
+    finally:
+        ring.close()
+
+class MultiprocessAttendancePipeline(LiveAttendancePipeline):
+    """Live attendance with recognition fanned out to worker processes.
+
+    The capture thread copies each camera frame into a free slot of a shared
+    memory ``FrameRing`` and sends ``(seq, slot)`` to the worker with the
+    fewest frames outstanding, over that worker's own pipe. Worker processes run
+    ``process_attendance_image`` and gallery matching on the slot in place and
+    return only face boxes, ids and confidences. A collector thread puts the
+    results back in frame order, marks attendance, draws the boxes onto the
+    slot, JPEG-encodes it and frees the slot. When every slot is busy, new
+    frames are dropped.
+
+    Workers load the exact gallery from the binary encoding store (migrate
+    legacy JSON encodings first) and reload it when the store changes. A
+    worker that dies is restarted and the slots of the frames it was sent
+    are freed; the reorderer skips those frames instead of waiting for them.
+    Workers are spawned, not forked, so they inherit none of the server's
+    threads or locks.
+    """
+
+    def __init__(self, data_manager, event_id: str, source: Union[int, str, FrameSource] = 0,
+                 width: int = 640, height: int = 480, workers: int = 4,
+                 slots: Optional[int] = None, match_threshold: float = 90,
+                 quality_gate: Optional[QualityGate] = None, reorder_timeout: float = 1.0,
+                 record_dir: Optional[str] = None):
+        super().__init__(None, source, width, height, record_dir=record_dir)
+        self.data_manager = data_manager
+        self.event_id = event_id
+        self.workers = workers
+        # Each worker holds one slot, results waiting for reordering hold more
+        self.slot_count = slots or 2 * workers + 2
+        self.match_threshold = match_threshold
+        self.quality_gate = quality_gate
+        self.reorder_timeout = reorder_timeout
+
+        self._ring: Optional[FrameRing] = None
+        self._free_slots: "queue.Queue[int]" = queue.Queue()
+        self._processes = []
+        self._task_pipes = []
+        self._result_pipes = []
+        self._frame_shape = None
+        # seq -> (worker, slot) of every frame sent to a worker and not yet collected
+        self._in_flight: Dict[int, Tuple[int, int]] = {}
+        # Sequence numbers that will never come back from a worker
+        self._skipped: Set[int] = set()
+        self._outstanding: List[int] = []
+        self._workers_lock = threading.Lock()
+        self._next_seq = 0
+        self.frames_late = 0
+        self.frames_lost = 0
+        self.worker_restarts = 0
+
+    def start(self) -> bool:
+        """Open the frame source, size the ring from the first frame and start the workers"""
+        if not self.source.open():
+            return False
+        success, frame = self.source.read()
+        if not success:
+            print("Error: Could not read frame")
+            self.source.release()
+            return False
+        self._source_open = True
+
+        self._ring = FrameRing(self.slot_count, frame.shape)
+        for slot in range(self.slot_count):
+            self._free_slots.put(slot)
+
+        # Forking a server with capture, journal and request threads running can
+        # copy a held lock into the child; spawned workers start clean (app.py
+        # skips opening the data directory when re-imported as __mp_main__)
+        self._context = multiprocessing.get_context("spawn")
+        self._frame_shape = frame.shape
+        self._processes = [None] * self.workers
+        self._task_pipes = [None] * self.workers
+        self._result_pipes = [None] * self.workers
+        self._outstanding = [0] * self.workers
+        for index in range(self.workers):
+            self._start_worker(index)
+
+        self.started_at = time.monotonic()
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="live-capture", daemon=True),
+            threading.Thread(target=self._collect_loop, name="live-collect", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        return True
+
+    def _start_worker(self, index: int):
+        quality = None
+        if self.quality_gate is not None:
+            quality = (self.quality_gate.min_size, self.quality_gate.min_sharpness, self.quality_gate.max_yaw)
+        task_reader, task_writer = self._context.Pipe(duplex=False)
+        result_reader, result_writer = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=_recognition_worker, name=f"recognition-worker-{index}", daemon=True,
+            args=(self._ring.name, self.slot_count, self._frame_shape, task_reader, result_writer,
+                  self.data_manager.volunteers_dir, self.match_threshold,
+                  self.data_manager.gallery_dtype, self.data_manager.gallery_rerank,
+                  self.data_manager.template_shortlist, quality))
+        process.start()
+        # Only the worker keeps these ends, so its death shows up as EOF here
+        task_reader.close()
+        result_writer.close()
+        self._processes[index] = process
+        self._task_pipes[index] = task_writer
+        self._result_pipes[index] = result_reader
+
+    def _restart_worker(self, index: int):
+        """Replace a dead worker and free the slots of every frame it had been sent"""
+        with self._workers_lock:
+            process = self._processes[index]
+            process.join(timeout=1)
+            lost = [seq for seq, (worker, _) in self._in_flight.items() if worker == index]
+            for seq in lost:
+                _, slot = self._in_flight.pop(seq)
+                self._free_slots.put(slot)
+            self._skipped.update(lost)
+            self.frames_lost += len(lost)
+            self._outstanding[index] = 0
+            self._task_pipes[index].close()
+            self._result_pipes[index].close()
+            print(f"Error: {process.name} exited with code {process.exitcode}, restarting it")
+            metrics.inc("worker_restarts_total")
+            self.worker_restarts += 1
+            self._start_worker(index)
+
+    def stop(self):
+        """Stop capture and collection, shut the workers down and free the ring"""
+        super().stop()
+        for task_pipe in self._task_pipes:
+            try:
+                task_pipe.send(None)
+            except OSError:
+                pass
+        for process in self._processes:
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+        for pipe in self._task_pipes + self._result_pipes:
+            pipe.close()
+        self._processes = []
+        self._task_pipes = []
+        self._result_pipes = []
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
+
+    def _capture_loop(self):
+        seq = 0
+        shape = self._ring.shape
+        while not self._stop.is_set():
+            with metrics.timer("live", "capture"):
+                success, frame = self.source.read()
+            if not success:
+                print("Error: Could not read frame")
+                self._stop.set()
+                break
+            self.frames_captured += 1
+            try:
+                slot = self._free_slots.get_nowait()
+            except queue.Empty:
+                # Every slot is being recognized or waiting to be streamed
+                self.frames_dropped += 1
+                metrics.inc("frames_dropped_total")
+                continue
+            if frame.shape != shape:
+                frame = cv2.resize(frame, (shape[1], shape[0]))
+            # The only copy of the frame: camera buffer -> shared slot
+            np.copyto(self._ring.slot(slot), frame)
+            with self._workers_lock:
+                index = min(range(self.workers), key=self._outstanding.__getitem__)
+                try:
+                    self._task_pipes[index].send((seq, slot))
+                    self._in_flight[seq] = (index, slot)
+                    self._outstanding[index] += 1
+                except OSError:
+                    # Dead worker; the collector restarts it
+                    self._free_slots.put(slot)
+                    self._skipped.add(seq)
+                    self.frames_dropped += 1
+            seq += 1
+        with self._output_ready:
+            self._output_ready.notify_all()
+
+    def _collect_loop(self):
+        """Reorder worker results by sequence number and publish annotated frames"""
+        pending: Dict[int, Tuple] = {}
+        oldest_wait = None
+        while not self._stop.is_set():
+            for index, process in enumerate(self._processes):
+                if not process.is_alive():
+                    self._restart_worker(index)
+            for pipe in wait(self._result_pipes, timeout=0.1):
+                try:
+                    seq, slot, faces, timings = pipe.recv()
+                except (EOFError, OSError):
+                    # The worker died
+                    self._restart_worker(self._result_pipes.index(pipe))
+                    continue
+                with self._workers_lock:
+                    index, _ = self._in_flight.pop(seq)
+                    self._outstanding[index] -= 1
+                if seq < self._next_seq:
+                    # Skipped while waiting for it; too late to show
+                    self.frames_late += 1
+                    self._free_slots.put(slot)
+                else:
+                    pending[seq] = (slot, faces, timings)
+            self._skip_lost()
+            if not pending:
+                oldest_wait = None
+                continue
+            if self._next_seq not in pending:
+                # Give a slow worker a moment before moving past its frame
+                oldest_wait = oldest_wait or time.monotonic()
+                if time.monotonic() - oldest_wait < self.reorder_timeout:
+                    continue
+                self._next_seq = min(pending)
+                with self._workers_lock:
+                    self._skipped = {seq for seq in self._skipped if seq > self._next_seq}
+            oldest_wait = None
+            while self._next_seq in pending:
+                slot, faces, timings = pending.pop(self._next_seq)
+                self._publish(slot, faces, timings)
+                self._free_slots.put(slot)
+                self._next_seq += 1
+                self._skip_lost()
+
+    def _skip_lost(self):
+        """Move the reorder cursor past frames that never reached a worker or died with one"""
+        with self._workers_lock:
+            while self._next_seq in self._skipped:
+                self._skipped.remove(self._next_seq)
+                self._next_seq += 1
+
+    def _publish(self, slot: int, faces: List[FaceResult], timings: Dict[str, float]):
+        for stage, seconds in timings.items():
+            metrics.observe("live", f"worker_{stage}", seconds)
+        started = time.perf_counter()
+        frame = self._ring.slot(slot)
+        metrics.inc("faces_detected_total", len(faces))
+        if self.quality_gate is not None:
+            # The workers gate with their own copies; count their decisions here for /live_stats
+            self.quality_gate.record(len(faces), [reason for _, _, _, reason in faces if reason is not None])
+        for location, volunteer_id, confidence, reason in faces:
+            volunteer = self.data_manager.lookup(volunteer_id) if volunteer_id is not None else None
+            if reason is not None:
+                metrics.inc("faces_low_quality_total")
+                label, color = f"Low quality ({reason})", (128, 128, 128)
+            elif volunteer is None:
+                metrics.inc("face_unknowns_total")
+                label, color = "Unknown", (0, 0, 255)
+            else:
+                metrics.inc("face_matches_total")
+                name = volunteer['name']
+                with metrics.timer("live", "mark"):
+                    marked = self.data_manager.mark_attendance(self.event_id, volunteer_id, confidence)
+                if marked:
+                    label, color = f"{name} ({confidence:.1f}%) - Marked!", (0, 255, 0)
+                else:
+                    label, color = f"{name} - Already Marked", (0, 165, 255)
+            top, right, bottom, left = location
+            cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
+            cv2.rectangle(frame, (left, bottom - 35), (right, bottom), color, cv2.FILLED)
+            cv2.putText(frame, label, (left + 6, bottom - 6), cv2.FONT_HERSHEY_DUPLEX, 0.6, (255, 255, 255), 1)
+
+        with metrics.timer("live", "jpeg"):
+            ret, buffer = cv2.imencode('.jpg', frame)
+        self.inference_seconds += time.perf_counter() - started
+        if not ret:
+            print("Error: Could not encode frame")
+            return
+        metrics.inc("frames_processed_total")
+        with self._output_ready:
+            self._latest_jpeg = buffer.tobytes()
+            self._output_seq += 1
+            self.frames_processed += 1
+            self._output_ready.notify_all()
+
+    def stats(self) -> Dict:
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        stats = {
+            "event_id": self.event_id,
+            "camera": self.source.name,
+            "source": self.source.stats(),
+            "running": self.running,
+            "mode": "multiprocess",
+            "workers": sum(1 for process in self._processes if process.is_alive()),
+            "slots": self.slot_count,
+            "free_slots": self._free_slots.qsize(),
+            "frames_captured": self.frames_captured,
+            "frames_dropped": self.frames_dropped,
+            "frames_late": self.frames_late,
+            "frames_lost": self.frames_lost,
+            "worker_restarts": self.worker_restarts,
+            "frames_processed": self.frames_processed,
+            "frames_streamed": self.frames_streamed,
+            "capture_fps": round(self.frames_captured / elapsed, 2) if elapsed else 0.0,
+            "inference_fps": round(self.frames_processed / elapsed, 2) if elapsed else 0.0,
+        }
+        if self.quality_gate is not None:
+            stats["face_quality"] = self.quality_gate.stats()
+        return stats
@@ -0,0 +1,106 @@
+import threading
+from typing import Dict, List, NamedTuple, Optional
+
+class QualitySettings(NamedTuple):
+    """Knobs the live pipeline exposes to the controller"""
+    detection_scale: float  # detection runs on the frame resized by this factor
+    detect_interval: int    # full detection every N frames, tracking in between
+    jpeg_quality: int       # quality of the streamed JPEG
+
+def default_levels(detect_interval: int = 5, jpeg_quality: int = 90) -> List[QualitySettings]:
+    """Quality ladder from best to cheapest.
+
+    The early steps shrink the detection input, since HOG cost grows with pixel
+    count; detecting less often and lowering JPEG quality come after.
+    """
+    return [
+        QualitySettings(1.0, detect_interval, jpeg_quality),
+        QualitySettings(0.75, detect_interval, jpeg_quality),
+        QualitySettings(0.5, detect_interval, max(jpeg_quality - 10, 50)),
+        QualitySettings(0.5, detect_interval * 2, max(jpeg_quality - 15, 50)),
+        QualitySettings(0.35, detect_interval * 2, max(jpeg_quality - 20, 50)),
+        QualitySettings(0.25, detect_interval * 3, max(jpeg_quality - 30, 50)),
+    ]
+
+class QualityController:
+    """Moves along a quality ladder to keep live processing at ``target_fps``.
+
+    Callers report how long each stage of a frame took. The controller keeps
+    an exponential moving average per stage. When the smoothed frame time goes
+    over the budget (``1 / target_fps``) it drops one level. When the frame
+    time falls under ``recover_ratio`` of the budget it climbs back one level.
+    ``cooldown`` frames must pass between changes. By then the moving average
+    mostly reflects the new setting, so one slow or fast frame cannot make the
+    level oscillate.
+    """
+
+    def __init__(self, target_fps: float = 10, levels: Optional[List[QualitySettings]] = None,
+                 smoothing: float = 0.2, recover_ratio: float = 0.6, cooldown: int = 15):
+        self.target_fps = target_fps
+        self.levels = levels or default_levels()
+        self.smoothing = smoothing
+        self.recover_ratio = recover_ratio
+        self.cooldown = cooldown
+
+        self._lock = threading.Lock()
+        self.level = 0
+        self._stage_ms: Dict[str, float] = {}
+        self._frame_ms: Optional[float] = None
+        self._frames_since_change = 0
+        self.degrades = 0
+        self.recoveries = 0
+
+    @property
+    def budget_ms(self) -> float:
+        return 1000.0 / self.target_fps
+
+    @property
+    def settings(self) -> QualitySettings:
+        return self.levels[self.level]
+
+    def record(self, stage_seconds: Dict[str, float]) -> QualitySettings:
+        """Feed one frame's per-stage timings; returns the settings for the next frame"""
+        frame_ms = 1000.0 * sum(stage_seconds.values())
+        with self._lock:
+            for stage, seconds in stage_seconds.items():
+                previous = self._stage_ms.get(stage)
+                ms = 1000.0 * seconds
+                self._stage_ms[stage] = ms if previous is None else previous + self.smoothing * (ms - previous)
+            if self._frame_ms is None:
+                self._frame_ms = frame_ms
+            else:
+                self._frame_ms += self.smoothing * (frame_ms - self._frame_ms)
+
+            self._frames_since_change += 1
+            if self._frames_since_change >= self.cooldown:
+                if self._frame_ms > self.budget_ms and self.level < len(self.levels) - 1:
+                    self._change(self.level + 1)
+                    self.degrades += 1
+                elif self._frame_ms < self.budget_ms * self.recover_ratio and self.level > 0:
+                    self._change(self.level - 1)
+                    self.recoveries += 1
+            return self.levels[self.level]
+
+    def _change(self, level: int):
+        self.level = level
+        self._frames_since_change = 0
+
+    def overlay_text(self) -> str:
+        """One-line summary drawn onto the live stream"""
+        settings = self.settings
+        fps = 1000.0 / self._frame_ms if self._frame_ms else 0.0
+        return (f"{fps:.1f}/{self.target_fps:g} fps | L{self.level} scale {settings.detection_scale:.2f}"
+                f" | detect 1/{settings.detect_interval} | q{settings.jpeg_quality}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "target_fps": self.target_fps,
+                "level": self.level,
+                "max_level": len(self.levels) - 1,
+                "settings": self.settings._asdict(),
+                "frame_ms": round(self._frame_ms, 2) if self._frame_ms is not None else None,
+                "stage_ms": {stage: round(ms, 2) for stage, ms in self._stage_ms.items()},
+                "degrades": self.degrades,
+                "recoveries": self.recoveries,
+            }
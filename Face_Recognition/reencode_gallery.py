@@ -0,0 +1,204 @@
+"""Re-encode every stored volunteer photo into a new gallery version.
+
+Encodings are recomputed from ``faces/<id>.jpg`` (and any template photos)
+across a process pool and appended, one batch at a time, to a fresh encoding
+store under ``volunteers/galleries/<version>/``. The job is resumable: when it
+is run again with the same version, volunteers already in that store are
+skipped. The live gallery is untouched until the version is complete and
+``--switch`` (or ``--activate``) atomically moves the ``gallery.json``
+pointer, which running servers pick up on their next gallery lookup.
+``--switch`` first encodes anyone registered during the build in a final
+pass under the store lock, so registrations wait for the switch instead of
+landing in the old version after it was copied.
+
+Usage:
+    python reencode_gallery.py --version v2 --upsample 2 --jitters 5 --workers 8 --switch
+    python reencode_gallery.py --activate default      # switch back to the original store
+    python reencode_gallery.py --list
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import repeat
+from typing import Collection, Dict, List, Optional, Tuple
+import numpy as np
+from encoding_store import (
+    EncodingStore, gallery_version_dir, read_version_info, write_version_info, GALLERIES_DIR, DEFAULT_VERSION
+)
+from face_utils import process_registration_image, EncodingSettings, DEFAULT_ENCODING_SETTINGS
+
+def _encode_volunteer(image_paths: List[str], settings: EncodingSettings) -> Tuple[List[np.ndarray], List[Tuple[str, str]]]:
+    """Worker: encodings for every photo of one volunteer, and (path, error) for the ones that failed"""
+    encodings, errors = [], []
+    for path in image_paths:
+        try:
+            with open(path, 'rb') as f:
+                face_encoding, _ = process_registration_image(f.read(), settings)
+            encodings.append(face_encoding)
+        except Exception as e:
+            errors.append((path, str(e)))
+    return encodings, errors
+
+def reencode(data_manager, version: str, settings: EncodingSettings = DEFAULT_ENCODING_SETTINGS,
+             dtype: str = "float64", workers: Optional[int] = None, batch_size: int = 256,
+             progress=None, skip: Collection[str] = ()) -> Dict:
+    """Build (or resume building) gallery ``version`` from the stored photos.
+
+    Volunteers registered while the job runs are picked up by further passes
+    until none are left; ids in ``skip`` (e.g. known failures) are not tried.
+    Returns a report with counts and per-volunteer failures.
+    """
+    if version == DEFAULT_VERSION:
+        raise ValueError("The default gallery cannot be re-encoded in place; choose a new version name")
+    directory = gallery_version_dir(data_manager.volunteers_dir, version)
+    info = read_version_info(directory)
+    if info is None:
+        info = {
+            "version": version,
+            "settings": settings._asdict(),
+            "dtype": dtype,
+            "created_at": datetime.utcnow().isoformat(),
+            "completed_at": None,
+        }
+        write_version_info(directory, info)
+    elif info["settings"] != settings._asdict() or info["dtype"] != dtype:
+        raise ValueError(f"Version '{version}' was started with different settings: {info['settings']}, {info['dtype']}")
+    store = EncodingStore(directory, dtype=dtype)
+
+    started = time.perf_counter()
+    resumed = len(store.rows_by_id())
+    encoded, template_errors = 0, {}
+    failed: Dict[str, List[Tuple[str, str]]] = {}
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        while True:
+            with open(data_manager.volunteers_file, 'r') as f:
+                volunteers = json.load(f)["volunteers"]
+            done = store.rows_by_id()
+            pending = [volunteer_id for volunteer_id in volunteers
+                       if volunteer_id not in done and volunteer_id not in failed and volunteer_id not in skip]
+            if not pending:
+                break
+            for start in range(0, len(pending), batch_size):
+                batch = pending[start:start + batch_size]
+                paths = [data_manager.volunteer_image_paths(volunteer_id, volunteers[volunteer_id].get("image_path"))
+                         for volunteer_id in batch]
+                ids, rows = [], []
+                for volunteer_id, (encodings, errors) in zip(batch, executor.map(_encode_volunteer, paths, repeat(settings))):
+                    if not encodings:
+                        failed[volunteer_id] = errors
+                        continue
+                    if errors:
+                        template_errors[volunteer_id] = errors
+                    ids.extend([volunteer_id] * len(encodings))
+                    rows.extend(encodings)
+                    encoded += 1
+                # Each batch is committed on its own, so an interrupted job resumes after it
+                if rows:
+                    store.append_many(ids, np.stack(rows))
+                if progress:
+                    progress(f"{version}: {resumed + encoded}/{len(volunteers)} volunteers encoded, {len(failed)} failed")
+
+    elapsed = time.perf_counter() - started
+    # Failures of earlier runs stay recorded until the volunteer is encoded
+    failures_file = os.path.join(directory, "failures.json")
+    failures = {}
+    if os.path.exists(failures_file):
+        with open(failures_file, 'r') as f:
+            failures = json.load(f)
+    failures.update({volunteer_id: [{"image": path, "error": error} for path, error in errors]
+                     for volunteer_id, errors in failed.items()})
+    done = store.rows_by_id()
+    failures = {volunteer_id: errors for volunteer_id, errors in failures.items() if volunteer_id not in done}
+    info.update(completed_at=datetime.utcnow().isoformat(), volunteers=len(done),
+                encodings=len(store), failed=len(failures))
+    write_version_info(directory, info)
+    with open(failures_file, 'w') as f:
+        json.dump(failures, f, indent=4)
+    return {
+        "version": version,
+        "directory": directory,
+        "settings": info["settings"],
+        "dtype": dtype,
+        "resumed_volunteers": resumed,
+        "encoded_volunteers": encoded,
+        "encodings": len(store),
+        "elapsed_seconds": round(elapsed, 3),
+        "volunteers_per_second": round(encoded / elapsed, 2) if elapsed else None,
+        "failed": {volunteer_id: [error for _, error in errors] for volunteer_id, errors in failed.items()},
+        "template_errors": {volunteer_id: [error for _, error in errors] for volunteer_id, errors in template_errors.items()},
+    }
+
+def list_versions(data_manager) -> List[Dict]:
+    """Every gallery version with its build info, marking the live one"""
+    versions = [DEFAULT_VERSION]
+    galleries_dir = os.path.join(data_manager.volunteers_dir, GALLERIES_DIR)
+    if os.path.isdir(galleries_dir):
+        versions.extend(sorted(os.listdir(galleries_dir)))
+    listing = []
+    for version in versions:
+        directory = gallery_version_dir(data_manager.volunteers_dir, version)
+        info = read_version_info(directory) or {"version": version}
+        info["active"] = version == data_manager.gallery_version
+        info["encodings"] = len(EncodingStore(directory))
+        listing.append(info)
+    return listing
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-encode stored volunteer photos into a new gallery version")
+    parser.add_argument('--data-dir', default='data', help='DataManager data directory (default: data)')
+    parser.add_argument('--version', default=None, help='Gallery version to build or resume (default: a timestamp)')
+    parser.add_argument('--detection-model', choices=('hog', 'cnn'), default='hog', help='Face detector (default: hog)')
+    parser.add_argument('--upsample', type=int, default=1, help='Times to upsample photos when detecting (default: 1)')
+    parser.add_argument('--jitters', type=int, default=1, help='Re-sampled crops per encoding (default: 1)')
+    parser.add_argument('--dtype', choices=('float64', 'float32'), default='float64',
+                        help='Storage precision of the new encodings (default: float64)')
+    parser.add_argument('--workers', type=int, default=None, help='Encoding processes (default: one per CPU)')
+    parser.add_argument('--batch-size', type=int, default=256, help='Volunteers committed per batch (default: 256)')
+    parser.add_argument('--switch', action='store_true', help='Make the version live once it is complete')
+    parser.add_argument('--force', action='store_true', help='Switch even if some volunteers failed to encode')
+    parser.add_argument('--activate', metavar='VERSION', default=None, help='Only switch the live gallery to VERSION')
+    parser.add_argument('--list', action='store_true', help='List gallery versions and exit')
+    args = parser.parse_args()
+
+    from data_manager import DataManager
+    data_manager = DataManager(args.data_dir)
+    try:
+        if args.list:
+            print(json.dumps(list_versions(data_manager), indent=4))
+            return
+        if args.activate:
+            if not data_manager.activate_gallery_version(args.activate):
+                sys.exit(f"Version '{args.activate}' does not exist or is not complete")
+            print(f"Gallery version '{args.activate}' is live")
+            return
+
+        version = args.version or datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+        settings = EncodingSettings(args.detection_model, args.upsample, args.jitters)
+        report = reencode(data_manager, version, settings, args.dtype, args.workers, args.batch_size,
+                          progress=lambda message: print(message, file=sys.stderr))
+        if args.switch:
+            if report["failed"] and not args.force:
+                print(json.dumps(report, indent=4))
+                sys.exit(f"{len(report['failed'])} volunteers failed to encode; not switching (use --force)")
+            # Registrations wait on the store lock while the last ones are copied and the pointer moves
+            with data_manager.store_lock:
+                final = reencode(data_manager, version, settings, args.dtype, args.workers, args.batch_size,
+                                 skip=report["failed"])
+                report["encoded_volunteers"] += final["encoded_volunteers"]
+                report["encodings"] = final["encodings"]
+                report["failed"].update(final["failed"])
+                if final["failed"] and not args.force:
+                    print(json.dumps(report, indent=4))
+                    sys.exit(f"{len(report['failed'])} volunteers failed to encode; not switching (use --force)")
+                data_manager.activate_gallery_version(version)
+            report["active"] = True
+        print(json.dumps(report, indent=4))
+    finally:
+        data_manager.close()
+
+if __name__ == '__main__':
+    main()
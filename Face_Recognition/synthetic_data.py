@@ -0,0 +1,13 @@
+"""Synthetic face encodings for benchmarks and gallery evaluation (no images or models needed)"""
+import numpy as np
+
+def synthetic_encodings(count: int, rng: np.random.Generator, dim: int = 128) -> np.ndarray:
+    """Random encodings with roughly the norm of real dlib face encodings"""
+    encodings = rng.normal(size=(count, dim))
+    encodings *= 0.45 / np.linalg.norm(encodings, axis=1, keepdims=True)
+    return encodings
+
+def probe_queries(gallery: np.ndarray, count: int, rng: np.random.Generator, noise: float = 0.02):
+    """Queries that are noisy copies of known gallery rows, with their answers"""
+    rows = rng.integers(len(gallery), size=count)
+    return gallery[rows] + rng.normal(scale=noise, size=(count, gallery.shape[1])), rows
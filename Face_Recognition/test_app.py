@@ -93,12 +93,20 @@ def test_attendance_logs():
             print(f"Time: {log['timestamp']}")
             print(f"Confidence: {log['confidence_score']}%")
             
-            # Save the volunteer's photo if available
-            if 'photo' in log:
+            # Save the volunteer's thumbnail if available
+            if 'photo_url' in log:
                 photo_filename = f"volunteer_{log['volunteer_id']}_photo.jpg"
-                save_response_image(log['photo'], photo_filename)
+                photo = requests.get(f"http://localhost:5000{log['photo_url']}")
+                with open(photo_filename, 'wb') as f:
+                    f.write(photo.content)
                 print(f"Saved volunteer photo to {photo_filename}")
 
+        # Polling again with the ETag should report no changes
+        etag = response.headers.get('ETag')
+        if etag:
+            response = requests.get(url, params=params, headers={'If-None-Match': etag})
+            print(f"Conditional poll status code: {response.status_code}")
+
     except Exception as e:
         print(f"Error: {str(e)}")
 
@@ -0,0 +1,94 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from attendance_events import AttendanceBroker
+
+# The app stores everything under DATA_DIR, read when it is imported
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp())
+import app
+
+class AttendanceBrokerTest(unittest.TestCase):
+    def test_publish_reaches_only_the_event_subscribers(self):
+        broker = AttendanceBroker()
+        first, second, other = broker.subscribe("e1"), broker.subscribe("e1"), broker.subscribe("e2")
+        broker.publish("e1", {"seq": 1})
+        self.assertEqual(first.get(0), {"seq": 1})
+        self.assertEqual(second.get(0), {"seq": 1})
+        self.assertIsNone(other.get(0))
+        broker.unsubscribe(first)
+        broker.unsubscribe(second)
+        self.assertEqual(broker.subscriber_count("e1"), 0)
+        self.assertEqual(broker.subscriber_count(), 1)
+
+    def test_slow_subscriber_overflows(self):
+        broker = AttendanceBroker(max_queue=2)
+        subscription = broker.subscribe("e1")
+        for seq in range(3):
+            broker.publish("e1", {"seq": seq})
+        self.assertTrue(subscription.overflowed)
+        self.assertEqual(subscription.dropped, 3)
+        self.assertIsNone(subscription.get(0))
+
+class AttendanceStreamRouteTest(unittest.TestCase):
+    def setUp(self):
+        app.data_manager.cleanup()
+        self.client = app.app.test_client()
+        heartbeat = mock.patch.object(app, 'SSE_HEARTBEAT_SECONDS', 0.05)
+        heartbeat.start()
+        self.addCleanup(heartbeat.stop)
+
+    def mark(self, volunteer_id, confidence=95.0):
+        self.assertTrue(app.data_manager.mark_attendance("e1", volunteer_id, confidence))
+
+    def open_stream(self, headers=None):
+        response = self.client.get('/attendance_stream', query_string={'event_id': 'e1'},
+                                   headers=headers or {}, buffered=False)
+        self.addCleanup(response.close)
+        chunks = iter(response.response)
+        self.assertEqual(next(chunks), b"retry: 3000\n\n")
+        return response, chunks
+
+    def next_message(self, chunks):
+        """Next non-heartbeat message as (event, id, data)"""
+        while True:
+            chunk = next(chunks).decode()
+            if not chunk.startswith(":"):
+                break
+        fields = dict(line.split(": ", 1) for line in chunk.strip().split("\n"))
+        return fields.get("event"), fields.get("id"), json.loads(fields["data"])
+
+    def test_pushes_marks_as_they_happen(self):
+        response, chunks = self.open_stream()
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertEqual(next(chunks), b": heartbeat\n\n")
+        self.mark("a")
+        event, event_id, data = self.next_message(chunks)
+        self.assertEqual((event, data["volunteer_id"]), ("attendance", "a"))
+        self.assertEqual(event_id, str(data["seq"]))
+        response.close()
+        self.assertEqual(app.data_manager.attendance_events.subscriber_count("e1"), 0)
+
+    def test_reconnect_replays_missed_records(self):
+        self.mark("a")
+        seen = app.data_manager.attendance.event_version("e1")
+        self.mark("b")
+        self.mark("c")
+        _, chunks = self.open_stream({'Last-Event-ID': str(seen)})
+        self.assertEqual([self.next_message(chunks)[2]["volunteer_id"] for _ in range(2)], ["b", "c"])
+
+    def test_client_that_falls_behind_is_told_to_resync(self):
+        _, chunks = self.open_stream()
+        # The subscription exists once the stream has started
+        for number in range(app.data_manager.attendance_events.max_queue + 1):
+            self.mark(str(number))
+        event, _, data = self.next_message(chunks)
+        self.assertEqual(event, "resync")
+        self.assertEqual(data["cursor"], app.data_manager.attendance.event_version("e1"))
+        # Back to normal afterwards
+        self.mark("late")
+        self.assertEqual(self.next_message(chunks)[2]["volunteer_id"], "late")
+
+if __name__ == '__main__':
+    unittest.main()
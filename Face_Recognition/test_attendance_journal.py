@@ -0,0 +1,85 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from attendance_journal import AttendanceJournal
+
+class AttendanceJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.snapshot_file = os.path.join(self.directory, "attendance.json")
+        self.journal_file = os.path.join(self.directory, "attendance.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def open(self, **options) -> AttendanceJournal:
+        return AttendanceJournal(self.snapshot_file, self.journal_file, **options)
+
+    def test_keeps_best_confidence(self):
+        journal = self.open()
+        self.assertTrue(journal.mark("e1", "a", 91.0))
+        self.assertFalse(journal.mark("e1", "a", 90.0))
+        self.assertTrue(journal.mark("e1", "a", 95.0))
+        self.assertEqual(journal.get_record("e1", "a")["confidence_score"], 95.0)
+        self.assertEqual([record["volunteer_id"] for record in journal.get_event("e1", since=1)], ["a"])
+        journal.close()
+
+    def test_mark_is_durable_when_it_returns(self):
+        journal = self.open()
+        with mock.patch("attendance_journal.os.fsync") as fsync:
+            self.assertTrue(journal.mark("e1", "a", 91.0))
+            self.assertEqual(fsync.call_count, 1)
+            # Repeat sightings write nothing
+            self.assertFalse(journal.mark("e1", "a", 90.0))
+            self.assertEqual(fsync.call_count, 1)
+        journal.close()
+
+    def test_replay_after_crash(self):
+        journal = self.open()
+        journal.mark("e1", "a", 91.0)
+        journal.mark("e1", "b", 92.0)
+        journal.mark("e2", "a", 93.0)
+        journal.sync()
+        # Simulate a crash: no close(), and a torn final line
+        journal._journal.write('{"event_id": "e1", "volunt')
+        journal._journal.flush()
+
+        replayed = self.open()
+        self.assertEqual({record["volunteer_id"] for record in replayed.get_event("e1")}, {"a", "b"})
+        self.assertEqual(replayed.get_record("e2", "a")["confidence_score"], 93.0)
+        self.assertEqual(replayed.event_version("e2"), 3)
+        # The torn line is cut off, so new appends stay readable
+        self.assertTrue(replayed.mark("e1", "c", 94.0))
+        replayed.close()
+        self.assertEqual(self.open().get_record("e1", "c")["seq"], 4)
+
+    def test_replay_after_compaction(self):
+        journal = self.open(compact_every=3)
+        for volunteer_id in ("a", "b", "c"):
+            journal.mark("e1", volunteer_id, 91.0)
+        self.assertEqual(os.path.getsize(self.journal_file), 0)
+        with open(self.snapshot_file, 'r') as f:
+            self.assertEqual(len(json.load(f)["events"]["e1"]), 3)
+        journal.mark("e1", "a", 99.0)
+        journal.sync()
+
+        replayed = self.open()
+        self.assertEqual(len(replayed.get_event("e1")), 3)
+        self.assertEqual(replayed.get_record("e1", "a")["confidence_score"], 99.0)
+        self.assertEqual(replayed.event_version("e1"), 4)
+        replayed.close()
+
+    def test_write_behind_flushes_on_close(self):
+        journal = self.open(write_behind=True, flush_interval=60)
+        for volunteer_id in ("a", "b"):
+            journal.mark("e1", volunteer_id, 91.0)
+        self.assertTrue(journal.is_marked("e1", "b"))
+        journal.close()
+        self.assertEqual(journal.pending, 0)
+        self.assertEqual(len(self.open().get_event("e1")), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+# The app stores everything under DATA_DIR, read when it is imported
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp())
+import app
+
+class AttendanceLogRouteTest(unittest.TestCase):
+    def setUp(self):
+        app.data_manager.cleanup()
+        self.client = app.app.test_client()
+
+    def mark(self, volunteer_id, confidence=95.0):
+        self.assertTrue(app.data_manager.mark_attendance("e1", volunteer_id, confidence))
+
+    def poll(self, since=None, etag=None):
+        query = {'event_id': 'e1'}
+        if since is not None:
+            query['since'] = since
+        headers = {'If-None-Match': etag} if etag else {}
+        return self.client.get('/attendance_logs', query_string=query, headers=headers)
+
+    def test_incremental_polls(self):
+        self.mark("a")
+        self.mark("b")
+        response = self.poll()
+        self.assertEqual([log["volunteer_id"] for log in response.json], ["a", "b"])
+        cursor = response.headers['X-Attendance-Cursor']
+
+        self.mark("c")
+        self.mark("a", 99.0)
+        response = self.poll(cursor)
+        self.assertEqual([(log["volunteer_id"], log["confidence_score"]) for log in response.json],
+                         [("c", 95.0), ("a", 99.0)])
+        self.assertEqual(self.poll(response.headers['X-Attendance-Cursor']).json, [])
+
+    def test_unchanged_poll_is_not_modified(self):
+        self.mark("a")
+        response = self.poll()
+        etag = response.headers['ETag']
+        self.assertEqual(self.poll(etag=etag).status_code, 304)
+        self.mark("b")
+        response = self.poll(etag=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json), 2)
+
+    def test_mark_during_a_poll_is_not_skipped(self):
+        self.mark("a")
+        fetch = app.data_manager.get_attendance_logs
+
+        def mark_then_fetch(*args, **kwargs):
+            # Lands after the cursor was read but before the logs are
+            self.mark("late")
+            return fetch(*args, **kwargs)
+
+        with mock.patch.object(app.data_manager, 'get_attendance_logs', side_effect=mark_then_fetch):
+            response = self.poll()
+        followup = self.poll(response.headers['X-Attendance-Cursor'])
+        self.assertIn("late", [log["volunteer_id"] for log in response.json + followup.json])
+        self.assertEqual([log["volunteer_id"] for log in followup.json], ["late"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+import cv2
+import numpy as np
+from bulk_enrollment import parse_manifest, read_zip_batch, enroll_batch
+from data_manager import DataManager
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+class BulkEnrollmentTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.data_manager = DataManager(os.path.join(self.directory, "data"))
+        with open(os.path.join(HERE, "harry.jpg"), 'rb') as f:
+            self.face = f.read()
+        self.blank = cv2.imencode('.jpg', np.zeros((120, 120, 3), dtype=np.uint8))[1].tobytes()
+
+    def tearDown(self):
+        self.data_manager.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def enroll(self, manifest, images, **options):
+        return enroll_batch(self.data_manager, parse_manifest(manifest), images, max_workers=2, **options)
+
+    def test_manifest_needs_required_columns(self):
+        with self.assertRaises(ValueError):
+            parse_manifest(b"volunteer_id,name\n1,Ann\n")
+        rows = parse_manifest("\ufeffvolunteer_id , name,email,image\n 1 ,Ann,a@x,\n".encode('utf-8'))
+        self.assertEqual(rows, [{"volunteer_id": "1", "name": "Ann", "email": "a@x", "image": ""}])
+
+    def test_zip_batch(self):
+        buffered = io.BytesIO()
+        with zipfile.ZipFile(buffered, 'w') as archive:
+            archive.writestr("batch/manifest.csv", "volunteer_id,name,email\n1,Ann,a@x\n")
+            archive.writestr("batch/photos/1.jpg", self.face)
+            archive.writestr("batch/notes.txt", "ignored")
+        manifest, images = read_zip_batch(buffered.getvalue())
+        self.assertEqual(parse_manifest(manifest)[0]["volunteer_id"], "1")
+        self.assertEqual(list(images), ["1.jpg"])
+
+    def test_per_row_report(self):
+        self.data_manager.register_volunteer("taken", "Old", "o@x", np.zeros(128), self.face)
+        manifest = (b"volunteer_id,name,email,image\n"
+                    b"1,Ann,a@x,photos/ann.jpg\n"
+                    b"2,,b@x,\n"
+                    b"3,Cy,c@x,missing.jpg\n"
+                    b"4,Di,d@x,blank.jpg\n"
+                    b"1,Ann again,a@x,\n"
+                    b"taken,New,n@x,ann.jpg\n")
+        report = self.enroll(manifest, {"ann.jpg": self.face, "blank.jpg": self.blank})
+        self.assertEqual((report["registered"], report["failed"]), (1, 5))
+        self.assertEqual([(result["volunteer_id"], result["status"], result.get("error")) for result in report["results"]], [
+            ("1", "registered", None),
+            ("2", "error", "Missing required fields"),
+            ("3", "error", "Image not found"),
+            ("4", "error", "No face detected in the image"),
+            ("1", "error", "Duplicate volunteer ID in batch"),
+            ("taken", "error", "Volunteer ID already exists"),
+        ])
+        self.assertEqual(self.data_manager.lookup("1")["name"], "Ann")
+        self.assertIsNone(self.data_manager.lookup("4"))
+
+    def test_same_face_twice_in_a_batch(self):
+        manifest = b"volunteer_id,name,email\n1,Ann,a@x\n2,Ann twin,t@x\n"
+        images = {"1.jpg": self.face, "2.jpg": self.face}
+        report = self.enroll(manifest, images, duplicate_threshold=90)
+        self.assertEqual(report["results"][1]["error"], "Face already registered")
+        self.assertEqual(report["results"][1]["duplicates"], ["1"])
+
+        # Flagged instead of rejected, against the volunteer registered above
+        report = self.enroll(b"volunteer_id,name,email\n2,Ann twin,t@x\n", images,
+                             duplicate_threshold=90, reject_duplicates=False)
+        self.assertEqual(report["results"][0]["possible_duplicates"], ["1"])
+        self.assertEqual([entry["volunteer_id"] for entry in self.data_manager.lookup("1")["possible_duplicates"]], ["2"])
+
+if __name__ == '__main__':
+    unittest.main()
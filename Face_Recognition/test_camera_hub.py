@@ -0,0 +1,98 @@
+import threading
+import unittest
+from camera_hub import CameraHub
+
+class FakePipeline:
+    def __init__(self, camera, event_id, starts=True, release=None):
+        self.camera = camera
+        self.event_id = event_id
+        self.starts = starts
+        self.release = release
+        self.running = False
+        self.stopped = 0
+
+    def start(self):
+        # A slow camera: opening blocks until ``release`` is set
+        if self.release is not None:
+            self.release.wait(5)
+        self.running = self.starts
+        return self.starts
+
+    def stop(self):
+        self.running = False
+        self.stopped += 1
+
+    def stats(self):
+        return {"camera": self.camera, "event_id": self.event_id}
+
+class CameraHubTest(unittest.TestCase):
+    def test_viewers_share_one_pipeline(self):
+        created = []
+        hub = CameraHub(lambda camera, event_id: created.append(FakePipeline(camera, event_id)) or created[-1])
+        first = hub.subscribe(0, "e1")
+        second = hub.subscribe(0, "e1")
+        other = hub.subscribe(1, "e1")
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertEqual([entry["subscribers"] for entry in hub.stats()], [2, 1])
+
+        hub.unsubscribe(0, "e1", first)
+        self.assertEqual(first.stopped, 0)
+        hub.unsubscribe(0, "e1", second)
+        self.assertEqual(first.stopped, 1)
+        hub.stop_all()
+        self.assertEqual(other.stopped, 1)
+        self.assertEqual(hub.stats(), [])
+
+    def test_dead_pipeline_is_replaced(self):
+        hub = CameraHub(FakePipeline)
+        first = hub.subscribe(0, "e1")
+        first.running = False
+        second = hub.subscribe(0, "e1")
+        self.assertIsNot(first, second)
+        self.assertEqual(first.stopped, 1)
+
+    def test_pipeline_that_fails_to_start(self):
+        hub = CameraHub(lambda camera, event_id: FakePipeline(camera, event_id, starts=False))
+        self.assertIsNone(hub.subscribe(0, "e1"))
+        self.assertEqual(hub.stats(), [])
+
+    def test_slow_camera_does_not_block_other_cameras(self):
+        release = threading.Event()
+        hub = CameraHub(lambda camera, event_id: FakePipeline(camera, event_id,
+                                                              release=release if camera == 0 else None))
+        joined = []
+        viewers = [threading.Thread(target=lambda: joined.append(hub.subscribe(0, "e1"))) for _ in range(2)]
+        for viewer in viewers:
+            viewer.start()
+        # Camera 0 is still opening; camera 1 starts regardless
+        other = hub.subscribe(1, "e1")
+        self.assertTrue(other.running)
+        self.assertEqual(joined, [])
+        self.assertEqual([entry["camera"] for entry in hub.stats()], [1])
+
+        release.set()
+        for viewer in viewers:
+            viewer.join(5)
+        # Both viewers of camera 0 share the pipeline started once
+        self.assertEqual(len(joined), 2)
+        self.assertIs(joined[0], joined[1])
+        self.assertEqual(sorted(entry["subscribers"] for entry in hub.stats()), [1, 2])
+        hub.stop_all()
+        self.assertEqual(joined[0].stopped, 1)
+
+    def test_viewers_waiting_on_a_failed_start_get_nothing(self):
+        release = threading.Event()
+        hub = CameraHub(lambda camera, event_id: FakePipeline(camera, event_id, starts=False, release=release))
+        joined = []
+        viewers = [threading.Thread(target=lambda: joined.append(hub.subscribe(0, "e1"))) for _ in range(2)]
+        for viewer in viewers:
+            viewer.start()
+        release.set()
+        for viewer in viewers:
+            viewer.join(5)
+        self.assertEqual(joined, [None, None])
+        self.assertEqual(hub.stats(), [])
+
+if __name__ == '__main__':
+    unittest.main()
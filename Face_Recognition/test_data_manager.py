@@ -0,0 +1,101 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+# The app stores everything under DATA_DIR, read when it is imported
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp())
+import app
+from bulk_enrollment import parse_manifest
+from data_manager import DataManager, is_valid_volunteer_id
+
+UNSAFE_IDS = ["../../escape", "a/b", "..", "", "x" * 65, "a b", "id\n"]
+
+class VolunteerIdTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.data_manager = DataManager(os.path.join(self.directory, "data"))
+        self.encoding = np.random.default_rng(0).normal(size=128)
+
+    def tearDown(self):
+        self.data_manager.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_valid_ids(self):
+        for volunteer_id in ("1", "harry_potter", "A-17", "x" * 64):
+            self.assertTrue(is_valid_volunteer_id(volunteer_id))
+        for volunteer_id in UNSAFE_IDS + [None, 17]:
+            self.assertFalse(is_valid_volunteer_id(volunteer_id))
+
+    def test_unsafe_ids_write_nothing(self):
+        for volunteer_id in UNSAFE_IDS:
+            self.assertFalse(self.data_manager.register_volunteer(
+                volunteer_id, "Eve", "e@x", self.encoding, b"jpg", [self.encoding], [b"jpg"]))
+            self.assertFalse(self.data_manager.add_volunteer_templates(volunteer_id, [self.encoding], [b"jpg"]))
+        errors = self.data_manager.register_volunteers_bulk(
+            [("../bulk", "Eve", "e@x", self.encoding, b"jpg"), ("ok", "Ann", "a@x", self.encoding, b"jpg")])
+        self.assertEqual(errors, {"../bulk": "Invalid volunteer ID"})
+        self.assertEqual(sorted(os.listdir(self.directory)), ["data"])
+        self.assertEqual([volunteer_id for volunteer_id, _ in self.data_manager.get_all_volunteers()], ["ok"])
+
+    def test_manifest_with_unsafe_id_is_rejected(self):
+        with self.assertRaises(ValueError):
+            parse_manifest(b"volunteer_id,name,email\n1,Ann,a@x\n../2,Eve,e@x\n")
+        self.assertEqual(len(parse_manifest(b"volunteer_id,name,email\n1,Ann,a@x\n,Bob,b@x\n")), 2)
+
+class IVFTemplatesTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.data_dir = os.path.join(self.directory, "data")
+        self.data_manager = DataManager(self.data_dir, index_backend="ivf")
+        rng = np.random.default_rng(0)
+        self.encodings = rng.normal(size=(4, 128))
+        # Closer to Bob's face than to Ann's first one
+        self.encodings[2] = self.encodings[1] + rng.normal(scale=0.1, size=128)
+
+    def tearDown(self):
+        self.data_manager.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def nearest(self, data_manager, encoding):
+        return data_manager.get_gallery().search(encoding, k=1)[0][0][0]
+
+    def test_every_template_is_matched(self):
+        self.assertTrue(self.data_manager.register_volunteer("a", "Ann", "a@x", self.encodings[0], b"jpg"))
+        self.assertTrue(self.data_manager.register_volunteer("b", "Bob", "b@x", self.encodings[1], b"jpg"))
+        self.assertEqual(self.nearest(self.data_manager, self.encodings[2]), "b")
+        self.assertTrue(self.data_manager.add_volunteer_templates("a", self.encodings[2:], [b"jpg", b"jpg"]))
+
+        for data_manager in (self.data_manager, DataManager(self.data_dir, index_backend="ivf")):
+            self.assertEqual(data_manager.get_gallery().template_count("a"), 3)
+            # The first template still matches after newer ones were added
+            self.assertEqual([self.nearest(data_manager, encoding) for encoding in self.encodings],
+                             ["a", "b", "a", "a"])
+            if data_manager is not self.data_manager:
+                data_manager.close()
+
+class VolunteerIdRouteTest(unittest.TestCase):
+    def setUp(self):
+        app.data_manager.cleanup()
+        self.client = app.app.test_client()
+
+    def test_routes_reject_unsafe_ids(self):
+        response = self.client.post('/register_face', data={
+            'volunteer_id': '../../escape', 'name': 'Eve', 'email': 'e@x', 'image': (io.BytesIO(b'jpg'), 'eve.jpg')
+        })
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/add_templates', data={
+            'volunteer_id': '../1', 'image': (io.BytesIO(b'jpg'), 'eve.jpg')
+        })
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/register_bulk', data={
+            'manifest': (io.BytesIO(b"volunteer_id,name,email\n../1,Eve,e@x\n"), 'manifest.csv'),
+            'images': (io.BytesIO(b'jpg'), '1.jpg')
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(app.data_manager.volunteer_count(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
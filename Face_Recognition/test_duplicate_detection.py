@@ -0,0 +1,86 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+
+# The app stores everything under DATA_DIR, read when it is imported
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp())
+import app
+from data_manager import DataManager
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+class FindDuplicatesTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.data_manager = DataManager(os.path.join(self.directory, "data"))
+        rng = np.random.default_rng(0)
+        self.encodings = rng.normal(scale=0.1, size=(3, 128))
+        for volunteer_id, encoding in zip("abc", self.encodings):
+            self.assertTrue(self.data_manager.register_volunteer(volunteer_id, volunteer_id, "x@x", encoding, b"jpg"))
+
+    def tearDown(self):
+        self.data_manager.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_best_confidence_over_all_photos(self):
+        self.assertEqual(self.data_manager.find_duplicates([], 90), [])
+        near_a = self.encodings[0] + 0.001
+        duplicates = self.data_manager.find_duplicates([near_a, self.encodings[2]], 90)
+        self.assertEqual([volunteer_id for volunteer_id, _ in duplicates], ["c", "a"])
+        self.assertEqual(duplicates[0][1], 100.0)
+        self.assertEqual(self.data_manager.find_duplicates([np.zeros(128) + 5], 90), [])
+
+    def test_flags_keep_the_highest_confidence(self):
+        self.assertTrue(self.data_manager.flag_possible_duplicates("a", [("b", 91.234), ("c", 95.0)]))
+        self.assertTrue(self.data_manager.flag_possible_duplicates("a", [("b", 93.0), ("c", 92.0)]))
+        self.assertEqual(self.data_manager.lookup("a")["possible_duplicates"], [
+            {"volunteer_id": "c", "confidence_score": 95.0},
+            {"volunteer_id": "b", "confidence_score": 93.0},
+        ])
+        self.assertFalse(self.data_manager.flag_possible_duplicates("missing", [("a", 99.0)]))
+
+class RegisterDuplicateRouteTest(unittest.TestCase):
+    def setUp(self):
+        app.data_manager.cleanup()
+        self.client = app.app.test_client()
+        with open(os.path.join(HERE, "harry.jpg"), 'rb') as f:
+            self.face = f.read()
+        self.assertEqual(self.register("1").status_code, 200)
+
+    def register(self, volunteer_id, **form):
+        return self.client.post('/register_face', data={
+            'volunteer_id': volunteer_id, 'name': 'Harry', 'email': 'h@x',
+            'image': (io.BytesIO(self.face), 'harry.jpg'), **form
+        })
+
+    def flagged(self, volunteer_id):
+        return [entry["volunteer_id"] for entry in app.data_manager.lookup(volunteer_id).get("possible_duplicates", [])]
+
+    def test_same_face_is_rejected(self):
+        response = self.register("2")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual([entry["volunteer_id"] for entry in response.json["duplicates"]], ["1"])
+        self.assertIsNone(app.data_manager.lookup("2"))
+
+        # An operator can register them anyway; both sides are flagged
+        response = self.register("2", allow_duplicate='1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry["volunteer_id"] for entry in response.json["possible_duplicates"]], ["1"])
+        self.assertEqual((self.flagged("1"), self.flagged("2")), (["2"], ["1"]))
+
+    def test_flag_and_off_policies(self):
+        with mock.patch.object(app, 'DUPLICATE_POLICY', 'flag'):
+            self.assertEqual(self.register("2").status_code, 200)
+        self.assertEqual(self.flagged("2"), ["1"])
+        with mock.patch.object(app, 'DUPLICATE_POLICY', 'off'):
+            response = self.register("3")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('possible_duplicates', response.json)
+        self.assertEqual(self.flagged("3"), [])
+
+if __name__ == '__main__':
+    unittest.main()
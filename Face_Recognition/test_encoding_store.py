@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from encoding_store import EncodingStore
+
+class EncodingStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.rng = np.random.default_rng(0)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_append_remove_and_reload(self):
+        store = EncodingStore(self.directory)
+        encodings = self.rng.normal(size=(3, 128))
+        store.append_many(["a", "b", "a"], encodings)
+        store.append("c", encodings[1])
+        self.assertTrue(store.remove("b"))
+        self.assertFalse(store.remove("missing"))
+
+        reloaded = EncodingStore(self.directory)
+        self.assertEqual(len(reloaded), 3)
+        self.assertEqual(reloaded.rows_by_id(), {"a": [0, 2], "c": [3]})
+        np.testing.assert_array_equal(reloaded.get("a"), encodings[2])
+        np.testing.assert_array_equal(reloaded.matrix[0], encodings[0])
+        self.assertIsNone(reloaded.get("b"))
+
+    def test_sees_appends_from_another_instance(self):
+        reader = EncodingStore(self.directory)
+        self.assertEqual(len(reader), 0)
+        stamp = reader.stamp()
+        EncodingStore(self.directory).append("a", self.rng.normal(size=128))
+        self.assertNotEqual(reader.stamp(), stamp)
+        self.assertEqual(list(reader.rows_by_id()), ["a"])
+
+    def test_interrupted_append_is_ignored_and_repaired(self):
+        store = EncodingStore(self.directory)
+        first = self.rng.normal(size=128)
+        store.append("a", first)
+        # A crash after writing half a row and before its id line
+        with open(store.matrix_file, 'ab') as f:
+            f.write(b'\0' * (store.row_bytes // 2))
+
+        reloaded = EncodingStore(self.directory)
+        self.assertEqual(len(reloaded), 1)
+        second = self.rng.normal(size=128)
+        reloaded.append("b", second)
+        self.assertEqual(os.path.getsize(store.matrix_file), 2 * store.row_bytes)
+        np.testing.assert_array_equal(EncodingStore(self.directory).get("b"), second)
+
+    def test_torn_id_line_is_ignored_and_repaired(self):
+        store = EncodingStore(self.directory)
+        store.append("first", self.rng.normal(size=128))
+        # A crash after the row was written but halfway through its id line
+        with open(store.matrix_file, 'ab') as f:
+            f.write(self.rng.normal(size=128).tobytes())
+        with open(store.ids_file, 'a') as f:
+            f.write("half-writ")
+
+        reloaded = EncodingStore(self.directory)
+        self.assertEqual(list(reloaded.rows_by_id()), ["first"])
+        second = self.rng.normal(size=128)
+        reloaded.append("second", second)
+        reopened = EncodingStore(self.directory)
+        self.assertEqual(reopened.rows_by_id(), {"first": [0], "second": [1]})
+        np.testing.assert_array_equal(reopened.get("second"), second)
+
+    def test_torn_removed_line_is_ignored_and_repaired(self):
+        store = EncodingStore(self.directory)
+        store.append_many([str(row) for row in range(13)], self.rng.normal(size=(13, 128)))
+        # A crash halfway through tombstoning row 12: "1" must not remove row 1
+        with open(store.removed_file, 'a') as f:
+            f.write("1")
+
+        reloaded = EncodingStore(self.directory)
+        self.assertEqual(len(reloaded), 13)
+        self.assertTrue(reloaded.remove("5"))
+        reopened = EncodingStore(self.directory)
+        self.assertEqual(len(reopened), 12)
+        self.assertIn("1", reopened.rows_by_id())
+        self.assertNotIn("5", reopened.rows_by_id())
+
+    def test_float32_store(self):
+        store = EncodingStore(self.directory, dtype="float32")
+        store.append("a", np.ones(128))
+        reloaded = EncodingStore(self.directory)
+        self.assertEqual(reloaded.dtype, np.float32)
+        self.assertEqual(reloaded.row_bytes, 128 * 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from face_gallery import FaceGallery, QuantizedGallery, TemplateGallery, build_exact_gallery
+from synthetic_data import synthetic_encodings, probe_queries
+
+def brute_force(ids, encodings, queries, k):
+    """k nearest distinct ids per query by scanning every row"""
+    results = []
+    for query in queries:
+        distances = np.linalg.norm(encodings - query, axis=1)
+        best = {}
+        for volunteer_id, distance in zip(ids, distances):
+            best[volunteer_id] = min(distance, best.get(volunteer_id, np.inf))
+        results.append(sorted(best, key=best.get)[:k])
+    return results
+
+class GalleryTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+        self.encodings = synthetic_encodings(300, self.rng)
+        self.ids = [str(i) for i in range(300)]
+        self.queries, self.answers = probe_queries(self.encodings, 50, self.rng)
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def assert_top1(self, gallery, ids, encodings, queries):
+        expected = brute_force(ids, encodings, queries, 1)
+        found = [neighbours[0][0] for neighbours in gallery.search(queries, k=1)]
+        self.assertEqual(found, [answer[0] for answer in expected])
+
+    def assert_save_and_load(self, gallery):
+        path = os.path.join(self.directory, f"{type(gallery).__name__}.npz")
+        gallery.save(path)
+        loaded = type(gallery).load(path)
+        self.assertEqual(loaded.search(self.queries, k=1), gallery.search(self.queries, k=1))
+
+    def test_face_gallery_matches_brute_force(self):
+        gallery = FaceGallery()
+        gallery.set_encodings(self.ids, self.encodings)
+        self.assert_top1(gallery, self.ids, self.encodings, self.queries)
+        distances = [distance for _, distance in gallery.search(self.queries[0], k=5)[0]]
+        self.assertEqual(distances, sorted(distances))
+
+    def test_face_gallery_add_and_remove(self):
+        gallery = FaceGallery()
+        gallery.set_encodings(self.ids[:-1], self.encodings[:-1])
+        gallery.add(self.ids[-1], self.encodings[-1])
+        self.assert_top1(gallery, self.ids, self.encodings, self.queries)
+        self.assertTrue(gallery.remove("0"))
+        self.assertNotIn("0", gallery)
+        self.assertNotEqual(gallery.search(self.encodings[0], k=1)[0][0][0], "0")
+
+    def test_quantized_gallery_agrees_with_exact(self):
+        gallery = QuantizedGallery(rerank=10)
+        gallery.set_encodings(self.ids, self.encodings)
+        self.assert_top1(gallery, self.ids, self.encodings, self.queries)
+
+    def test_quantized_gallery_add_after_build(self):
+        for rerank in (0, 10):
+            gallery = QuantizedGallery(rerank=rerank)
+            gallery.add("x", self.encodings[0])
+            gallery.add("y", self.encodings[1])
+            match = gallery.search(self.encodings[1], k=1)[0][0]
+            self.assertEqual(match[0], "y")
+            self.assertLess(match[1], 0.01)
+
+            # Grow one row at a time from a single-row build, with values outside the first ranges
+            gallery = QuantizedGallery(rerank=rerank)
+            gallery.set_encodings(self.ids[:1], self.encodings[:1])
+            for volunteer_id, encoding in zip(self.ids[1:], self.encodings[1:]):
+                gallery.add(volunteer_id, encoding * 2)
+            encodings = np.vstack([self.encodings[:1], self.encodings[1:] * 2])
+            queries = encodings[self.answers] + self.rng.normal(scale=0.01, size=(len(self.answers), 128))
+            self.assert_top1(gallery, self.ids, encodings, queries)
+
+    def test_quantized_gallery_add_keeps_the_source_on_disk(self):
+        path = os.path.join(self.directory, "source.f64")
+        source = np.memmap(path, dtype=np.float64, mode='w+', shape=self.encodings.shape)
+        source[:] = self.encodings
+        gallery = QuantizedGallery(rerank=10)
+        gallery.set_encodings(self.ids, source)
+        gallery.add("new", self.encodings[0] * 2)
+        gallery.add("7", self.encodings[8])
+        gallery.remove("new")
+        self.assertTrue(np.shares_memory(gallery._source, source))
+        self.assertEqual(len(gallery._pending), 1)
+
+        ids = self.ids[:7] + self.ids[8:] + ["7"]
+        encodings = np.vstack([self.encodings[:7], self.encodings[8:], self.encodings[8]])
+        self.assert_top1(gallery, ids, encodings, self.queries)
+        del source
+
+    def test_add_replaces_every_template(self):
+        ids = ["a", "a", "b", "c", "c", "c"]
+        encodings = synthetic_encodings(6, self.rng)
+        for dtype in ("float64", "int8"):
+            gallery = build_exact_gallery(ids, encodings, dtype=dtype)
+            gallery.add("c", encodings[0])
+            self.assertEqual(len(gallery), 3)
+            self.assertNotEqual(gallery.search(encodings[4], k=1)[0][0][0], "c")
+            self.assertEqual({volunteer_id for volunteer_id, _ in gallery.search(encodings[0], k=2)[0]}, {"a", "c"})
+
+    def test_quantized_gallery_with_templates(self):
+        ids = ["a", "a", "b", "c", "c", "c"]
+        encodings = synthetic_encodings(6, self.rng)
+        gallery = build_exact_gallery(ids, encodings, dtype="int8")
+        neighbours = gallery.search(encodings[4], k=3)[0]
+        self.assertEqual(sorted(volunteer_id for volunteer_id, _ in neighbours), ["a", "b", "c"])
+        self.assertEqual(neighbours[0][0], "c")
+        self.assertTrue(gallery.remove("c"))
+        self.assertNotIn("c", [volunteer_id for volunteer_id, _ in gallery.search(encodings[4], k=3)[0]])
+
+    def test_template_gallery_matches_brute_force(self):
+        ids = [str(i % 100) for i in range(300)]
+        gallery = TemplateGallery(shortlist=4)
+        gallery.set_encodings(ids, self.encodings)
+        self.assertEqual(len(gallery), 100)
+        for query, neighbours in zip(self.queries, gallery.search(self.queries, k=3)):
+            self.assertEqual([volunteer_id for volunteer_id, _ in neighbours],
+                             brute_force(ids, self.encodings, [query], 3)[0])
+
+        gallery.add("0", self.encodings[1])
+        gallery.remove("5")
+        kept = [index for index, volunteer_id in enumerate(ids) if volunteer_id not in ("0", "5")]
+        all_ids = [ids[index] for index in kept] + ["0"]
+        all_encodings = np.vstack([self.encodings[kept], self.encodings[1]])
+        self.assert_top1(gallery, all_ids, all_encodings, self.queries)
+
+    def test_match_respects_threshold(self):
+        gallery = build_exact_gallery(self.ids, self.encodings)
+        matches = gallery.match(self.encodings[:2], top_k=2, min_confidence=99)
+        self.assertEqual([[volunteer_id for volunteer_id, _ in query] for query in matches], [["0"], ["1"]])
+        self.assertIsNone(gallery.best_matches(synthetic_encodings(1, self.rng), min_confidence=99)[0])
+
+    def test_face_gallery_save_and_load(self):
+        gallery = FaceGallery()
+        gallery.set_encodings(self.ids, self.encodings)
+        self.assert_save_and_load(gallery)
+
+    def test_template_gallery_save_and_load(self):
+        gallery = TemplateGallery()
+        gallery.set_encodings([str(i % 100) for i in range(300)], self.encodings)
+        self.assert_save_and_load(gallery)
+
+    def test_quantized_gallery_save_and_load(self):
+        gallery = QuantizedGallery()
+        gallery.set_encodings(self.ids, self.encodings)
+        self.assert_save_and_load(gallery)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from face_index import IVFIndex
+from synthetic_data import synthetic_encodings, probe_queries
+from test_face_gallery import brute_force
+
+class IVFIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+        self.encodings = synthetic_encodings(300, self.rng)
+        self.ids = [str(i) for i in range(300)]
+        self.queries, self.answers = probe_queries(self.encodings, 50, self.rng)
+
+    def build(self, nprobe=8):
+        index = IVFIndex(n_lists=8, nprobe=nprobe, min_train_size=100)
+        index.add_many(self.ids, self.encodings)
+        return index
+
+    def top1(self, index):
+        return [neighbours[0][0] for neighbours in index.search(self.queries, k=1)]
+
+    def test_full_probe_is_exact(self):
+        index = self.build()
+        self.assertTrue(index.trained)
+        expected = brute_force(self.ids, self.encodings, self.queries, 1)
+        self.assertEqual(self.top1(index), [answer[0] for answer in expected])
+        index.remove("0")
+        self.assertNotIn("0", index)
+        self.assertEqual(len(index), 299)
+
+    def test_partial_probe_finds_near_duplicates(self):
+        index = self.build(nprobe=2)
+        found = self.top1(index)
+        recall = np.mean([volunteer_id == str(answer) for volunteer_id, answer in zip(found, self.answers)])
+        self.assertGreaterEqual(recall, 0.9)
+
+    def test_untrained_index_scans_everything(self):
+        index = IVFIndex(min_train_size=1000)
+        index.add_many(self.ids[:10], self.encodings[:10])
+        self.assertFalse(index.trained)
+        self.assertEqual(index.search(self.encodings[3], k=1)[0][0][0], "3")
+
+    def test_templates_are_indexed_as_rows(self):
+        ids = [str(i % 100) for i in range(300)]
+        index = IVFIndex(n_lists=8, nprobe=8, min_train_size=100)
+        index.add_many(ids, self.encodings)
+        self.assertEqual((len(index), index.template_count("7")), (100, 3))
+        for query, neighbours in zip(self.queries, index.search(self.queries, k=3)):
+            self.assertEqual([volunteer_id for volunteer_id, _ in neighbours],
+                             brute_force(ids, self.encodings, [query], 3)[0])
+
+        # Listed volunteers get exactly the new templates
+        templates = synthetic_encodings(2, self.rng)
+        index.add_many(["7", "7"], templates)
+        self.assertEqual(index.template_count("7"), 2)
+        self.assertEqual(index.search(templates[1], k=1)[0][0], ("7", 0.0))
+        self.assertTrue(index.remove("7"))
+        self.assertNotIn("7", [volunteer_id for volunteer_id, _ in index.search(self.encodings[207], k=3)[0]])
+
+    def test_save_and_load(self):
+        directory = tempfile.mkdtemp()
+        try:
+            index = self.build(nprobe=2)
+            index.remove("5")
+            path = os.path.join(directory, "ivf.npz")
+            index.save(path)
+            loaded = IVFIndex.load(path)
+            self.assertEqual(loaded.volunteer_ids(), index.volunteer_ids())
+            self.assertEqual(loaded.search(self.queries, k=3), index.search(self.queries, k=3))
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+from unittest import mock
+import numpy as np
+import face_quality
+from face_quality import QualityGate, landmark_yaw, laplacian_sharpness
+
+def landmarks(nose_x):
+    return {"left_eye": [(40, 50)], "right_eye": [(60, 50)], "nose_tip": [(nose_x, 65)]}
+
+class QualityGateTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.sharp = rng.integers(0, 256, size=(200, 200, 3), dtype=np.uint8)
+        self.flat = np.full((200, 200, 3), 128, dtype=np.uint8)
+        self.box = (20, 120, 120, 20)
+
+    def frontal(self):
+        return mock.patch.object(face_quality.face_recognition, 'face_landmarks', return_value=[landmarks(50)])
+
+    def test_yaw_from_landmarks(self):
+        self.assertEqual(landmark_yaw(landmarks(50)), 0.0)
+        self.assertEqual(landmark_yaw(landmarks(60)), 0.5)
+        self.assertIsNone(landmark_yaw({"left_eye": [(40, 50)]}))
+        self.assertIsNone(landmark_yaw({"left_eye": [(50, 50)], "right_eye": [(50, 50)], "nose_tip": [(50, 60)]}))
+
+    def test_sharpness(self):
+        self.assertEqual(laplacian_sharpness(self.flat, self.box), 0.0)
+        self.assertGreater(laplacian_sharpness(self.sharp, self.box), 1000)
+        self.assertEqual(laplacian_sharpness(self.sharp, (50, 50, 50, 50)), 0.0)
+
+    def test_checks_run_cheapest_first(self):
+        gate = QualityGate(min_size=40, min_sharpness=20.0, max_yaw=0.35)
+        with mock.patch.object(face_quality.face_recognition, 'face_landmarks') as face_landmarks:
+            self.assertEqual(gate.assess(self.sharp, (0, 30, 30, 0)).reason, "small")
+            self.assertEqual(gate.assess(self.flat, self.box).reason, "blurred")
+            face_landmarks.assert_not_called()
+            face_landmarks.return_value = [landmarks(65)]
+            quality = gate.assess(self.sharp, self.box)
+        self.assertEqual((quality.reason, quality.yaw), ("pose", 0.75))
+        with self.frontal():
+            self.assertTrue(gate.assess(self.sharp, self.box).usable)
+
+    def test_pose_check_can_be_disabled(self):
+        gate = QualityGate(max_yaw=None)
+        with mock.patch.object(face_quality.face_recognition, 'face_landmarks') as face_landmarks:
+            self.assertTrue(gate.assess(self.sharp, self.box).usable)
+            face_landmarks.assert_not_called()
+
+    def test_filter_counts_skipped_encodings(self):
+        gate = QualityGate()
+        faces = np.hstack([self.sharp, self.flat])
+        with self.frontal():
+            usable, skipped = gate.filter(faces, [self.box, (20, 320, 120, 220), (0, 10, 10, 0)])
+        self.assertEqual(usable, [0])
+        self.assertEqual(skipped, [(1, "blurred"), (2, "small")])
+
+        # Counts from a worker process's copy of the gate
+        gate.record(3, ["pose"])
+        stats = gate.stats()
+        self.assertEqual((stats["faces_assessed"], stats["faces_encoded"], stats["encodings_skipped"]), (6, 3, 3))
+        self.assertEqual(stats["skipped_by_reason"], {"small": 1, "blurred": 1, "pose": 1})
+        self.assertEqual(stats["encoding_saved_ratio"], 0.5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import cv2
+import numpy as np
+from frame_source import (
+    ImageDirectorySource, Pacer, RecordedSessionSource, RecordingSource, open_frame_source, SESSION_INDEX
+)
+
+class FrameSourceTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.images = os.path.join(self.directory, "images")
+        os.makedirs(self.images)
+        # Flat colours survive JPEG round trips almost exactly
+        self.frames = [np.full((48, 64, 3), 40 * (index + 1), dtype=np.uint8) for index in range(4)]
+        for index, frame in enumerate(self.frames):
+            cv2.imwrite(os.path.join(self.images, f"{index:03d}.png"), frame)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def read_all(self, source):
+        frames = []
+        while True:
+            success, frame = source.read()
+            if not success:
+                return frames
+            frames.append(frame)
+
+    def record(self, directory):
+        source = RecordingSource(ImageDirectorySource(self.images, fps=0), directory)
+        self.assertTrue(source.open())
+        recorded = self.read_all(source)
+        source.release()
+        return source, recorded
+
+    def test_record_and_replay_round_trip(self):
+        session = os.path.join(self.directory, "session")
+        recording, recorded = self.record(session)
+        self.assertEqual(recording.frames_recorded, len(self.frames))
+        self.assertEqual(len(recorded), len(self.frames))
+
+        replay = open_frame_source(session, speed=0)
+        self.assertIsInstance(replay, RecordedSessionSource)
+        self.assertTrue(replay.open())
+        replayed = self.read_all(replay)
+        self.assertEqual(len(replayed), len(self.frames))
+        for original, frame in zip(self.frames, replayed):
+            self.assertLess(np.abs(frame.astype(int) - original).max(), 4)
+
+    def test_recording_never_overwrites_a_session(self):
+        session = os.path.join(self.directory, "session")
+        first, _ = self.record(session)
+        second, _ = self.record(session)
+        self.assertEqual(first.directory, session)
+        self.assertEqual(second.directory, session + "-1")
+        with open(os.path.join(session, SESSION_INDEX), 'r') as f:
+            self.assertEqual(len(f.readlines()), len(self.frames))
+
+    def test_replay_skips_torn_index_line(self):
+        session = os.path.join(self.directory, "session")
+        self.record(session)
+        with open(os.path.join(session, SESSION_INDEX), 'a') as f:
+            f.write('{"frame": 4, "fi')
+        replay = RecordedSessionSource(session, speed=0)
+        self.assertTrue(replay.open())
+        self.assertEqual(len(self.read_all(replay)), len(self.frames))
+
+    def test_looping_directory_without_decodable_images_stops(self):
+        broken = os.path.join(self.directory, "broken")
+        os.makedirs(broken)
+        with open(os.path.join(broken, "0.jpg"), 'w') as f:
+            f.write("not an image")
+        source = ImageDirectorySource(broken, fps=0, loop=True)
+        self.assertTrue(source.open())
+        self.assertEqual(source.read(), (False, None))
+
+    def test_pacer_scales_timestamps(self):
+        pacer = Pacer(speed=2.0)
+        started = time.monotonic()
+        for timestamp in (0.0, 0.1, 0.2):
+            pacer.wait(timestamp)
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+        started = time.monotonic()
+        Pacer(speed=0).wait(10.0)
+        self.assertLess(time.monotonic() - started, 0.05)
+
+if __name__ == '__main__':
+    unittest.main()
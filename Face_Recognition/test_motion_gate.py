@@ -0,0 +1,51 @@
+import unittest
+import numpy as np
+from motion_gate import MotionGate
+
+class MotionGateTest(unittest.TestCase):
+    def setUp(self):
+        self.still = np.full((240, 320, 3), 80, dtype=np.uint8)
+        self.moved = self.still.copy()
+        self.moved[60:180, 100:220] = 220
+
+    def test_goes_idle_after_the_hold(self):
+        gate = MotionGate(hold_frames=3)
+        # The first frame has nothing to compare against
+        self.assertTrue(gate.update(self.still))
+        self.assertTrue(gate.update(self.still))
+        self.assertTrue(gate.update(self.still))
+        self.assertFalse(gate.update(self.still))
+        self.assertEqual(gate.score, 0.0)
+        self.assertEqual(gate.stats()["state"], "idle")
+
+    def test_motion_wakes_the_gate(self):
+        gate = MotionGate(hold_frames=2)
+        for _ in range(3):
+            gate.update(self.still)
+        self.assertFalse(gate.active)
+        self.assertTrue(gate.update(self.moved))
+        self.assertGreater(gate.score, gate.threshold)
+
+    def test_background_absorbs_a_lasting_change(self):
+        gate = MotionGate(hold_frames=1, learning_rate=0.5)
+        gate.update(self.still)
+        scores = []
+        for _ in range(10):
+            gate.update(self.moved)
+            scores.append(gate.score)
+        self.assertGreater(scores[0], gate.threshold)
+        self.assertEqual(scores[-1], 0.0)
+        self.assertFalse(gate.active)
+
+    def test_stats(self):
+        gate = MotionGate(hold_frames=1)
+        for _ in range(4):
+            gate.update(self.still)
+        stats = gate.stats()
+        self.assertEqual((stats["frames_seen"], stats["frames_idle"]), (4, 3))
+        self.assertEqual(stats["threshold"], 0.01)
+        # A new resolution resets the background
+        self.assertTrue(gate.update(np.zeros((100, 100, 3), dtype=np.uint8)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import cv2
+import numpy as np
+from data_manager import DataManager
+from face_utils import detect_face_locations, encode_faces
+from frame_source import VideoFileSource
+from multiprocess_pipeline import FrameRing, MultiprocessAttendancePipeline
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def wait_for(condition, timeout=30):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+class FrameRingTest(unittest.TestCase):
+    def test_attached_ring_shares_slots(self):
+        ring = FrameRing(3, (4, 5, 3))
+        attached = FrameRing(3, (4, 5, 3), name=ring.name)
+        try:
+            ring.slot(1)[:] = 7
+            np.testing.assert_array_equal(attached.slot(1), np.full((4, 5, 3), 7, dtype=np.uint8))
+            self.assertEqual(attached.slot(0).sum(), 0)
+        finally:
+            attached.close()
+            ring.close()
+
+class MultiprocessPipelineTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.data_manager = DataManager(os.path.join(self.directory, "data"))
+        face = cv2.resize(cv2.imread(os.path.join(HERE, "harry.jpg")), (320, 240))
+        self.video = os.path.join(self.directory, "camera.avi")
+        writer = cv2.VideoWriter(self.video, cv2.VideoWriter_fourcc(*'MJPG'), 10, (320, 240))
+        for _ in range(10):
+            writer.write(face)
+        writer.release()
+
+        cap = cv2.VideoCapture(self.video)
+        _, frame = cap.read()
+        cap.release()
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        encoding = encode_faces(rgb_frame, detect_face_locations(rgb_frame))[0]
+        self.data_manager.register_volunteers_bulk([("harry", "Harry", "h@x", encoding, b"")])
+
+    def tearDown(self):
+        self.data_manager.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_skipped_frames_do_not_stall_the_reorderer(self):
+        pipeline = MultiprocessAttendancePipeline(self.data_manager, "e1", VideoFileSource(self.video))
+        pipeline._next_seq = 3
+        pipeline._skipped = {3, 4, 6}
+        pipeline._skip_lost()
+        self.assertEqual(pipeline._next_seq, 5)
+        self.assertEqual(pipeline._skipped, {6})
+
+    def test_recognizes_and_survives_a_dead_worker(self):
+        pipeline = MultiprocessAttendancePipeline(self.data_manager, "e1", VideoFileSource(self.video, loop=True),
+                                                  workers=2, reorder_timeout=30)
+        self.assertTrue(pipeline.start())
+        try:
+            self.assertTrue(wait_for(lambda: self.data_manager.attendance.get_record("e1", "harry")))
+            # Sends to the closed pipe fail until the worker is restarted
+            with pipeline._workers_lock:
+                pipeline._task_pipes[0].close()
+            self.assertTrue(wait_for(lambda: pipeline.worker_restarts >= 1))
+            # With a 30 second reorder timeout, only skipping lost frames keeps output flowing
+            processed = pipeline.frames_processed
+            self.assertTrue(wait_for(lambda: pipeline.frames_processed > processed + 5, timeout=10))
+        finally:
+            pipeline.stop()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from quality_controller import QualityController, default_levels
+
+class QualityControllerTest(unittest.TestCase):
+    def feed(self, controller, seconds, frames):
+        for _ in range(frames):
+            settings = controller.record({"detect": seconds * 0.8, "jpeg": seconds * 0.2})
+        return settings
+
+    def test_levels_get_cheaper(self):
+        levels = default_levels(detect_interval=5, jpeg_quality=90)
+        self.assertEqual(levels[0], (1.0, 5, 90))
+        for better, cheaper in zip(levels, levels[1:]):
+            self.assertLessEqual(cheaper.detection_scale, better.detection_scale)
+            self.assertGreaterEqual(cheaper.detect_interval, better.detect_interval)
+            self.assertLessEqual(cheaper.jpeg_quality, better.jpeg_quality)
+
+    def test_degrades_one_level_per_cooldown(self):
+        controller = QualityController(target_fps=10, cooldown=5)
+        self.assertEqual(self.feed(controller, 0.2, 4), controller.levels[0])
+        self.assertEqual(self.feed(controller, 0.2, 1), controller.levels[1])
+        self.feed(controller, 0.2, 5)
+        self.assertEqual(controller.level, 2)
+        # Never past the cheapest level
+        self.feed(controller, 0.2, 100)
+        self.assertEqual(controller.level, len(controller.levels) - 1)
+        self.assertEqual(controller.degrades, len(controller.levels) - 1)
+
+    def test_recovers_once_well_under_budget(self):
+        controller = QualityController(target_fps=10, cooldown=5, smoothing=1.0)
+        self.feed(controller, 0.2, 10)
+        self.assertEqual(controller.level, 2)
+        # Between recover_ratio and the budget nothing changes
+        self.feed(controller, 0.08, 20)
+        self.assertEqual(controller.level, 2)
+        self.feed(controller, 0.03, 10)
+        self.assertEqual(controller.level, 0)
+        self.assertEqual(controller.recoveries, 2)
+
+    def test_one_slow_frame_is_smoothed_out(self):
+        controller = QualityController(target_fps=10, cooldown=5)
+        self.feed(controller, 0.05, 10)
+        # Twice the budget, but the moving average stays under it
+        self.feed(controller, 0.2, 1)
+        self.feed(controller, 0.05, 4)
+        self.assertEqual(controller.level, 0)
+
+    def test_stats(self):
+        controller = QualityController(target_fps=10, smoothing=1.0)
+        self.feed(controller, 0.05, 1)
+        stats = controller.stats()
+        self.assertEqual(stats["frame_ms"], 50.0)
+        self.assertEqual(stats["stage_ms"], {"detect": 40.0, "jpeg": 10.0})
+        self.assertEqual(stats["max_level"], len(default_levels()) - 1)
+        self.assertIn("L0", controller.overlay_text())
+
+if __name__ == '__main__':
+    unittest.main()
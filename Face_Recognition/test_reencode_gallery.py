@@ -0,0 +1,78 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+import cv2
+import numpy as np
+import reencode_gallery
+from reencode_gallery import reencode, list_versions
+from data_manager import DataManager
+from encoding_store import gallery_version_dir
+from face_utils import EncodingSettings
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+class ReencodeGalleryTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.data_dir = os.path.join(self.directory, "data")
+        self.data_manager = DataManager(self.data_dir)
+        with open(os.path.join(HERE, "harry.jpg"), 'rb') as f:
+            face = f.read()
+        blank = cv2.imencode('.jpg', np.zeros((120, 120, 3), dtype=np.uint8))[1].tobytes()
+        self.assertTrue(self.data_manager.register_volunteer("1", "Harry", "h@x", np.zeros(128), face))
+        self.assertTrue(self.data_manager.register_volunteer("2", "Blank", "b@x", np.zeros(128), blank))
+
+    def tearDown(self):
+        self.data_manager.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def failures(self, version):
+        with open(os.path.join(gallery_version_dir(self.data_manager.volunteers_dir, version), "failures.json")) as f:
+            return json.load(f)
+
+    def run_main(self, *args):
+        with mock.patch.object(sys, 'argv', ["reencode_gallery.py", "--data-dir", self.data_dir, "--workers", "1", *args]), \
+                mock.patch('builtins.print'):
+            reencode_gallery.main()
+
+    def test_build_and_resume(self):
+        report = reencode(self.data_manager, "v2", workers=1)
+        self.assertEqual((report["encoded_volunteers"], report["encodings"]), (1, 1))
+        self.assertEqual(list(report["failed"]), ["2"])
+        self.assertEqual(list(self.failures("v2")), ["2"])
+
+        # Volunteers already in the version are not encoded again
+        report = reencode(self.data_manager, "v2", workers=1, skip=["2"])
+        self.assertEqual((report["resumed_volunteers"], report["encoded_volunteers"]), (1, 0))
+        self.assertEqual(list(self.failures("v2")), ["2"])
+        listing = {info["version"]: info for info in list_versions(self.data_manager)}
+        self.assertTrue(listing["default"]["active"])
+        self.assertEqual((listing["v2"]["encodings"], listing["v2"]["failed"]), (1, 1))
+
+    def test_settings_are_fixed_per_version(self):
+        reencode(self.data_manager, "v2", workers=1)
+        with self.assertRaises(ValueError):
+            reencode(self.data_manager, "v2", EncodingSettings(upsample=2), workers=1)
+        with self.assertRaises(ValueError):
+            reencode(self.data_manager, "default", workers=1)
+
+    def test_switch(self):
+        # A failed volunteer blocks the switch unless it is forced
+        with self.assertRaises(SystemExit):
+            self.run_main("--version", "v2", "--switch")
+        self.assertEqual(self.data_manager.get_gallery().search(np.zeros(128), k=1)[0][0][1], 0.0)
+        self.run_main("--version", "v2", "--switch", "--force")
+
+        # Running servers pick the new version up on their next lookup
+        self.assertEqual(list(self.data_manager.get_gallery().ids), ["1"])
+        self.assertEqual(self.data_manager.gallery_version, "v2")
+        self.assertFalse(self.data_manager.activate_gallery_version("missing"))
+        self.run_main("--activate", "default")
+        self.assertEqual(self.data_manager.get_gallery().search(np.zeros(128), k=2)[0][0][1], 0.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+import cv2
+import numpy as np
+import video_attendance
+from video_attendance import process_video, mark_video_attendance
+from data_manager import DataManager
+from face_gallery import build_exact_gallery
+from face_utils import detect_face_locations, encode_faces, FaceRecognitionError
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FPS = 10
+
+class VideoAttendanceTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        face = cv2.resize(cv2.imread(os.path.join(HERE, "harry.jpg")), (320, 240))
+        # Two seconds of an empty room, then four seconds of one face
+        cls.video = os.path.join(cls.directory, "event.avi")
+        writer = cv2.VideoWriter(cls.video, cv2.VideoWriter_fourcc(*'MJPG'), FPS, (320, 240))
+        for index in range(60):
+            writer.write(face if index >= 20 else np.zeros_like(face))
+        writer.release()
+
+        # Enroll the face as the video decodes it
+        cap = cv2.VideoCapture(cls.video)
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 20)
+        _, frame = cap.read()
+        cap.release()
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        encoding = encode_faces(rgb_frame, detect_face_locations(rgb_frame))[0]
+        cls.gallery = build_exact_gallery(["harry"], encoding[None, :])
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def assert_result(self, result):
+        self.assertEqual(result["frames_sampled"], 30)
+        self.assertEqual(result["faces_detected"], 20)
+        self.assertEqual(result["duration_seconds"], 6.0)
+        self.assertEqual(list(result["volunteers"]), ["harry"])
+        entry = result["volunteers"]["harry"]
+        self.assertEqual((entry["first_seen"], entry["last_seen"], entry["frames"]), (2.0, 5.8, 20))
+        self.assertGreater(entry["confidence_score"], 99)
+
+    def test_segments_across_workers(self):
+        self.assert_result(process_video(self.video, self.gallery, sample_fps=5, max_workers=2))
+
+    def test_unknown_frame_count_decodes_sequentially(self):
+        with mock.patch.object(video_attendance, '_video_info', return_value=(FPS, 0)):
+            self.assert_result(process_video(self.video, self.gallery, sample_fps=5, max_workers=2))
+
+    def test_unreadable_video(self):
+        broken = os.path.join(self.directory, "broken.avi")
+        with open(broken, 'wb') as f:
+            f.write(b"not a video")
+        with self.assertRaises(FaceRecognitionError):
+            process_video(broken, self.gallery)
+
+    def test_mark_with_first_seen_timestamps(self):
+        data_manager = DataManager(os.path.join(self.directory, "data"))
+        try:
+            result = {"volunteers": {"harry": {"confidence_score": 97.0, "first_seen": 2.5}}}
+            recorded_at = datetime(2024, 4, 5, 10, 0)
+            self.assertEqual(mark_video_attendance(data_manager, "e1", result, recorded_at), ["harry"])
+            self.assertEqual(mark_video_attendance(data_manager, "e1", result, recorded_at), [])
+            record = data_manager.attendance.get_record("e1", "harry")
+            self.assertEqual(record["timestamp"], "2024-04-05T10:00:02.500000")
+        finally:
+            data_manager.close()
+
+if __name__ == '__main__':
+    unittest.main()
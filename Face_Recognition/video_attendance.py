@@ -0,0 +1,175 @@
+"""Offline attendance from a recorded event video.
+
+Frames are sampled at a configurable rate; decoding, detection and encoding are
+spread over a process pool (each worker opens the file itself and handles one
+contiguous segment, so no frames cross process boundaries). Files whose
+container reports no frame count (common for variable frame rate phone
+recordings) are decoded sequentially by a single worker. The parent matches
+all encodings against the gallery in one batch and merges them into one record
+per volunteer with the best confidence and the first-seen time.
+
+Usage:
+    python video_attendance.py event.mp4 --event-id 1 [--sample-fps 1] [--workers 8]
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from itertools import count
+from typing import Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+from face_utils import detect_face_locations, encode_faces, FaceRecognitionError
+
+# Frames are downscaled to this longest side before detection
+VIDEO_DETECTION_SIDE = 960
+
+def _video_info(video_path: str) -> Tuple[float, int]:
+    """Frame rate and frame count of a video file (the count is <= 0 when the container does not know it)"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise FaceRecognitionError("Could not open video file")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return fps, frame_count
+
+def _process_segment(args) -> Tuple[int, List[Tuple[int, List[np.ndarray]]]]:
+    """Worker: decode every ``step``-th frame of [start, end) and encode its faces.
+
+    ``end=None`` reads to the end of the file. Returns the index after the last
+    decoded frame along with the encodings per sampled frame.
+    """
+    video_path, start, end, step, detection_side = args
+    cap = cv2.VideoCapture(video_path)
+    results = []
+    decoded_until = start
+    try:
+        if start:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        for frame_index in (count(start) if end is None else range(start, end)):
+            # grab() skips frames without converting them; only sampled frames are retrieved
+            if not cap.grab():
+                break
+            decoded_until = frame_index + 1
+            if frame_index % step:
+                continue
+            success, frame = cap.retrieve()
+            if not success:
+                continue
+            height, width = frame.shape[:2]
+            if max(height, width) > detection_side:
+                factor = detection_side / max(height, width)
+                frame = cv2.resize(frame, (int(width * factor), int(height * factor)), interpolation=cv2.INTER_AREA)
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            face_locations = detect_face_locations(rgb_frame)
+            if face_locations:
+                results.append((frame_index, encode_faces(rgb_frame, face_locations)))
+    finally:
+        cap.release()
+    return decoded_until, results
+
+def process_video(video_path: str, gallery, sample_fps: float = 1.0, max_workers: Optional[int] = None,
+                  min_confidence: float = 90, detection_side: int = VIDEO_DETECTION_SIDE) -> Dict:
+    """Recognize volunteers in a video file.
+
+    Returns ``{"frames_sampled", "faces_detected", "duration_seconds", "volunteers"}``
+    where ``volunteers`` maps each recognized id to its best confidence, first
+    and last seen offsets (seconds) and number of sampled frames it appeared in.
+    Raises ``FaceRecognitionError`` if no frame of the file can be decoded.
+    """
+    fps, frame_count = _video_info(video_path)
+    step = max(1, int(round(fps / sample_fps)))
+    workers = max_workers or os.cpu_count() or 1
+
+    if frame_count > 0:
+        # More segments than workers keeps every process busy until the end
+        segment_count = max(1, min(workers * 4, frame_count // (step * 8) or 1))
+        bounds = np.linspace(0, frame_count, segment_count + 1).astype(int)
+        segments = [(video_path, int(start), int(end), step, detection_side)
+                    for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+        # The reported count can be short, so the last segment reads to the end of the file
+        segments[-1] = segments[-1][:2] + (None,) + segments[-1][3:]
+    else:
+        # Unknown frame count: segments cannot be planned, decode the whole file in order
+        segments = [(video_path, 0, None, step, detection_side)]
+        workers = 1
+
+    frame_count = 0
+    frame_indices, encodings = [], []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for decoded_until, segment in executor.map(_process_segment, segments):
+            frame_count = max(frame_count, decoded_until)
+            for frame_index, frame_encodings in segment:
+                frame_indices.extend([frame_index] * len(frame_encodings))
+                encodings.extend(frame_encodings)
+    if not frame_count:
+        raise FaceRecognitionError("Could not decode any frames from the video file")
+
+    volunteers: Dict[str, Dict] = {}
+    if encodings:
+        matches = gallery.best_matches(np.stack(encodings), min_confidence=min_confidence)
+        for frame_index, match in sorted(zip(frame_indices, matches), key=lambda item: item[0]):
+            if match is None:
+                continue
+            volunteer_id, confidence = match
+            seen_at = round(frame_index / fps, 2)
+            entry = volunteers.setdefault(volunteer_id, {
+                "confidence_score": confidence,
+                "first_seen": seen_at,
+                "last_seen": seen_at,
+                "frames": 0
+            })
+            entry["confidence_score"] = max(entry["confidence_score"], confidence)
+            entry["last_seen"] = seen_at
+            entry["frames"] += 1
+
+    return {
+        "frames_sampled": len(range(0, frame_count, step)),
+        "faces_detected": len(encodings),
+        "duration_seconds": round(frame_count / fps, 2),
+        "volunteers": volunteers
+    }
+
+def mark_video_attendance(data_manager, event_id: str, result: Dict,
+                          recorded_at: Optional[datetime] = None) -> List[str]:
+    """Mark attendance for every volunteer found by ``process_video``.
+
+    With ``recorded_at`` (the video's start time), each record's timestamp is
+    the moment the volunteer was first seen; otherwise the current time is used.
+    Returns the ids whose attendance was newly marked or improved.
+    """
+    marked = []
+    for volunteer_id, entry in result["volunteers"].items():
+        timestamp = None
+        if recorded_at is not None:
+            timestamp = (recorded_at + timedelta(seconds=entry["first_seen"])).isoformat()
+        if data_manager.mark_attendance(event_id, volunteer_id, entry["confidence_score"], timestamp):
+            marked.append(volunteer_id)
+    return marked
+
+def main():
+    parser = argparse.ArgumentParser(description="Mark attendance from a recorded event video")
+    parser.add_argument('video', help='Path to the video file (e.g. MP4)')
+    parser.add_argument('--event-id', required=True, help='Event to mark attendance for')
+    parser.add_argument('--sample-fps', type=float, default=1.0, help='Frames analysed per second of video (default: 1)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per CPU)')
+    parser.add_argument('--recorded-at', default=None, help='ISO time the recording started, for first-seen timestamps')
+    parser.add_argument('--data-dir', default='data', help='DataManager data directory (default: data)')
+    parser.add_argument('--dry-run', action='store_true', help='Report matches without marking attendance')
+    args = parser.parse_args()
+
+    from data_manager import DataManager
+    data_manager = DataManager(args.data_dir)
+    try:
+        result = process_video(args.video, data_manager.get_gallery(), args.sample_fps, args.workers)
+        if not args.dry_run:
+            recorded_at = datetime.fromisoformat(args.recorded_at) if args.recorded_at else None
+            result["marked"] = mark_video_attendance(data_manager, args.event_id, result, recorded_at)
+        print(json.dumps(result, indent=4))
+    finally:
+        data_manager.close()
+
+if __name__ == '__main__':
+    main()
@@ -41,22 +41,16 @@ def verify_face_descriptor(stored_descriptor, live_descriptor):
 def match_face(face_descriptor):
     """Find best matching user for a face descriptor"""
     try:
-        users = User.find_all_with_face_descriptors()
-        best_match = None
-        min_distance = float('inf')
-        
-        for user in users:
-            if not user.face_descriptor:
-                continue
-                
-            # Calculate distance between descriptors
-            distance = np.linalg.norm(
-                np.array(user.face_descriptor) - np.array(face_descriptor)
-            )
+        users = [user for user in User.find_all_with_face_descriptors() if user.face_descriptor]
+        if not users:
+            return None
             
-            if distance < min_distance:
-                min_distance = distance
-                best_match = user
+        # Distances to every stored descriptor in one vectorized computation
+        descriptors = np.array([user.face_descriptor for user in users], dtype=np.float64)
+        distances = np.linalg.norm(descriptors - np.asarray(face_descriptor, dtype=np.float64), axis=1)
+        best_index = int(np.argmin(distances))
+        best_match = users[best_index]
+        min_distance = distances[best_index]
                 
         # Threshold for match (adjust as needed)
         THRESHOLD = 0.6